@@ -0,0 +1,87 @@
+# coding: utf-8
+
+"""
+    Several aggregates of one stream: g.aggregate() vs one tee() copy each.
+
+    The tee() version is what had to be written before g.aggregate():
+    each aggregate consumes its own copy of the stream, one after another,
+    so tee() ends up buffering all the items.
+
+    Run with:
+
+        python benchmarks/aggregate.py [--size N]
+"""
+
+from __future__ import print_function, division
+
+import argparse
+import itertools
+import tracemalloc
+
+from ww import g
+
+from fusion import per_item
+
+
+def variance(values):
+    count = 0
+    mean = m2 = 0.0
+    for value in values:
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        m2 += delta * (value - mean)
+    return m2 / (count - 1)
+
+
+def with_tee(iterable):
+    copies = itertools.tee(iterable, 7)
+    count = sum(1 for _ in copies[0])
+    return {
+        'count': count,
+        'sum': sum(copies[1]),
+        'min': min(copies[2]),
+        'max': max(copies[3]),
+        'mean': sum(copies[4]) / sum(1 for _ in copies[5]),
+        'var': variance(copies[6]),
+    }
+
+
+def with_aggregate(iterable):
+    return g(iterable).aggregate(count=True, sum=True, min=True, max=True,
+                                 mean=True, var=True)
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--size', type=int, default=200000)
+    args = parser.parse_args()
+
+    def stream():
+        return (x * 0.5 for x in range(args.size))
+
+    tee_result, aggregate_result = with_tee(stream()), with_aggregate(stream())
+    for name, value in tee_result.items():
+        assert abs(value - aggregate_result[name]) <= 1e-6 * abs(value), name
+
+    funcs = [lambda: with_tee(stream()), lambda: with_aggregate(stream())]
+    times = per_item(funcs, args.size, repeat=7)
+    peaks = [peak_memory(func) for func in funcs]
+
+    print('%-12s  %10s  %14s' % ('', 'ns/item', 'peak memory'))
+    for name, duration, peak in zip(('tee', 'aggregate'), times, peaks):
+        print('%-12s  %10.1f  %12d B' % (name, duration, peak))
+    print('speedup: %.2fx' % (times[0] / times[1]))
+
+
+if __name__ == '__main__':
+    main()
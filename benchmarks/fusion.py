@@ -0,0 +1,104 @@
+# coding: utf-8
+
+"""
+    Per-item overhead of deep g() chains, fused vs unfused.
+
+    The unfused version wraps one iterator per operation, which is what
+    g() did before chained operations were compiled into one loop.
+
+    Run with:
+
+        python benchmarks/fusion.py [--size N]
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+from ww import g
+from ww.iterable import iterslice, skip_duplicates
+
+
+def inc(x):
+    return x + 1
+
+
+def odd(x):
+    return x % 2
+
+
+def positive(x):
+    return x > 0
+
+
+STAGES = [
+    ('map', inc),
+    ('skip_duplicates', None),
+    ('filter', odd),
+    ('slice', positive),
+    ('map', inc),
+    ('skip_duplicates', None),
+    ('filter', positive),
+    ('slice', 1),
+]
+
+
+def fused(source, depth):
+    gen = g(source)
+    for kind, arg in STAGES[:depth]:
+        if kind == 'map':
+            gen = gen.map(arg)
+        elif kind == 'filter':
+            gen = gen.filter(arg)
+        elif kind == 'slice':
+            gen = gen[arg:]
+        else:
+            gen = gen.skip_duplicates()
+    return gen
+
+
+def unfused(source, depth):
+    gen = iter(source)
+    for kind, arg in STAGES[:depth]:
+        if kind == 'map':
+            gen = map(arg, gen)
+        elif kind == 'filter':
+            gen = filter(arg, gen)
+        elif kind == 'slice':
+            gen = iterslice(gen, arg)
+        else:
+            gen = skip_duplicates(gen)
+    return gen
+
+
+def per_item(funcs, size, repeat=15):
+    """Return the best time per source item of each function, in nanoseconds
+
+    Runs are interleaved so that noise affects all the functions alike.
+    """
+    best = [float('inf')] * len(funcs)
+    for _ in range(repeat):
+        for i, func in enumerate(funcs):
+            best[i] = min(best[i], timeit.timeit(func, number=1))
+    return [duration / size * 1e9 for duration in best]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--size', type=int, default=200000)
+    args = parser.parse_args()
+
+    source = range(args.size)
+    print('depth  %-72s  unfused ns/item  fused ns/item  speedup' % 'stages')
+    for depth in range(1, len(STAGES) + 1):
+        stages = ', '.join(kind for kind, _ in STAGES[:depth])
+        before, after = per_item([lambda: list(unfused(source, depth)),
+                                  lambda: list(fused(source, depth))],
+                                 args.size)
+        print('%5d  %-72s  %15.1f  %13.1f  %6.2fx' %
+              (depth, stages, before, after, before / after))
+
+
+if __name__ == '__main__':
+    main()
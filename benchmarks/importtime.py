@@ -0,0 +1,129 @@
+# coding: utf-8
+
+"""
+    Time taken by "import ww", and by the first use of each wrapper.
+
+    Each statement runs in a fresh interpreter with "python -X importtime",
+    several times, and the fastest run is kept. The cumulative time of the
+    slowest modules imported is listed with --top. Results can be saved as
+    a baseline and later runs compared to it, like with suite.py.
+
+    Run with:
+
+        python benchmarks/importtime.py [--runs 5] [--top 10]
+                                        [--save FILE] [--compare FILE]
+                                        [--tolerance 0.25]
+
+    It exits with status 1 if regressions are found.
+"""
+
+from __future__ import print_function, division
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'importtime.json')
+
+STATEMENTS = {
+    'import ww': 'import ww',
+    'ww.g': 'import ww; ww.g',
+    'ww.s': 'import ww; ww.s',
+    'ww.l/t/d': 'import ww; ww.l, ww.t, ww.d',
+}
+
+
+def import_times(statement):
+    """Run statement in a new interpreter, and return the cumulative import
+    time of each top level module imported, in µs"""
+    process = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                                statement],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    _, err = process.communicate()
+    if process.returncode:
+        raise RuntimeError(err)
+    times = {}
+    for line in err.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not name.startswith('  '):  # not imported by another module
+            name = name.strip()
+            times[name] = times.get(name, 0) + int(cumulative)
+    return times
+
+
+def measure(statement, runs):
+    """ Return the import times of the fastest of the runs """
+    return min((import_times(statement) for _ in range(runs)),
+               key=lambda times: sum(times.values()))
+
+
+def compare(results, baseline, tolerance):
+    """ Return the descriptions of the regressions against the baseline """
+    regressions = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        # a margin of 1ms, as small times are noisy
+        if result > before * (1 + tolerance) + 1000:
+            regressions.append('%s: %.1f ms -> %.1f ms' % (
+                name, before / 1000, result / 1000))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5,
+                        help='interpreters started for each statement')
+    parser.add_argument('--top', type=int, default=0,
+                        help='show the N slowest modules of each statement')
+    parser.add_argument('--save', metavar='FILE', nargs='?', const=BASELINE,
+                        help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', nargs='?',
+                        const=BASELINE, help='compare with a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='relative growth flagged as a regression')
+    args = parser.parse_args()
+
+    # the time of the imports done by the interpreter itself, to subtract
+    startup = sum(measure('pass', args.runs).values())
+
+    print('%-12s %10s' % ('statement', 'ms'))
+    results = {}
+    for name, statement in sorted(STATEMENTS.items()):
+        times = measure(statement, args.runs)
+        results[name] = total = max(0, sum(times.values()) - startup)
+        print('%-12s %10.1f' % (name, total / 1000))
+        slowest = sorted(times.items(), key=lambda item: -item[1])
+        for module, time in slowest[:args.top]:
+            print('    %-30s %10.1f' % (module, time / 1000))
+        sys.stdout.flush()
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print('\nBaseline saved to %s' % args.save)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file),
+                                  args.tolerance)
+        if regressions:
+            print('\nRegressions against %s:' % args.compare)
+            for regression in regressions:
+                print('  ' + regression)
+            sys.exit(1)
+        print('\nNo regression against %s' % args.compare)
+
+
+if __name__ == '__main__':
+    main()
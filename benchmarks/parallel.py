@@ -0,0 +1,70 @@
+# coding: utf-8
+
+"""
+    A chain of CPU bound stages: g.parallel() segments vs one pmap() each.
+
+    With pmap(), each stage sends every item to a worker process and its
+    result back. A parallel segment sends each chunk once, runs all the
+    stages on it in the worker, and only sends back what's left.
+
+    Run with:
+
+        python benchmarks/parallel.py [--size N] [--workers N]
+"""
+
+from __future__ import print_function, division
+
+import argparse
+
+from ww import g
+
+from fusion import per_item
+
+
+def spin(x):
+    for _ in range(50):
+        x = (x * 7 + 3) % 1000003
+    return x
+
+
+def keep(x):
+    return x % 3
+
+
+def sequential(source):
+    return g(source).map(spin).filter(keep).map(spin).list()
+
+
+def with_pmap(source, workers):
+    return g(source).pmap(spin, workers, 'process').filter(keep).pmap(
+        spin, workers, 'process').list()
+
+
+def with_parallel(source, workers):
+    return g(source).parallel(workers).map(spin).filter(keep).map(
+        spin).sequential().list()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    source = range(args.size)
+    expected = sequential(source)
+    assert with_pmap(source, args.workers) == expected
+    assert with_parallel(source, args.workers) == expected
+
+    times = per_item([lambda: sequential(source),
+                      lambda: with_pmap(source, args.workers),
+                      lambda: with_parallel(source, args.workers)],
+                     args.size, repeat=3)
+    print('%-12s  %10s' % ('', 'ns/item'))
+    for name, duration in zip(('sequential', 'pmap', 'parallel'), times):
+        print('%-12s  %10.1f' % (name, duration))
+    print('parallel vs pmap: %.2fx' % (times[1] / times[2]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# coding: utf-8
+
+"""
+    Replacing a large table of words in a large text with s().replace().
+
+    Compares replacing the words one after the other, which scans the text
+    once per word, with single_pass=True, which merges them into one
+    alternation, and with literal=True, which merges them into a trie. The
+    text is built so that all the results are the same.
+
+    Run with:
+
+        python benchmarks/replace.py [--words N] [--size N]
+"""
+
+from __future__ import print_function, division
+
+import random
+import argparse
+import timeit
+
+from ww import s
+
+
+def random_word(rng, letters):
+    return ''.join(rng.choice(letters) for _ in range(rng.randint(4, 8)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--words', type=int, default=200,
+                        help='number of words to replace')
+    parser.add_argument('--size', type=int, default=1000000,
+                        help='number of characters of the text')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = set()
+    while len(words) < args.words:
+        words.add(random_word(rng, 'abcdefghij'))
+    # longest first, so that a word is replaced before its prefixes, and
+    # replacing them in turn or in one pass gives the same result
+    words = tuple(sorted(words, key=lambda word: (-len(word), word)))
+    substitutions = tuple(word.upper() for word in words)
+    # the other words have other letters, so they contain no word to replace
+    text = s(' '.join(rng.choice(words) if rng.random() < 0.2 else
+                      random_word(rng, 'klmnopqrst')
+                      for _ in range(args.size // 7)))
+
+    cases = [
+        ('sequential', lambda: text.replace(words, substitutions)),
+        ('single_pass', lambda: text.replace(words, substitutions,
+                                             single_pass=True)),
+        ('literal', lambda: text.replace(words, substitutions, literal=True,
+                                         single_pass=True)),
+    ]
+    expected = cases[0][1]()
+    print('%-12s  %10s  %12s' % ('', 'ms', 'vs sequential'))
+    reference = None
+    for name, func in cases:
+        assert func() == expected, name
+        duration = min(timeit.repeat(func, number=1, repeat=5))
+        reference = reference or duration
+        print('%-12s  %10.1f  %12.1fx' % (name, duration * 1000,
+                                          reference / duration))
+
+
+if __name__ == '__main__':
+    main()
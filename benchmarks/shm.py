@@ -0,0 +1,71 @@
+# coding: utf-8
+
+"""
+    Throughput of chunks of floats sent to worker processes.
+
+    Compares pickling array.array chunks to the workers with
+    ww.shm.shared_map(), which copies them into reused shared memory blocks
+    and only pickles a handle, and with a plain memcpy of the same data as
+    a reference. The workers only compute len(), to measure the transport.
+
+    Run with:
+
+        python benchmarks/shm.py [--size N] [--chunk N] [--workers N]
+"""
+
+from __future__ import print_function, division
+
+import array
+import argparse
+import timeit
+
+from ww.parallel import imap_chunks
+from ww.shm import shared_map
+
+
+def memcpy(chunks, block):
+    for chunk in chunks:
+        view = memoryview(chunk).cast('B')
+        block[:len(view)] = view
+    return len(chunks)
+
+
+def pickled(chunks, workers):
+    return sum(imap_chunks(len, chunks, workers, 'process'))
+
+
+def shared(chunks, size, workers):
+    return sum(shared_map(chunks, len, 'd', size, workers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--size', type=int, default=10000000)
+    parser.add_argument('--chunk', type=int, default=65536)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    data = array.array('d', range(args.size))
+    chunks = [data[i:i + args.chunk] for i in range(0, args.size, args.chunk)]
+    block = bytearray(args.chunk * data.itemsize)
+    megabytes = args.size * data.itemsize / 1e6
+
+    assert pickled(chunks, args.workers) == args.size
+    assert shared(chunks, args.chunk, args.workers) == args.size
+
+    results = [
+        ('memcpy', lambda: memcpy(chunks, block)),
+        ('pickled', lambda: pickled(chunks, args.workers)),
+        ('shared', lambda: shared(chunks, args.chunk, args.workers)),
+    ]
+    print('%-10s  %10s  %12s' % ('', 'MB/s', 'vs memcpy'))
+    reference = None
+    for name, func in results:
+        duration = min(timeit.repeat(func, number=1, repeat=5))
+        reference = reference or duration
+        print('%-10s  %10.0f  %11.1fx' % (name, megabytes / duration,
+                                          duration / reference))
+
+
+if __name__ == '__main__':
+    main()
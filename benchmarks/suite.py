@@ -0,0 +1,278 @@
+# coding: utf-8
+
+"""
+    Cost of the ww wrappers over the builtins and itertools they wrap.
+
+    Each case runs the same work with ww and with plain Python, at several
+    input sizes, and reports the time per item of both, their ratio, and
+    the memory peak of the ww version. Results can be saved as a baseline,
+    and later runs compared to it: a case is flagged when its ratio or its
+    memory peak grew by more than the tolerance. Ratios are compared rather
+    than times, so that a baseline stays meaningful on another machine.
+
+    Run with:
+
+        python benchmarks/suite.py [--sizes 1000,100000] [--filter g.]
+                                   [--save FILE] [--compare FILE]
+                                   [--tolerance 0.25]
+
+    It exits with status 1 if regressions are found.
+"""
+
+from __future__ import print_function, division
+
+import os
+import re
+import sys
+import json
+import argparse
+import itertools
+import tracemalloc
+
+from collections import deque
+
+from ww import g, s, f, l, d
+
+from fusion import per_item
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'baseline.json')
+
+SEPARATORS = s.compile('[,;]')
+
+
+def inc(x):
+    return x + 1
+
+
+def odd(x):
+    return x % 2
+
+
+def tens(x):
+    return x // 10
+
+
+def raw_chunks(data, size):
+    it = iter(data)
+    return list(iter(lambda: tuple(itertools.islice(it, size)), ()))
+
+
+def raw_window(data):
+    a, b, c = itertools.tee(data, 3)
+    next(b, None)
+    next(c, None)
+    next(c, None)
+    return list(zip(a, b, c))
+
+
+def format_with_f(size):
+    for x in range(size):
+        f('{x}-{x}')
+
+
+def format_raw(size):
+    for x in range(size):
+        '{x}-{x}'.format(x=x)
+
+
+def append_l(size):
+    lst = l()
+    for x in range(size):
+        lst.append(x)
+    return lst
+
+
+def append_raw(size):
+    lst = []
+    for x in range(size):
+        lst.append(x)
+    return lst
+
+
+# name: (setup(size) -> data, ww(data), raw(data))
+CASES = {
+    'g.chain': (
+        lambda size: list(range(size)),
+        lambda data: g(data).map(inc).filter(odd)[10:].list(),
+        lambda data: list(itertools.islice(filter(odd, map(inc, data)),
+                                           10, None)),
+    ),
+    'g.chunks': (
+        lambda size: list(range(size)),
+        lambda data: g(data).chunks(10).list(),
+        lambda data: raw_chunks(data, 10),
+    ),
+    'g.window': (
+        lambda size: list(range(size)),
+        lambda data: g(data).window(3).list(),
+        raw_window,
+    ),
+    'g.skip_duplicates': (
+        lambda size: [x % (size // 2 or 1) for x in range(size)],
+        lambda data: g(data).skip_duplicates().list(),
+        lambda data: list(dict.fromkeys(data)),
+    ),
+    'g.groupby': (
+        lambda size: list(range(size, 0, -1)),
+        lambda data: g(data).groupby(tens).list(),
+        lambda data: [(k, tuple(group)) for k, group in
+                      itertools.groupby(sorted(data, key=tens), tens)],
+    ),
+    'g.lasts': (
+        lambda size: list(range(size)),
+        lambda data: g(data).lasts(10).list(),
+        lambda data: list(deque(data, maxlen=10)),
+    ),
+    's.split': (
+        lambda size: ','.join(['word'] * size),
+        lambda text: s(text).split(',').list(),
+        lambda text: text.split(','),
+    ),
+    's.split_lines': (
+        lambda size: ['a,b;c'] * (size // 10),
+        lambda lines: [s(line).split('[,;]').list() for line in lines],
+        lambda lines: [re.split('[,;]', line) for line in lines],
+    ),
+    # same raw version for both, so that their ratios show what compiling
+    # the pattern once saves
+    's.replace_lines': (
+        lambda size: ['a,b;c'] * (size // 10),
+        lambda lines: [s(line).replace('[,;]', '-') for line in lines],
+        lambda lines: [re.sub('[,;]', '-', line) for line in lines],
+    ),
+    's.compile': (
+        lambda size: ['a,b;c'] * (size // 10),
+        lambda lines: [s(line).replace(SEPARATORS, '-') for line in lines],
+        lambda lines: [re.sub('[,;]', '-', line) for line in lines],
+    ),
+    's.replace': (
+        lambda size: ','.join(['word'] * size),
+        lambda text: s(text).replace(',', ';'),
+        lambda text: text.replace(',', ';'),
+    ),
+    's.join': (
+        lambda size: ['word'] * size,
+        lambda words: s(',').join(words),
+        lambda words: ','.join(words),
+    ),
+    'f': (
+        lambda size: size,
+        format_with_f,
+        format_raw,
+    ),
+    'l.append': (
+        lambda size: size,
+        append_l,
+        append_raw,
+    ),
+    'l.extend': (
+        lambda size: [list(range(10))] * (size // 10),
+        lambda lists: l().extend(*lists),
+        lambda lists: list(itertools.chain.from_iterable(lists)),
+    ),
+    'd.subset': (
+        lambda size: (d((x, x) for x in range(size)),
+                      list(range(0, size, 2))),
+        lambda data: data[0].subset(*data[1]),
+        lambda data: {key: data[0][key] for key in data[1]},
+    ),
+    'd.__add__': (
+        lambda size: (d((x, x) for x in range(size)),
+                      d((-x, x) for x in range(size))),
+        lambda data: data[0] + data[1],
+        lambda data: dict(itertools.chain(data[0].items(), data[1].items())),
+    ),
+}
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(name, size):
+    setup, with_ww, raw = CASES[name]
+    data = setup(size)
+    repeat = min(50, max(5, 1000000 // size))
+    ww_time, raw_time = per_item([lambda: with_ww(data), lambda: raw(data)],
+                                 size, repeat)
+    return {
+        'ww': ww_time,
+        'raw': raw_time,
+        'ratio': ww_time / raw_time,
+        'peak': peak_memory(lambda: with_ww(data)),
+        'raw_peak': peak_memory(lambda: raw(data)),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """ Return the descriptions of the regressions against the baseline """
+    regressions = []
+    for key, result in sorted(results.items()):
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if result['ratio'] > before['ratio'] * (1 + tolerance):
+            regressions.append('%s: ratio %.2f -> %.2f' % (
+                key, before['ratio'], result['ratio']))
+        if result['peak'] > before['peak'] * (1 + tolerance) + 4096:
+            regressions.append('%s: memory peak %d -> %d B' % (
+                key, before['peak'], result['peak']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma separated input sizes')
+    parser.add_argument('--filter', default='',
+                        help='only run the cases containing this string')
+    parser.add_argument('--save', metavar='FILE', nargs='?', const=BASELINE,
+                        help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', nargs='?',
+                        const=BASELINE, help='compare with a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='relative growth flagged as a regression')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    names = sorted(name for name in CASES if args.filter in name)
+
+    print('%-20s %8s  %12s %12s %7s  %12s %12s' % (
+        'case', 'size', 'ww ns/item', 'raw ns/item', 'ratio', 'ww peak',
+        'raw peak'))
+    results = {}
+    for name in names:
+        for size in sizes:
+            result = results['%s@%d' % (name, size)] = run_case(name, size)
+            print('%-20s %8d  %12.1f %12.1f %6.2fx  %10d B %10d B' % (
+                name, size, result['ww'], result['raw'], result['ratio'],
+                result['peak'], result['raw_peak']))
+            sys.stdout.flush()
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print('\nBaseline saved to %s' % args.save)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file),
+                                  args.tolerance)
+        if regressions:
+            print('\nRegressions against %s:' % args.compare)
+            for regression in regressions:
+                print('  ' + regression)
+            sys.exit(1)
+        print('\nNo regression against %s' % args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -49,7 +49,8 @@ setuptools.setup(
     package_dir={'': 'src'},
     install_requires=requirements,
     extras_require={
-        'dev': dev_requirements
+        'dev': dev_requirements,
+        'vector': ['numpy'],
     },
     setup_requires=['pytest-runner'],
     tests_require=dev_requirements,
@@ -2,11 +2,70 @@
 
 __version__ = "0.1.0"
 
-from .g import g  # noqa
-from .s import s, f  # noqa
-from .l import l  # noqa
-from .t import t  # noqa
-from .d import d  # noqa
+import sys
+import types
+import importlib
+
+# The wrappers and the submodule defining them. On Python 3.7+, the
+# submodule is only imported the first time the wrapper is used, by
+# __getattr__() below, so that "import ww" stays fast.
+EXPORTS = {
+    'g': 'g',
+    's': 's',
+    'f': 's',
+    'l': 'l',
+    't': 't',
+    'd': 'd',
+    'profile': 'profiling',
+}
+
+if sys.version_info >= (3, 6):
+    EXPORTS['ag'] = 'ag'
+
+# without it, "from ww import *" wouldn't see the wrappers not imported yet
+__all__ = sorted(EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module = EXPORTS[name]
+    except KeyError:
+        raise AttributeError("module %r has no attribute %r" % (__name__,
+                                                                name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
+
+
+class _Package(types.ModuleType):
+    """ The class of this module, to keep ww.g the wrapper, not ww/g.py """
+
+    def __setattr__(self, name, value):
+        # importing the submodule ww.g sets the attribute ww.g to it, which
+        # would hide the wrapper with the same name
+        if (isinstance(value, types.ModuleType) and
+                EXPORTS.get(name) == name and
+                value.__name__ == '%s.%s' % (__name__, name)):
+            value = getattr(value, name)
+        super(_Package, self).__setattr__(name, value)
+
+
+if sys.version_info >= (3, 7):
+    sys.modules[__name__].__class__ = _Package
+else:
+    from .g import g  # noqa
+    from .s import s, f  # noqa
+    from .l import l  # noqa
+    from .t import t  # noqa
+    from .d import d  # noqa
+    from .profiling import profile  # noqa
+
+    if sys.version_info >= (3, 6):
+        from .ag import ag  # noqa
 
 # TODO: wrapper for datetime
 # TODO: wrapper for path.py
@@ -0,0 +1,392 @@
+# coding: utf-8
+
+"""
+    Running aggregates, updated one batch of values at a time.
+
+    An accumulator holds the state of one aggregate (a count, a sum...) in
+    O(1) memory. It's fed lists of values with update(), and result()
+    returns the aggregate of everything it has seen so far. Feeding lists
+    lets the built-in accumulators delegate the loop to len(), sum(),
+    min() or max(), which run in C.
+
+    Custom accumulators subclass Accumulator and implement at least add()
+    and result().
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import operator
+
+from itertools import repeat
+
+from ww.utils import basestring
+
+try:
+    from typing import Any, Callable, Iterable, List  # noqa
+except ImportError:
+    pass
+
+
+class Accumulator(object):
+    """ Base class for accumulators """
+
+    def add(self, value):
+        # type: (Any) -> None
+        """ Take one more value into account """
+        raise NotImplementedError()
+
+    def update(self, values):
+        # type: (List) -> None
+        """ Take a list of values into account. Override it for speed. """
+        for value in values:
+            self.add(value)
+
+    def result(self):
+        # type: () -> Any
+        """ Return the aggregate of all the values seen so far """
+        raise NotImplementedError()
+
+
+class Count(Accumulator):
+    """
+        >>> acc = Count()
+        >>> acc.update(['a', 'b']); acc.add('c'); acc.result()
+        3
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+
+    def update(self, values):
+        self.count += len(values)
+
+    def result(self):
+        return self.count
+
+
+class Sum(Accumulator):
+    """
+        >>> acc = Sum()
+        >>> acc.update([1, 2]); acc.add(3); acc.result()
+        6
+    """
+
+    def __init__(self):
+        self.total = 0
+
+    def add(self, value):
+        self.total += value
+
+    def update(self, values):
+        self.total += sum(values)
+
+    def result(self):
+        return self.total
+
+
+class Min(Accumulator):
+    """
+        Result is None if there was no value.
+
+        >>> acc = Min()
+        >>> print(acc.result())
+        None
+        >>> acc.update([3, 1]); acc.add(2); acc.result()
+        1
+    """
+
+    best = staticmethod(min)
+
+    def __init__(self):
+        self.value = None
+        self.empty = True
+
+    def add(self, value):
+        if self.empty:
+            self.value = value
+            self.empty = False
+        else:
+            self.value = self.best(self.value, value)
+
+    def update(self, values):
+        if values:
+            self.add(self.best(values))
+
+    def result(self):
+        return self.value
+
+
+class Max(Min):
+    """
+        Result is None if there was no value.
+
+        >>> acc = Max()
+        >>> acc.update([3, 1]); acc.add(2); acc.result()
+        3
+    """
+
+    best = staticmethod(max)
+
+
+class Mean(Accumulator):
+    """
+        Result is None if there was no value.
+
+        >>> acc = Mean()
+        >>> acc.update([1, 2]); acc.add(6); acc.result()
+        3.0
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+
+    def update(self, values):
+        self.count += len(values)
+        self.total += sum(values)
+
+    def result(self):
+        if not self.count:
+            return None
+        return self.total / self.count
+
+
+class Var(Accumulator):
+    """
+        Variance, with Welford's algorithm to stay accurate in one pass.
+
+        Batches are combined with Chan's formula, so their own variance is
+        computed with C level loops.
+
+        Args:
+            ddof: the result is the sum of squared deviations divided by
+                  (count - ddof). Default to 1, for the sample variance
+                  like statistics.variance(). Use 0 for the population
+                  variance.
+
+        Result is None if count <= ddof.
+
+        >>> acc = Var()
+        >>> acc.update([2, 4, 4, 4]); acc.update([5, 5, 7, 9]); acc.result()
+        4.571428571428571
+        >>> acc = Var(ddof=0)
+        >>> for x in [2, 4, 4, 4, 5, 5, 7, 9]:
+        ...     acc.add(x)
+        >>> acc.result()
+        4.0
+    """
+
+    def __init__(self, ddof=1):
+        self.ddof = ddof
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def update(self, values):
+        count = len(values)
+        if not count:
+            return
+        mean = sum(values) / count
+        deviations = list(map(operator.sub, values, repeat(mean, count)))
+        m2 = sum(map(operator.mul, deviations, deviations))
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def result(self):
+        if self.count <= self.ddof:
+            return None
+        return self.m2 / (self.count - self.ddof)
+
+
+class Std(Var):
+    """
+        Standard deviation, see Var.
+
+        >>> acc = Std(ddof=0)
+        >>> acc.update([2, 4, 4, 4, 5, 5, 7, 9]); acc.result()
+        2.0
+    """
+
+    def result(self):
+        var = super(Std, self).result()
+        return None if var is None else var ** 0.5
+
+
+class First(Accumulator):
+    """
+        Result is None if there was no value.
+
+        >>> acc = First()
+        >>> acc.update([]); acc.update(['a', 'b']); acc.result()
+        'a'
+    """
+
+    def __init__(self):
+        self.value = None
+        self.empty = True
+
+    def add(self, value):
+        if self.empty:
+            self.value = value
+            self.empty = False
+
+    def update(self, values):
+        if values and self.empty:
+            self.add(values[0])
+
+    def result(self):
+        return self.value
+
+
+class Last(Accumulator):
+    """
+        Result is None if there was no value.
+
+        >>> acc = Last()
+        >>> acc.update(['a', 'b']); acc.update([]); acc.result()
+        'b'
+    """
+
+    def __init__(self):
+        self.value = None
+
+    def add(self, value):
+        self.value = value
+
+    def update(self, values):
+        if values:
+            self.value = values[-1]
+
+    def result(self):
+        return self.value
+
+
+ACCUMULATORS = {
+    'count': Count,
+    'sum': Sum,
+    'min': Min,
+    'max': Max,
+    'mean': Mean,
+    'var': Var,
+    'std': Std,
+    'first': First,
+    'last': Last,
+}
+
+
+def get_factory(spec):
+    # type: (Any) -> Callable[[], Accumulator]
+    """Return a callable creating a new accumulator from spec
+
+    Args:
+        spec: the name of a built-in accumulator from ACCUMULATORS, or
+              a callable returning a new Accumulator, such as a subclass.
+
+    Example:
+
+        >>> get_factory('sum')
+        <class 'ww.accumulators.Sum'>
+        >>> get_factory('median')  # doctest: +ELLIPSIS
+        Traceback (most recent call last):
+        ...
+        ValueError: Unknown accumulator 'median', use a callable or one of: ...
+    """
+    if isinstance(spec, basestring):
+        try:
+            return ACCUMULATORS[spec]
+        except KeyError:
+            raise ValueError("Unknown accumulator %r, use a callable or "
+                             "one of: %s" % (str(spec),
+                                             ', '.join(sorted(ACCUMULATORS))))
+    if not callable(spec):
+        raise TypeError("An accumulator spec must be a string or a callable, "
+                        "not %r" % (spec,))
+    return spec
+
+
+def parse_specs(specs):
+    # type: (dict) -> list
+    """Turn {name: spec} into a list of (name, factory, getter)
+
+    Each spec can be:
+
+        - the name of a built-in accumulator, or a callable returning an
+          Accumulator, to aggregate the items themselves;
+        - a tuple (accumulator, getter), to aggregate getter(item);
+        - True, to use the built-in accumulator with the same name.
+
+    Example:
+
+        >>> parse_specs({'n': 'count'})
+        [('n', <class 'ww.accumulators.Count'>, None)]
+        >>> parse_specs({'sum': True})
+        [('sum', <class 'ww.accumulators.Sum'>, None)]
+    """
+    parsed = []
+    for name, spec in specs.items():
+        if spec is True:
+            spec = name
+        getter = None
+        if isinstance(spec, tuple):
+            spec, getter = spec
+        parsed.append((name, get_factory(spec), getter))
+    return parsed
+
+
+class Aggregates(object):
+    """Several accumulators fed with the same items
+
+    Accumulators are gathered by getter, so that it's called only once
+    per item even when several aggregates use it.
+
+    Example:
+
+        >>> aggs = Aggregates(parse_specs({'n': 'count', 'total': 'sum'}))
+        >>> aggs.update([1, 2, 3])
+        >>> sorted(aggs.results().items())
+        [('n', 3), ('total', 6)]
+    """
+
+    def __init__(self, specs):
+        # type: (list) -> None
+        self.named = []
+        self.groups = []
+        for name, factory, getter in specs:
+            accumulator = factory()
+            self.named.append((name, accumulator))
+            for known, accumulators in self.groups:
+                if known is getter:
+                    accumulators.append(accumulator)
+                    break
+            else:
+                self.groups.append((getter, [accumulator]))
+
+    def update(self, items):
+        # type: (List) -> None
+        for getter, accumulators in self.groups:
+            values = items if getter is None else list(map(getter, items))
+            for accumulator in accumulators:
+                accumulator.update(values)
+
+    def results(self):
+        # type: () -> dict
+        """ Return {name: result}, in the order of the specs """
+        return {name: acc.result() for name, acc in self.named}
@@ -0,0 +1,472 @@
+# coding: utf-8
+
+"""
+    Async counterpart of g(): a wrapper for async iterables.
+
+    Requires Python 3.6+, so it's not imported on older versions.
+"""
+
+import asyncio
+import inspect
+
+try:
+    from typing import Any, Union, Callable, Iterable, AsyncIterable  # noqa
+except ImportError:
+    pass
+
+from collections import deque
+
+from ww.g import g
+
+
+_NOTHING = object()
+
+try:
+    _running_loop = asyncio.get_running_loop
+except AttributeError:  # Python < 3.7, where it's the same in a coroutine
+    _running_loop = asyncio.get_event_loop
+
+
+async def maybe_await(value):
+    # type: (Any) -> Any
+    """ Await value if it's awaitable, or return it as-is. """
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def from_iterable(iterable):
+    # type: (Iterable) -> AsyncIterable
+    """ Yield items from a regular iterable. Don't use it if it blocks. """
+    for item in iterable:
+        yield item
+
+
+async def from_blocking(iterable, executor=None):
+    # type: (Iterable, Any) -> AsyncIterable
+    """Yield items from a blocking iterable, without blocking the event loop.
+
+    Each call to next() on the iterable runs in `executor`, which is the
+    default executor of the event loop if None.
+    """
+    loop = _running_loop()
+    iterator = iter(iterable)
+    while True:
+        item = await loop.run_in_executor(executor, next, iterator, _NOTHING)
+        if item is _NOTHING:
+            return
+        yield item
+
+
+async def chain(*aiterables):
+    # type: (*AsyncIterable) -> AsyncIterable
+    """ Async version of itertools.chain() """
+    for aiterable in aiterables:
+        async for item in aiterable:
+            yield item
+
+
+def ensure_aiterable(iterable):
+    # type: (Union[Iterable, AsyncIterable]) -> AsyncIterable
+    """ Return iterable if it's async, or an async version of it. """
+    if hasattr(iterable, '__aiter__'):
+        return iterable
+    return from_iterable(iterable)
+
+
+async def amap(aiterable, func):
+    # type: (AsyncIterable, Callable) -> AsyncIterable
+    """ Yield func(item), awaiting the result if func is a coroutine. """
+    async for item in aiterable:
+        yield await maybe_await(func(item))
+
+
+async def afilter(aiterable, func):
+    # type: (AsyncIterable, Callable) -> AsyncIterable
+    """ Yield items for which func(item) is true. func can be a coroutine. """
+    async for item in aiterable:
+        if await maybe_await(func(item)):
+            yield item
+
+
+async def map_concurrent(aiterable, coro_func, limit=10, ordered=True):
+    # type: (AsyncIterable, Callable, int, bool) -> AsyncIterable
+    """Yield await coro_func(item), running up to `limit` coroutines at once.
+
+    Items are read from aiterable only when there is room for a new
+    coroutine. If the consumer stops early, pending coroutines are cancelled.
+    """
+    if limit < 1:
+        raise ValueError("limit should be >= 1, not %s" % limit)
+
+    iterator = aiterable.__aiter__()
+    pending = deque()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < limit:
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                else:
+                    pending.append(asyncio.ensure_future(coro_func(item)))
+
+            if not pending:
+                return
+
+            if ordered:
+                yield await pending.popleft()
+                continue
+
+            done, _ = await asyncio.wait(pending,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            # tasks done at the same time are yielded in the input order
+            for task in [task for task in pending if task in done]:
+                pending.remove(task)
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def achunks(aiterable, chunksize, cast=tuple):
+    # type: (AsyncIterable, int, Callable) -> AsyncIterable
+    """ Async version of ww.iterable.chunks() """
+    chunk = []
+    async for item in aiterable:
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield cast(chunk)
+            chunk = []
+    if chunk:
+        yield cast(chunk)
+
+
+async def awindow(aiterable, size=2, cast=tuple):
+    # type: (AsyncIterable, int, Callable) -> AsyncIterable
+    """ Async version of ww.iterable.window() """
+    d = deque(maxlen=size)
+    iterator = aiterable.__aiter__()
+    async for item in iterator:
+        d.append(item)
+        if len(d) == size:
+            break
+
+    yield cast(d) if cast else d
+    async for item in iterator:
+        d.append(item)
+        yield cast(d) if cast else d
+
+
+async def askip_duplicates(aiterable, key=None, fingerprints=None):
+    # type: (AsyncIterable, Callable, Any) -> AsyncIterable
+    """ Async version of ww.iterable.skip_duplicates() """
+    fingerprints = set() if fingerprints is None else fingerprints
+    key = key or (lambda x: x)
+    async for item in aiterable:
+        fingerprint = key(item)
+        if fingerprint not in fingerprints:
+            yield item
+            fingerprints.add(fingerprint)
+
+
+async def afirsts(aiterable, items=1, default=None):
+    # type: (AsyncIterable, int, Any) -> AsyncIterable
+    """ Async version of ww.iterable.firsts() """
+    try:
+        items = int(items)
+        assert items >= 0
+    except (TypeError, AssertionError):
+        raise ValueError("items should be set so that int(items) >= 0")
+
+    count = 0
+    if items:
+        async for item in aiterable:
+            yield item
+            count += 1
+            if count == items:
+                break
+
+    for _ in range(items - count):
+        yield default
+
+
+def _as_condition(value):
+    if callable(value):
+        return value
+    return lambda x: x == value
+
+
+async def astarts_when(aiterable, condition):
+    # type: (AsyncIterable, Union[Callable, Any]) -> AsyncIterable
+    """ Async version of ww.iterable.starts_when() """
+    condition = _as_condition(condition)
+    iterator = aiterable.__aiter__()
+    async for item in iterator:
+        if condition(item):
+            yield item
+            break
+    async for item in iterator:
+        yield item
+
+
+async def astops_when(aiterable, condition):
+    # type: (AsyncIterable, Union[Callable, Any]) -> AsyncIterable
+    """ Async version of ww.iterable.stops_when() """
+    condition = _as_condition(condition)
+    async for item in aiterable:
+        if condition(item):
+            return
+        yield item
+
+
+async def aislice(aiterable, start=0, stop=None, step=1):
+    # type: (AsyncIterable, int, int, int) -> AsyncIterable
+    """ Async version of itertools.islice() """
+    if stop is not None and stop <= start:
+        return
+
+    index = -1
+    async for item in aiterable:
+        index += 1
+        if index >= start and not (index - start) % step:
+            yield item
+        # don't consume more than islice() would
+        if stop is not None and index + 1 >= stop:
+            return
+
+
+def aslice(aiterable, start=0, stop=None, step=1):
+    # type: (AsyncIterable, Any, Any, int) -> AsyncIterable
+    """ Async version of ww.iterable.iterslice() """
+    if step < 0:
+        raise ValueError("The step can not be negative: '%s' given" % step)
+
+    if not isinstance(start, int):
+
+        # [callable:callable]
+        if not isinstance(stop, int) and stop:
+            return astops_when(astarts_when(aiterable, start), stop)
+
+        # [callable:int]
+        return astarts_when(aislice(aiterable, 0, stop, step), start)
+
+    # [int:callable]
+    if not isinstance(stop, int) and stop:
+        return astops_when(aislice(aiterable, start, None, step), stop)
+
+    # [int:int]
+    return aislice(aiterable, start, stop, step)
+
+
+class AsyncIterableWrapper:
+
+    def __init__(self, iterable, *args):
+        # type: (Union[Iterable, AsyncIterable], *Any) -> None
+        """Initialize self.iterator to an async iterator on iterable.
+
+        Regular iterables are accepted and iterated as-is in the event
+        loop. Wrap blocking ones in g() first: g.__aiter__ runs them in
+        an executor.
+
+        If several iterables are passed, they are concatenated.
+
+        Example:
+
+            >>> async def main():
+            ...     return await ag(range(3), "ab").list()
+            >>> asyncio.run(main())
+            [0, 1, 2, 'a', 'b']
+        """
+        if args:
+            iterables = (iterable,) + args
+            iterable = chain(*(ensure_aiterable(x) for x in iterables))
+        self.iterator = ensure_aiterable(iterable).__aiter__()
+
+    def __aiter__(self):
+        return self.iterator
+
+    def __anext__(self):
+        return self.iterator.__anext__()
+
+    async def next(self, default=_NOTHING):
+        # type: (Any) -> Any
+        """ Return the next item or default, or raise StopAsyncIteration """
+        try:
+            return await self.iterator.__anext__()
+        except StopAsyncIteration:
+            if default is _NOTHING:
+                raise
+            return default
+
+    def __getitem__(self, index):
+        # type: (Union[int, slice, Callable]) -> Any
+        """Act like [x] or [x:y:z] on an async generator. Warnings apply.
+
+        With an int or a callable, return a coroutine resolving to the item.
+        With a slice, return an ag() object.
+
+        Example:
+
+            >>> async def main():
+            ...     return (await ag(range(10))[3],
+            ...             await ag(range(10))[2:8:2].list(),
+            ...             await ag(range(10))[lambda x: x > 4])
+            >>> asyncio.run(main())
+            (3, [2, 4, 6], 5)
+        """
+        if isinstance(index, int):
+            return self._at_index(index)
+
+        if callable(index):
+            return self._first_true(index)
+
+        try:
+            start = index.start or 0
+            step = index.step or 1
+            stop = index.stop
+        except AttributeError:
+            raise ValueError('Indexing works only with integers or callables')
+
+        return ag(aslice(self.iterator, start, stop, step))
+
+    async def _at_index(self, index):
+        if index < 0:
+            last_items = deque(maxlen=abs(index))
+            async for item in self.iterator:
+                last_items.append(item)
+            if len(last_items) == abs(index):
+                return last_items.popleft()
+        else:
+            async for item in aislice(self.iterator, index, index + 1):
+                return item
+        raise IndexError('Index "%d" out of range' % index)
+
+    async def _first_true(self, func):
+        async for item in self.iterator:
+            if func(item):
+                return item
+        raise IndexError('No match for %s' % func)
+
+    def map(self, func):
+        # type: (Callable) -> AsyncIterableWrapper
+        """Apply func to each item then wrap in ag()
+
+        func can be a regular function or a coroutine function, in which
+        case each call is awaited before the next one. Use
+        map_concurrent() to run several of them at once.
+        """
+        return ag(amap(self.iterator, func))
+
+    def filter(self, func):
+        # type: (Callable) -> AsyncIterableWrapper
+        """ Keep items for which func(item) is true, func can be async. """
+        return ag(afilter(self.iterator, func))
+
+    def map_concurrent(self, coro_func, limit=10, ordered=True):
+        # type: (Callable, int, bool) -> AsyncIterableWrapper
+        """Apply coro_func to each item, running up to `limit` at once.
+
+        Args:
+            coro_func: a coroutine function.
+            limit: the max number of coroutines running at the same time.
+            ordered: if False, yield results as soon as they are ready
+                     instead of in the input order.
+
+        Example:
+
+            >>> async def double(x):
+            ...     await asyncio.sleep(0.01 * (3 - x))
+            ...     return x * 2
+            >>> async def main():
+            ...     return (await ag(range(3)).map_concurrent(double).list(),
+            ...             await ag(range(3)).map_concurrent(
+            ...                 double, ordered=False).list())
+            >>> asyncio.run(main())
+            ([0, 2, 4], [4, 2, 0])
+        """
+        return ag(map_concurrent(self.iterator, coro_func, limit, ordered))
+
+    def chunks(self, chunksize, cast=tuple):
+        # type: (int, Callable) -> AsyncIterableWrapper
+        """ Yields items from the async iterator in iterable chunks. """
+        return ag(achunks(self.iterator, chunksize, cast))
+
+    def window(self, size=2, cast=tuple):
+        # type: (int, Callable) -> AsyncIterableWrapper
+        """
+        Yields iterms by bunch of a given size, but rolling only one item
+        in and out at a time when iterating.
+        """
+        return ag(awindow(self.iterator, size, cast))
+
+    def skip_duplicates(self, key=lambda x: x, fingerprints=None):
+        # type: (Callable, Any) -> AsyncIterableWrapper
+        """ Skip items that have a fingerprint already seen. """
+        return ag(askip_duplicates(self.iterator, key, fingerprints))
+
+    def firsts(self, items=1, default=None):
+        # type: (int, Any) -> AsyncIterableWrapper
+        """ Lazily return the first x items from this iterable or default. """
+        return ag(afirsts(self.iterator, items, default))
+
+    def to_g(self, loop=None):
+        # type: (asyncio.AbstractEventLoop) -> g
+        """Return a blocking g() iterating over this async iterable.
+
+        Args:
+            loop: an event loop running in another thread, to run the async
+                  iteration in. If None, a private event loop is created and
+                  closed once the iteration is over. Don't call it from
+                  a coroutine then, as it would block the running loop.
+
+        Example:
+
+            >>> ag(range(3)).map(str).to_g().list()
+            ['0', '1', '2']
+        """
+        if loop is None:
+            return g(_iter_in_new_loop(self.iterator))
+        return g(_iter_in_loop(self.iterator, loop))
+
+    def __repr__(self):
+        return "<AsyncIterableWrapper generator>"
+
+    # DO NOT MOVE THOSE METHODS UPPER as they would shadow the builtins inside
+    async def list(self):
+        # TODO: cast to l()
+        return [item async for item in self.iterator]
+
+
+def _iter_in_new_loop(aiterator):
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(aiterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def _iter_in_loop(aiterator, loop):
+    while True:
+        future = asyncio.run_coroutine_threadsafe(_anext(aiterator), loop)
+        item = future.result()
+        if item is _NOTHING:
+            return
+        yield item
+
+
+async def _anext(aiterator):
+    try:
+        return await aiterator.__anext__()
+    except StopAsyncIteration:
+        return _NOTHING
+
+
+# expose AsyncIterableWrapper the shortcut "ag"
+ag = AsyncIterableWrapper
@@ -0,0 +1,164 @@
+# coding: utf-8
+
+"""
+    Iterables recording the items of a one-time source to replay them.
+
+    Unlike itertools.tee(), copies don't have to be created upfront, the
+    original stays usable, and once the recorded items go over a memory
+    budget, they are moved to a compressed temporary file.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import zlib
+import pickle
+import bisect
+import itertools
+import tempfile
+
+try:
+    from typing import Any, Iterable, Iterator  # noqa
+except ImportError:
+    pass
+
+from ww.utils import parse_size, estimate_size
+
+# Items are spilled by blocks, each one pickled and compressed at once
+BLOCK_SIZE = 1024
+
+
+class CachedIterable(object):
+    """Replayable iterable reading the source only once
+
+    Each iteration yields all the items of the source from the start. The
+    source is read lazily, only as far as the furthest iteration, so
+    several iterations can be in progress at the same time.
+
+    Args:
+        iterable: the source, read only once.
+        max_memory: the memory budget for recorded items, in bytes, or a
+                    string such as "512M". Above it, items are pickled and
+                    compressed to a temporary file, so they must be
+                    picklable. If None, everything is kept in memory.
+        spill_dir: where to create the temporary file. Default to the
+                   system temporary directory.
+
+    Example:
+
+        >>> cached = CachedIterable(x * 2 for x in range(4))
+        >>> list(cached), list(cached)
+        ([0, 2, 4, 6], [0, 2, 4, 6])
+        >>> spilled = CachedIterable(iter(range(1000)), max_memory='1k')
+        >>> sum(spilled) == sum(spilled) == 499500
+        True
+    """
+
+    def __init__(self, iterable, max_memory=None, spill_dir=None):
+        # type: (Iterable, Any, str) -> None
+        self.source = iter(iterable)
+        self.max_memory = None if max_memory is None else parse_size(
+            max_memory)
+        self.spill_dir = spill_dir
+        self.exhausted = False
+
+        # the first "spilled" items are in the spill file, the rest in memory
+        self.memory = []
+        self.memory_size = 0
+        self.spill_file = None
+        self.spilled = 0
+        self.blocks = []  # (offset, size) in the file for each block
+        self.block_starts = []  # index of the first item of each block
+
+    def __iter__(self):
+        # type: () -> Iterator
+        position = 0
+        while True:
+            if position < self.spilled:
+                for item in self._read_block(position):
+                    position += 1
+                    yield item
+                continue
+
+            memory = self.memory
+            index = position - self.spilled
+            if self.exhausted:
+                # no more items can be spilled, memory won't change anymore
+                for item in itertools.islice(memory, index, None):
+                    yield item
+                return
+
+            if index >= len(memory) and not self._record_next():
+                continue
+            position += 1
+            yield memory[index]
+
+    def _record_next(self):
+        # type: () -> bool
+        """Read one more item from the source and record it
+
+        Return False if the source is exhausted or the item was spilled
+        right away.
+        """
+        try:
+            item = next(self.source)
+        except StopIteration:
+            self.exhausted = True
+            return False
+
+        self.memory.append(item)
+        if self.max_memory is not None:
+            self.memory_size += estimate_size(item)
+            if self.memory_size > self.max_memory:
+                self._spill()
+                return False
+        return True
+
+    def _spill(self):
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(dir=self.spill_dir,
+                                                     prefix='ww-cache-')
+        spill_file = self.spill_file
+        spill_file.seek(0, 2)
+        for start in range(0, len(self.memory), BLOCK_SIZE):
+            block = self.memory[start:start + BLOCK_SIZE]
+            data = zlib.compress(pickle.dumps(block, pickle.HIGHEST_PROTOCOL))
+            self.blocks.append((spill_file.tell(), len(data)))
+            self.block_starts.append(self.spilled)
+            spill_file.write(data)
+            self.spilled += len(block)
+        self.memory = []
+        self.memory_size = 0
+
+    def _read_block(self, position):
+        # type: (int) -> list
+        """ Return the spilled items from position to the end of its block """
+        i = bisect.bisect_right(self.block_starts, position) - 1
+        offset, size = self.blocks[i]
+        self.spill_file.seek(offset)
+        block = pickle.loads(zlib.decompress(self.spill_file.read(size)))
+        return block[position - self.block_starts[i]:]
+
+    @property
+    def recorded(self):
+        # type: () -> int
+        """ Number of items read from the source so far """
+        return self.spilled + len(self.memory)
+
+    def __repr__(self):
+        return "<CachedIterable: %s items recorded, %s spilled%s>" % (
+            self.recorded, self.spilled, '' if self.exhausted else ', reading')
+
+    def close(self):
+        """ Delete the spill file. The cache can't be iterated anymore. """
+        if self.spill_file is not None:
+            self.spill_file.close()
+        self.exhausted = True
+        self.memory = []
+        self.spilled = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,136 @@
+# coding: utf-8
+
+"""
+    Sort iterables that don't fit in memory.
+
+    Items are sorted by runs fitting in a memory budget. Each run is pickled
+    to a temporary file, and the runs are then merged lazily with a heap,
+    so only one block of items per run is in memory at the same time.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import pickle
+import itertools
+
+try:
+    from typing import Any, Callable, Iterable, IO  # noqa
+except ImportError:
+    pass
+
+from ww.utils import parse_size, estimate_size, merge_sorted
+
+# Items are pickled by blocks, as one dump per item is much slower
+BLOCK_SIZE = 1024
+
+# Max number of runs merged at once, to stay under the open files limit
+MAX_FAN_IN = 64
+
+
+def write_run(items, spill_dir=None):
+    # type: (Iterable, str) -> IO
+    """Pickle items by blocks into a temporary file and return it
+
+    The file is deleted as soon as it's closed.
+    """
+    import tempfile  # slow to import, and only needed to spill
+    run = tempfile.TemporaryFile(dir=spill_dir, prefix='ww-sort-')
+    items = iter(items)
+    while True:
+        block = list(itertools.islice(items, BLOCK_SIZE))
+        if not block:
+            break
+        pickle.dump(block, run, pickle.HIGHEST_PROTOCOL)
+    return run
+
+
+def read_run(run):
+    # type: (IO) -> Iterable
+    """ Yield the items pickled in this run, loading one block at a time """
+    run.seek(0)
+    while True:
+        try:
+            block = pickle.load(run)
+        except EOFError:
+            return
+        for item in block:
+            yield item
+
+
+def _merge_files(runs, key, reverse, spill_dir):
+    # merge consecutive runs together, keeping their order for stability,
+    # until we can open all the remaining ones at once
+    while len(runs) > MAX_FAN_IN:
+        merged = []
+        for i in range(0, len(runs), MAX_FAN_IN):
+            group = runs[i:i + MAX_FAN_IN]
+            streams = [read_run(run) for run in group]
+            merged.append(write_run(merge_sorted(streams, key, reverse),
+                                    spill_dir))
+            for run in group:
+                run.close()
+        runs[:] = merged
+
+
+def external_sorted(iterable, key=None, reverse=False, max_memory=None,
+                    spill_dir=None):
+    # type: (Iterable, Callable, bool, Any, str) -> Iterable
+    """Lazily yield the items of iterable sorted, spilling to disk if needed
+
+    Like sorted(), the sort is stable. If the items fit in max_memory,
+    nothing is written to disk.
+
+    Args:
+        iterable: the items to sort. They must be picklable if they don't
+                  fit in memory.
+        key: same as for sorted().
+        reverse: same as for sorted().
+        max_memory: the memory budget, in bytes, for the items. Can be a
+                    string such as "512M". It's based on an estimation of
+                    the size of the items, see ww.utils.estimate_size(). If
+                    None, everything is sorted in memory.
+        spill_dir: where to create the temporary files. Default to the
+                   system temporary directory.
+
+    Example:
+
+        >>> list(external_sorted([3, 1, 2, 0], max_memory=50))
+        [0, 1, 2, 3]
+        >>> list(external_sorted('aBcD', key=str.lower, reverse=True,
+        ...                      max_memory=50))
+        ['D', 'c', 'B', 'a']
+    """
+    if max_memory is None:
+        for item in sorted(iterable, key=key, reverse=reverse):
+            yield item
+        return
+
+    max_memory = parse_size(max_memory)
+    runs = []
+    try:
+        run = []
+        size = 0
+        for item in iterable:
+            run.append(item)
+            size += estimate_size(item)
+            if size >= max_memory:
+                run.sort(key=key, reverse=reverse)
+                runs.append(write_run(run, spill_dir))
+                run = []
+                size = 0
+
+        # the last run is still in memory, no need to write it
+        run.sort(key=key, reverse=reverse)
+        if not runs:
+            for item in run:
+                yield item
+            return
+
+        _merge_files(runs, key, reverse, spill_dir)
+        streams = [read_run(f) for f in runs] + [iter(run)]
+        for item in merge_sorted(streams, key, reverse):
+            yield item
+    finally:
+        for f in runs:
+            f.close()
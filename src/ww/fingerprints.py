@@ -0,0 +1,328 @@
+# coding: utf-8
+
+"""
+    Bounded memory stores for skip_duplicates() fingerprints.
+
+    skip_duplicates() only needs `key in store` and `store.add(key)`, so by
+    default it uses a set(), which grows with every distinct key. These
+    stores trade exactness for a fixed memory budget:
+
+        - BloomFilter: fixed size, may wrongly say a new key was already
+          seen (and skip it), with a configurable probability.
+        - ScalableBloomFilter: same, but grows as needed while keeping the
+          overall error rate under the target.
+        - LRUStore: exact, but only remembers the last N keys.
+        - TimeWindowStore: exact, but only remembers keys for T seconds.
+
+    They all expose `memory` (estimated bytes used) and `error_rate` (the
+    estimated probability that a new key is reported as seen).
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import sys
+import math
+import time
+
+from collections import OrderedDict
+
+try:
+    from typing import Any, Callable  # noqa
+except ImportError:
+    pass
+
+from ww.utils import parse_size, estimate_size
+
+_MASK = 2 ** 64 - 1
+
+
+def _mix(key):
+    # type: (Any) -> int
+    # hash() of small ints is the int itself, which would put close keys
+    # on close bits: scramble it with the splitmix64 finalizer.
+    x = hash(key) & _MASK
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & _MASK
+    return x ^ (x >> 31)
+
+
+class BloomFilter(object):
+    """Fixed size set of keys that may give false positives
+
+    Args:
+        capacity: the number of keys to store before the error rate goes
+                  over `error_rate`.
+        error_rate: the target probability of false positives.
+        max_memory: a size in bytes, or a string such as "64M". If given,
+                    the filter uses that much memory and the capacity
+                    is computed from it instead.
+
+    Example:
+
+        >>> bloom = BloomFilter(1000, error_rate=0.01)
+        >>> bloom.add('a')
+        >>> 'a' in bloom, 'b' in bloom
+        (True, False)
+        >>> bloom.memory < 2000
+        True
+    """
+
+    def __init__(self, capacity=None, error_rate=0.001, max_memory=None):
+        # type: (int, float, Any) -> None
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1, not %s" %
+                             error_rate)
+
+        ln2 = math.log(2)
+        if max_memory is not None:
+            size = parse_size(max_memory) * 8
+            capacity = int(size * ln2 ** 2 / -math.log(error_rate))
+        elif capacity is not None:
+            size = int(math.ceil(capacity * -math.log(error_rate) / ln2 ** 2))
+        else:
+            raise TypeError("BloomFilter needs a capacity or a max_memory")
+
+        if capacity < 1 or size < 8:
+            raise ValueError("BloomFilter is too small to store anything")
+
+        self.capacity = capacity
+        self.target_error_rate = error_rate
+        self.size = size
+        self.hashes = max(1, int(round(size / capacity * ln2)))
+        self.bits = bytearray((size + 7) // 8)
+        self.bits_set = 0
+        self.count = 0
+
+    def _positions(self, key):
+        x = _mix(key)
+        h1, h2 = x & 0xffffffff, (x >> 32) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            byte = bits[pos >> 3]
+            if not byte & mask:
+                bits[pos >> 3] = byte | mask
+                self.bits_set += 1
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def memory(self):
+        # type: () -> int
+        return sys.getsizeof(self.bits)
+
+    @property
+    def error_rate(self):
+        # type: () -> float
+        """ Estimate the current false positive rate from the bits set """
+        return (self.bits_set / self.size) ** self.hashes
+
+    @property
+    def full(self):
+        # type: () -> bool
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter(object):
+    """Bloom filter adding bigger filters when the current one is full
+
+    Each new filter is `growth` times bigger than the previous one, with
+    an error rate `tightening` times smaller, so that the overall error
+    rate converges to less than `error_rate` whatever the number of keys.
+
+    Args:
+        initial_capacity: the capacity of the first filter.
+        error_rate: the target probability of false positives.
+        growth: the capacity ratio between a filter and the previous one.
+        tightening: the error rate ratio between a filter and the
+                    previous one.
+
+    Example:
+
+        >>> bloom = ScalableBloomFilter(100)
+        >>> for i in range(1000):
+        ...     bloom.add(i)
+        >>> len(bloom.filters)
+        4
+        >>> bloom.error_rate < 0.001
+        True
+    """
+
+    def __init__(self, initial_capacity=1000, error_rate=0.001, growth=2,
+                 tightening=0.9):
+        # type: (int, float, int, float) -> None
+        if not 0 < tightening < 1:
+            raise ValueError("tightening must be between 0 and 1, not %s" %
+                             tightening)
+        self.initial_capacity = initial_capacity
+        self.target_error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        # the sum of the error rates of the filters converges to error_rate
+        self.filters = [BloomFilter(initial_capacity,
+                                    error_rate * (1 - tightening))]
+
+    def __contains__(self, key):
+        for bloom in reversed(self.filters):
+            if key in bloom:
+                return True
+        return False
+
+    def add(self, key):
+        bloom = self.filters[-1]
+        if bloom.full:
+            bloom = BloomFilter(bloom.capacity * self.growth,
+                                bloom.target_error_rate * self.tightening)
+            self.filters.append(bloom)
+        bloom.add(key)
+
+    def __len__(self):
+        return sum(len(bloom) for bloom in self.filters)
+
+    @property
+    def memory(self):
+        # type: () -> int
+        return sum(bloom.memory for bloom in self.filters)
+
+    @property
+    def error_rate(self):
+        # type: () -> float
+        success = 1.0
+        for bloom in self.filters:
+            success *= 1 - bloom.error_rate
+        return 1 - success
+
+
+class LRUStore(object):
+    """Exact store remembering only the `size` most recently seen keys
+
+    Checking a key that is in the store refreshes it, so a key repeated
+    at least every `size` keys is always detected as a duplicate.
+
+    Example:
+
+        >>> store = LRUStore(2)
+        >>> for key in 'abc':
+        ...     store.add(key)
+        >>> 'a' in store, 'b' in store, 'c' in store
+        (False, True, True)
+    """
+
+    error_rate = 0.0
+
+    def __init__(self, size):
+        # type: (int) -> None
+        if size < 1:
+            raise ValueError("size must be >= 1, not %s" % size)
+        self.size = size
+        self.keys = OrderedDict()
+        self.keys_memory = 0
+
+    def __contains__(self, key):
+        keys = self.keys
+        if key in keys:
+            keys[key] = keys.pop(key)  # move to the end
+            return True
+        return False
+
+    def add(self, key):
+        keys = self.keys
+        if key in keys:
+            keys[key] = keys.pop(key)
+            return
+        keys[key] = None
+        self.keys_memory += estimate_size(key)
+        if len(keys) > self.size:
+            oldest, _ = keys.popitem(last=False)
+            self.keys_memory -= estimate_size(oldest)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def memory(self):
+        # type: () -> int
+        return sys.getsizeof(self.keys) + self.keys_memory
+
+
+class TimeWindowStore(object):
+    """Exact store remembering keys for `seconds` after they were added
+
+    A duplicate is detected only if the key was added less than `seconds`
+    ago. Seeing it again doesn't extend the window, so a key can go
+    through at most once every `seconds`.
+
+    Args:
+        seconds: how long keys are remembered.
+        clock: a callable returning the current time in seconds. Default
+               to time.monotonic().
+
+    Example:
+
+        >>> now = [0]
+        >>> store = TimeWindowStore(10, clock=lambda: now[0])
+        >>> store.add('a')
+        >>> now[0] = 5
+        >>> 'a' in store
+        True
+        >>> now[0] = 10
+        >>> 'a' in store
+        False
+    """
+
+    error_rate = 0.0
+
+    def __init__(self, seconds, clock=None):
+        # type: (float, Callable[[], float]) -> None
+        if seconds <= 0:
+            raise ValueError("seconds must be > 0, not %s" % seconds)
+        self.seconds = seconds
+        self.clock = clock or getattr(time, 'monotonic', time.time)
+        self.keys = OrderedDict()  # key -> time added, oldest first
+        self.keys_memory = 0
+
+    def _expire(self, now):
+        keys = self.keys
+        deadline = now - self.seconds
+        while keys:
+            key, added = next(iter(keys.items()))
+            if added > deadline:
+                break
+            del keys[key]
+            self.keys_memory -= estimate_size(key)
+
+    def __contains__(self, key):
+        self._expire(self.clock())
+        return key in self.keys
+
+    def add(self, key):
+        now = self.clock()
+        self._expire(now)
+        keys = self.keys
+        if key in keys:  # the window starts when it was first added
+            return
+        self.keys_memory += estimate_size(key)
+        keys[key] = now
+
+    def __len__(self):
+        self._expire(self.clock())
+        return len(self.keys)
+
+    @property
+    def memory(self):
+        # type: () -> int
+        return sys.getsizeof(self.keys) + self.keys_memory
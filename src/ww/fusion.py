@@ -0,0 +1,307 @@
+# coding: utf-8
+
+"""
+    Compile a chain of g() operations into a single generator.
+
+    Each g() method used to wrap the previous iterator into a new one, so
+    an item going through a chain of n operations resumed n generator
+    frames. Instead, g() records "fusable" operations as stages, and when
+    iteration starts, consecutive stages are turned into the source code of
+    one generator containing a single loop, which is compiled with exec().
+
+    A stage is a tuple starting with its kind, followed by its arguments:
+
+        ('map', func)
+        ('filter', func)
+        ('islice', start, stop, step)
+        ('starts_when', condition)
+        ('stops_when', condition)
+        ('skip_duplicates', key, fingerprints)
+        ('enumerate', start)
+        ('zip', others)
+
+    The generated code only depends on the kinds of the stages and a few
+    flags, so it's cached and reused for all the chains with the same shape.
+
+    Stages that itertools implements in C (map, filter, islice...) don't
+    cost a Python frame per item, so when all the stages are of this kind,
+    they are just composed: a generated loop would be slower.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import itertools
+
+from functools import partial
+
+try:
+    from typing import Any, Callable, Iterable, Iterator, Sequence  # noqa
+except ImportError:
+    pass
+
+try:
+    from itertools import imap, izip, ifilter
+except ImportError:
+    imap = map
+    izip = zip
+    ifilter = filter
+
+from ww.iterable import unhashable_fingerprint_error
+
+FUSABLE = frozenset(('map', 'filter', 'islice', 'starts_when', 'stops_when',
+                     'skip_duplicates', 'enumerate', 'zip'))
+
+# Stages holding a state that would be lost if the chain was compiled twice
+STATEFUL = FUSABLE - frozenset(('map', 'filter'))
+
+BUILTINS = {
+    'map': lambda iterator, func: imap(func, iterator),
+    'filter': lambda iterator, func: ifilter(func, iterator),
+    'islice': itertools.islice,
+    'enumerate': enumerate,
+    'zip': lambda iterator, others: izip(iterator, *others),
+}
+
+_CACHE = {}
+_CACHE_SIZE = 256
+
+
+def as_condition(value):
+    # type: (Any) -> Callable
+    """ Return value if it's callable, or a function testing equality to it """
+    if callable(value):
+        return value
+    return lambda x: x == value
+
+
+def islice_stage(start=0, stop=None, step=1):
+    # type: (int, int, int) -> tuple
+    """Return a stage behaving like itertools.islice()
+
+    Raises the same errors islice() would on invalid arguments.
+    """
+    itertools.islice((), start, stop, step)
+    return ('islice', start or 0, stop, step or 1)
+
+
+def _check_unhashable(fingerprint, item):
+    try:
+        hash(fingerprint)
+    except TypeError:
+        raise unhashable_fingerprint_error(fingerprint, item)
+    raise  # the error came from the fingerprints store itself
+
+
+def _islice_last(start, stop):
+    # islice() consumes items until max(start, stop), then stops
+    return max(start, stop) - 1
+
+
+class _Emitter(object):
+    """ Generate the source code of the fused generator, stage by stage """
+
+    def __init__(self):
+        self.init = []  # lines run once when the generator starts
+        self.body = []  # lines run for each item
+        self.can_finish = False  # True if an islice() may end the loop
+        self.starts_empty = False  # True if an islice() ends before 1st item
+
+    @property
+    def skip(self):
+        if self.can_finish:
+            return ['if _done:', '    return', 'continue']
+        return ['continue']
+
+    def add(self, *lines):
+        self.body.extend(lines)
+
+    def add_skip(self, condition):
+        self.add('if %s:' % condition)
+        self.add(*('    ' + line for line in self.skip))
+
+    def emit_map(self, i):
+        self.add('x = a%d(x)' % i)
+
+    def emit_filter(self, i):
+        self.add_skip('not a%d(x)' % i)
+
+    def emit_enumerate(self, i):
+        self.init.append('n%d = a%d' % (i, i))
+        self.add('x = (n%d, x)' % i, 'n%d += 1' % i)
+
+    def emit_zip(self, i, size):
+        self.init.append('z%d = [iter(o) for o in a%d]' % (i, i))
+        others = ''.join(', next(z%d[%d])' % (i, j) for j in range(size))
+        self.add('try:',
+                 '    x = (x%s)' % others,
+                 'except StopIteration:',
+                 '    return')
+
+    def emit_starts_when(self, i):
+        self.init.append('w%d = False' % i)
+        self.add('if not w%d:' % i)
+        self.add(*('    ' + line for line in self._skip_unless('a%d(x)' % i)))
+        self.add('    w%d = True' % i)
+
+    def _skip_unless(self, condition):
+        return ['if not %s:' % condition] + ['    ' + s for s in self.skip]
+
+    def emit_stops_when(self, i):
+        self.add('if a%d(x):' % i, '    return')
+
+    def emit_skip_duplicates(self, i, has_key):
+        self.init.append('f%d = set() if b%d is None else b%d' % (i, i, i))
+        self.init.append('f%d_add = f%d.add' % (i, i))
+        self.add('k = a%d(x)' % i if has_key else 'k = x')
+        self.add('try:', '    seen = k in f%d' % i,
+                 'except TypeError:', '    _check_unhashable(k, x)')
+        self.add_skip('seen')
+        self.add('f%d_add(k)' % i)
+
+    def emit_islice(self, i, has_stop, step_is_one, empty):
+        if empty:
+            self.starts_empty = True
+            return
+
+        self.init.append('c%d = -1' % i)
+        self.add('c%d += 1' % i)
+        keep = 'c%d < a%d' % (i, i)
+        if not step_is_one:
+            keep += ' or (c%d - a%d) %% s%d' % (i, i, i)
+
+        if not has_stop:
+            self.add_skip(keep)
+            return
+
+        self.add('if %s:' % keep,
+                 '    if c%d == b%d:' % (i, i),
+                 '        return')
+        self.add(*('    ' + line for line in self.skip))
+        self.add('if c%d == b%d:' % (i, i), '    _done = True')
+        self.can_finish = True
+
+    def source(self, count):
+        params = ', '.join('a%d, b%d, s%d' % (i, i, i) for i in range(count))
+        lines = ['def make(%s):' % params,
+                 '    def fused(iterator):']
+        lines.extend('        ' + line for line in self.init)
+        if self.can_finish:
+            lines.append('        _done = False')
+        if self.starts_empty:
+            lines.append('        return')
+        lines.append('        for x in iterator:')
+        lines.extend('            ' + line for line in self.body)
+        lines.append('            yield x')
+        if self.can_finish:
+            lines.append('            if _done:')
+            lines.append('                return')
+        lines.append('    return fused')
+        return '\n'.join(lines)
+
+
+def _signature(stage):
+    """ Return what the generated code depends on for this stage """
+    kind = stage[0]
+    if kind == 'islice':
+        _, start, stop, step = stage
+        empty = stop is not None and _islice_last(start, stop) < 0
+        return (kind, stop is not None, step == 1, empty)
+    if kind == 'skip_duplicates':
+        return (kind, stage[1] is not None)
+    if kind == 'zip':
+        return (kind, len(stage[1]))
+    return (kind,)
+
+
+def _arguments(stage):
+    """ Return the values bound to a%d, b%d and s%d for this stage """
+    kind = stage[0]
+    if kind == 'islice':
+        _, start, stop, step = stage
+        last = None if stop is None else _islice_last(start, stop)
+        return (start, last, step)
+    if kind == 'skip_duplicates':
+        return (stage[1], stage[2], None)
+    if kind in ('starts_when', 'stops_when'):
+        return (as_condition(stage[1]), None, None)
+    return (stage[1], None, None)
+
+
+def _compose(stages, iterable):
+    # type: (Sequence[tuple], Iterable) -> Iterator
+    iterator = iter(iterable)
+    for stage in stages:
+        iterator = BUILTINS[stage[0]](iterator, *stage[1:])
+    return iterator
+
+
+def _emit(signatures):
+    # type: (tuple) -> _Emitter
+    emitter = _Emitter()
+    for i, signature in enumerate(signatures):
+        getattr(emitter, 'emit_' + signature[0])(i, *signature[1:])
+    return emitter
+
+
+def _compile(signatures):
+    # type: (tuple) -> Callable
+    source = _emit(signatures).source(len(signatures))
+    filename = '<ww.fusion %s>' % '|'.join(s[0] for s in signatures)
+    namespace = {'_check_unhashable': _check_unhashable}
+    exec(compile(source, filename, 'exec'), namespace)
+    return namespace['make']
+
+
+def fuse(stages):
+    # type: (Sequence[tuple]) -> Callable[[Iterable], Iterator]
+    """Return a function applying all the stages to an iterable in one loop.
+
+    Args:
+        stages: a sequence of stages, see the module docstring.
+
+    Example:
+
+        >>> run = fuse([('map', abs), ('filter', lambda x: x % 2),
+        ...             islice_stage(1, 3), ('skip_duplicates', None, None)])
+        >>> list(run(range(-10, 0)))
+        [7, 5]
+        >>> list(fuse([])(range(3)))
+        [0, 1, 2]
+    """
+    if not stages:
+        return iter
+
+    if all(stage[0] in BUILTINS for stage in stages):
+        return partial(_compose, stages)
+
+    signatures = tuple(_signature(stage) for stage in stages)
+    try:
+        make = _CACHE[signatures]
+    except KeyError:
+        if len(_CACHE) >= _CACHE_SIZE:
+            _CACHE.clear()
+        make = _CACHE[signatures] = _compile(signatures)
+
+    return make(*itertools.chain.from_iterable(_arguments(stage)
+                                               for stage in stages))
+
+
+def source_code(stages):
+    # type: (Sequence[tuple]) -> str
+    """Return the source code generated for these stages, for debugging.
+
+    Example:
+
+        >>> print(source_code([('map', str), ('filter', bool)]))
+        def make(a0, b0, s0, a1, b1, s1):
+            def fused(iterator):
+                for x in iterator:
+                    x = a0(x)
+                    if not a1(x):
+                        continue
+                    yield x
+            return fused
+    """
+    signatures = tuple(_signature(stage) for stage in stages)
+    return _emit(signatures).source(len(signatures))
@@ -10,9 +10,6 @@
 # TODO : if g() is called on a callable, iter() calls the callable everytime
 # TODO: s.split(sep, maxsplit, minsize, default=None) so "a,b".split(',',
 # minsize=2, default="b") == "a".split(',' minsize=2, default="b")
-# TODO: g() + 1 apply the operation to the whole generator (as for *, / and -)
-# TODO: g(x) + g(y) apply (a + b for a, b in zip(x, y))
-# TODO : gen = gen(y); gen[gen > 5] has the same behavior as numpy array
 # TODO: add features from
 # https://docs.python.org/3/library/itertools.html#itertools-recipes
 # TODO: allow s >> allow you to wrap a string AND dedent it automatically
@@ -23,24 +20,40 @@ from __future__ import (absolute_import,
                         division, print_function)
 
 try:
-    from typing import Any, Union, Callable, Iterable  # noqa
+    from typing import Any, Union, Callable, Iterable, Iterator  # noqa
 except ImportError:
     pass
 
+import array
+
+from functools import partial
+from itertools import chain, tee, cycle
+
 try:
-    from itertools import imap, izip, ifilter
+    from collections.abc import Sequence
+except ImportError:  # Python 2
+    from collections import Sequence
+
+try:
+    from itertools import imap
 except ImportError:
     imap = map
-    izip = zip
-    ifilter = filter
 
-from itertools import chain, tee, cycle
+from builtins import range
 
 import ww
 
-from ww.iterable import (at_index, iterslice, first_true, skip_duplicates,
-                         chunks, window, groupby, firsts, lasts)
-from ww.utils import ensure_tuple
+from ww.iterable import (at_index, first_true, chunks, window, groupby,
+                         aggregate, group_aggregate, firsts, lasts, top,
+                         top_by_group)
+from ww.utils import ensure_tuple, length_hint, basestring
+from ww.fusion import fuse, islice_stage, STATEFUL
+from ww.rolling import RollingWrapper
+from ww import profiling
+
+# The modules behind the other methods are imported by the methods, as
+# some of them pull heavy dependencies (numpy, concurrent.futures,
+# multiprocessing...) that would slow down "import ww".
 
 # todo : merge https://toolz.readthedocs.org/en/latest/api.html
 # toto : merge https://github.com/kachayev/fn.py
@@ -49,17 +62,65 @@ from ww.utils import ensure_tuple
 # TODO: merge minibelt
 
 
+def _sorted_options(kwargs):
+    # type: (dict) -> tuple
+    """ Return the key and reverse arguments of merge() and co """
+    key = kwargs.pop('key', None)
+    reverse = kwargs.pop('reverse', False)
+    if kwargs:
+        raise TypeError("Unexpected arguments: %s" % ', '.join(kwargs))
+    return key, reverse
+
+
+def _lazily(iterable, func, *args):
+    # type: (Iterable, Callable, *Any) -> Iterable
+    """ Yield from func(iterable, *args), only calling it when iterated """
+    for item in func(iterable, *args):
+        yield item
+
+
 class IterableWrapper:
 
-    def __init__(self, iterable, *args):
-        # type: (Iterable, *Iterable) -> None
+    # Methods such as map() or skip_duplicates() don't wrap the iterator
+    # right away. They return a child g() recording a stage and a link to its
+    # parent. On the first iteration, the stages of all the children not
+    # iterated yet are compiled into one loop by ww.fusion.
+    _parent = None
+    _stage = None
+    _iterator = None
+    _absorbed = False  # True if a child has compiled our stage in its loop
+    _tee_called = False
+
+    # When the source is a Sequence, the root g() doesn't create an iterator
+    # until it has to. Meanwhile, indexing, slicing and len() use the
+    # sequence directly, restricted to the _indices range if it's been
+    # sliced.
+    _sequence = None
+    _indices = None
+
+    # Once our stages are compiled into a loop that can't tell how many
+    # items it will yield, the node it reads from, and whether it's a
+    # Sequence it started streaming, to keep estimating it from the stages
+    _compiled_from = None
+
+    # When profiling, the stats of the pipeline. See ww.profiling.
+    _profiler = None
+
+    def __init__(self, iterable, *args, **kwargs):
+        # type: (Iterable, *Iterable, **bool) -> None
         """Initialize self.iterator to iter(iterable)
 
         If several iterables are passed, they are concatenated.
 
+        If iterable is a Sequence, such as a list, a tuple or a range,
+        iter() is only called when needed: until then, indexing, slicing
+        and count() are O(1).
+
         Args:
             iterable: iterable to use for the iner state.
             *args: other iterable to concatenate to the first one.
+            profile: if True, count items and measure time for each
+                     operation chained after this one. See g.stats().
 
 
         Example:
@@ -70,10 +131,148 @@ class IterableWrapper:
             [0, 1, 2, 'a', 'b', 'c']
         """
 
+        profile = kwargs.pop('profile', False)
+        if kwargs:
+            raise TypeError("Unexpected arguments: %s" % ', '.join(kwargs))
+        self._profiler = (profiling.Profiler() if profile
+                          else profiling.current())
+
         if args:
             iterable = chain(iterable, *args)
-        self.iterator = iter(iterable)
-        self._tee_called = False
+        elif isinstance(iterable, Sequence):
+            try:
+                len(iterable)  # a range too large for len() can't be indexed
+            except (OverflowError, TypeError):
+                pass
+            else:
+                self._sequence = iterable
+                return
+        self._iterator = iter(iterable)
+
+    def _from_sequence(self, indices):
+        # type: (range) -> IterableWrapper
+        """ Return a g() on our sequence, restricted to these indices """
+        view = type(self).__new__(type(self))
+        view._sequence = self._sequence
+        view._indices = indices
+        view._profiler = self._profiler
+        return view
+
+    @property
+    def _is_sequence(self):
+        # type: () -> bool
+        """ True if we can still use our Sequence source directly """
+        return self._iterator is None and self._sequence is not None
+
+    def _sequence_indices(self):
+        # type: () -> range
+        if self._indices is None:
+            return range(len(self._sequence))
+        return self._indices
+
+    def _iter_sequence(self):
+        # type: () -> Iterator
+        sequence, indices = self._sequence, self._indices
+        if indices is None:
+            return iter(sequence)
+        if isinstance(sequence, range):
+            step = sequence.step
+            return iter(range(sequence.start + indices.start * step,
+                              sequence.start + indices.stop * step,
+                              indices.step * step))
+        return imap(sequence.__getitem__, indices)
+
+    @property
+    def iterator(self):
+        """The inner iterator, created on first access if needed
+
+        Accessing it compiles the pending stages into one generator.
+        """
+        if self._iterator is None:
+            self._iterator = self._compile()
+        return self._iterator
+
+    @iterator.setter
+    def iterator(self, value):
+        self._iterator = value
+
+    def _chain(self, stage):
+        # type: (tuple) -> IterableWrapper
+        """ Return a child g() applying this stage to our items. """
+        child = g.__new__(g)
+        child._parent = self
+        child._stage = stage
+        child._profiler = self._profiler
+        return child
+
+    def _apply(self, name, func, args=(), timed=()):
+        # type: (str, Callable, tuple, tuple) -> IterableWrapper
+        """Return g(func(self.iterator, *args))
+
+        For operations that can't be fused. If profiling, items are counted
+        and the callables in args at the `timed` indices are timed.
+        """
+        profiler = self._profiler
+        if profiler is None:
+            return g(func(self.iterator, *args))
+
+        iterator = self.iterator  # compile the previous stages first
+        stats = profiler.stage(name)
+        args = tuple(stats.timed(arg) if i in timed else arg
+                     for i, arg in enumerate(args))
+        result = g(stats.probe_output(func(stats.probe_input(iterator),
+                                           *args)))
+        result._profiler = profiler
+        return result
+
+    def _compile(self):
+        # type: () -> Iterator
+        """Build our iterator from the first iterated ancestor
+
+        Stages of the ancestors that have not been iterated are compiled
+        with ours into one loop. They are then marked as absorbed: if they
+        hold a state (a slice counter, seen fingerprints...), iterating them
+        later can't give the same result as before fusion, so we refuse.
+        """
+        pending = []
+        node = self
+        streamed = False
+        while node._iterator is None:
+            if node._parent is None:  # a Sequence we now have to stream
+                node._iterator = node._iter_sequence()
+                streamed = True
+                break
+            pending.append(node)
+            node = node._parent
+        self._compiled_from = (node, streamed)
+
+        pending.reverse()
+        stateful = False
+        for ancestor in pending:
+            stateful = stateful or ancestor._stage[0] in STATEFUL
+            if ancestor._absorbed and stateful:
+                raise RuntimeError(
+                    "You can't iterate on a g object after it has been "
+                    "compiled with the operations chained after it. Use "
+                    "g.copy() before chaining if you need both.")
+
+        for ancestor in pending[:-1]:
+            ancestor._absorbed = True
+
+        if self._profiler is not None:
+            return self._profile_stages(pending, node._iterator)
+
+        return fuse([ancestor._stage for ancestor in pending])(node._iterator)
+
+    def _profile_stages(self, pending, iterator):
+        # type: (list, Iterator) -> Iterator
+        """ Run each stage in its own loop, counting items and timing them """
+        for ancestor in pending:
+            stats = self._profiler.stage(ancestor._stage[0])
+            stage = profiling.profiled_stage(stats, ancestor._stage)
+            iterator = stats.probe_input(iterator)
+            iterator = stats.probe_output(fuse([stage])(iterator))
+        return iterator
 
     def __iter__(self):
         """Return the inner iterator
@@ -89,6 +288,23 @@ class IterableWrapper:
                                "has been called on it.")
         return self.iterator
 
+    def __aiter__(self):
+        """Return an async iterator calling next() in an executor
+
+        This allows "async for" on blocking iterables without blocking
+        the event loop. Requires Python 3.6+.
+
+            Example:
+
+            >>> import asyncio
+            >>> async def main():
+            ...     return [x async for x in g(range(3))]
+            >>> asyncio.run(main())
+            [0, 1, 2]
+        """
+        from ww.ag import from_blocking  # py3 only
+        return from_blocking(self).__aiter__()
+
     def next(self, default=None):
         # type: (Any) -> Any
         """Call next() on inner iterable.
@@ -108,6 +324,57 @@ class IterableWrapper:
 
     __next__ = next
 
+    def __length_hint__(self):
+        # type: () -> int
+        """Estimate the number of items left, so list() can pre-size
+
+        It's exact for Sequence sources, and is passed through map(),
+        enumerate(), zip() and slices. Other operations return 0, meaning
+        unknown. Once the stages are compiled, it's still estimated from
+        them, as the compiled loop doesn't count its items.
+
+        Example:
+
+            >>> from ww.utils import length_hint
+            >>> length_hint(g(range(10)).map(str).enumerate()[2:])
+            8
+            >>> length_hint(g(range(10)).zip('abc'))
+            3
+        """
+        try:
+            if self._iterator is None:
+                source = self
+                while source._iterator is None and source._parent:
+                    source = source._parent
+                return self._stages_hint(source, source._iterator is None)
+            hint = length_hint(self._iterator, -1)
+            if hint < 0 and self._compiled_from is not None:
+                return self._stages_hint(*self._compiled_from)
+            return max(hint, 0)
+        except (OverflowError, TypeError):
+            # too many items for len(), or a broken len() on some iterable
+            return 0
+
+    def _stages_hint(self, source, from_sequence):
+        # type: (IterableWrapper, bool) -> int
+        """ Estimate the number of items our stages yield, reading source """
+        if self is source:
+            if from_sequence:
+                return len(self._sequence_indices())
+            return self.__length_hint__()
+
+        kind = self._stage[0]
+        if kind in ('map', 'enumerate'):
+            return self._parent._stages_hint(source, from_sequence)
+        if kind == 'zip':
+            return min([self._parent._stages_hint(source, from_sequence)] +
+                       [length_hint(other) for other in self._stage[1]])
+        if kind == 'islice':
+            _, start, stop, step = self._stage
+            parent = self._parent._stages_hint(source, from_sequence)
+            return len(range(parent)[start:stop:step])
+        return 0
+
     def __add__(self, other):
         # type: (Iterable) -> IterableWrapper
         """Return a generator that concatenates both generators.
@@ -160,7 +427,7 @@ class IterableWrapper:
             [0, 4, 5]
         """
         filter_from = set(ensure_tuple(other))
-        return g(x for x in self if x not in filter_from)
+        return self._chain(('filter', lambda x: x not in filter_from))
 
     def __rsub__(self, other):
         # type: (Iterable) -> IterableWrapper
@@ -223,7 +490,12 @@ class IterableWrapper:
         If you use an index instead of slice, you should know it WILL
         consume the generator up to this index.
 
-        If you use a slice, it will return a generator.
+        If you use a slice, it will return a generator. Negative steps are
+        only allowed on sequences.
+
+        If g() wraps a Sequence that hasn't been iterated yet, indexing and
+        slicing don't go through the items: an index just moves the start
+        of the sequence past it, and a slice is a view of the sequence.
 
         If you want to keep the behavior of the underlying data structure,
         don't use g(). Do it the usual way. g() will turn anything into a
@@ -252,12 +524,23 @@ class IterableWrapper:
             [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
             >>> g(range(100))[::2].list()
             [0, 2, 4, ..., 96, 98]
-            >>> g(range(100))[::-1]
+            >>> g(range(100))[::-1].list() # doctest: +ELLIPSIS
+            [99, 98, 97, ..., 1, 0]
+            >>> g(iter(range(100)))[::-1]
             Traceback (most recent call last):
             ...
             ValueError: The step can not be negative: '-1' given
         """
 
+        if self._is_sequence:
+            if isinstance(index, int):
+                return self._sequence_item(index)
+            if (isinstance(index, slice) and
+                    all(isinstance(x, int) or x is None
+                        for x in (index.start, index.stop, index.step))):
+                indices = self._sequence_indices()[index]
+                return self._from_sequence(indices)
+
         if isinstance(index, int):
             return at_index(self.iterator, index)
 
@@ -271,7 +554,46 @@ class IterableWrapper:
         except AttributeError:
             raise ValueError('Indexing works only with integers or callables')
 
-        return g(iterslice(self.iterator, start, stop, step))
+        return self._slice(start, stop, step)
+
+    def _sequence_item(self, index):
+        # type: (int) -> Any
+        """ Same as at_index(), but skipping the items instead of reading """
+        indices = self._sequence_indices()
+        try:
+            item = self._sequence[indices[index]]
+        except IndexError:
+            self._indices = indices[len(indices):]
+            raise IndexError('Index "%d" out of range' % index)
+        if index < 0:
+            index = len(indices) - 1
+        self._indices = indices[index + 1:]
+        return item
+
+    def _slice(self, start, stop, step):
+        # type: (Any, Any, int) -> IterableWrapper
+        """ Same as ww.iterable.iterslice(), but with fusable stages """
+        if step < 0:
+            raise ValueError("The step can not be negative: '%s' given" % step)
+
+        if not isinstance(start, int):
+
+            # [callable:callable]
+            if not isinstance(stop, int) and stop:
+                return self._chain(('starts_when', start)
+                                   )._chain(('stops_when', stop))
+
+            # [callable:int]
+            sliced = self._chain(islice_stage(None, stop, step))
+            return sliced._chain(('starts_when', start))
+
+        # [int:callable]
+        if not isinstance(stop, int) and stop:
+            sliced = self._chain(islice_stage(start, None, step))
+            return sliced._chain(('stops_when', stop))
+
+        # [int:int]
+        return self._chain(islice_stage(start, stop, step))
 
     def map(self, func):
         # type: (Callable) -> IterableWrapper
@@ -286,7 +608,205 @@ class IterableWrapper:
             ['0', '1', '2']
 
         """
-        return g(imap(func, self.iterator))
+        return self._chain(('map', func))
+
+    def filter(self, func):
+        # type: (Callable) -> IterableWrapper
+        """Apply filter() then wrap in g()
+
+        Args:
+            func: the callable to pass to filter()
+
+        Example:
+
+            >>> g(range(6)).filter(lambda x: x % 2).list()
+            [1, 3, 5]
+        """
+        return self._chain(('filter', func))
+
+    def pmap(self, func, workers=None, mode="thread", ordered=True,
+             chunksize=None, buffersize=None):
+        # type: (Callable, int, str, bool, int, int) -> IterableWrapper
+        """Apply func() on a pool of workers then wrap in g()
+
+        The result is still lazy: the pool is started on the first iteration,
+        items are sent to it by chunks and only a bounded number of chunks
+        are read ahead of the consumer.
+
+        Args:
+            func: the callable to apply. With mode="process", it must be
+                  picklable, so no lambda or nested function.
+            workers: number of workers. Default to the number of CPUs.
+            mode: "thread" for I/O bound functions, "process" for CPU bound
+                  ones, or an existing concurrent.futures.Executor.
+            ordered: if False, yield results as soon as they are ready
+                     instead of in the input order.
+            chunksize: number of items sent to a worker at once. Default
+                       to 1 for threads and 64 for processes.
+            buffersize: max number of chunks in flight. Default to
+                        twice the number of workers.
+
+        Example:
+
+            >>> g(range(-3, 3)).pmap(abs, workers=2).list()
+            [3, 2, 1, 0, 1, 2]
+            >>> sorted(g(range(-3, 3)).pmap(abs, ordered=False))
+            [0, 1, 1, 2, 2, 3]
+        """
+        from ww.parallel import parallel_map
+        return self._apply('pmap', parallel_map,
+                           (func, workers, mode, ordered, chunksize,
+                            buffersize))
+
+    def parallel(self, workers=None, chunksize=1024, mode="process",
+                 ordered=True):
+        # type: (int, int, Any, bool) -> ParallelSegment
+        """Start a segment of stages run in workers, until sequential()
+
+        The segment accepts map(), filter(), skip_duplicates() and
+        chunks(). Each worker receives the stages once per chunk of
+        `chunksize` items, and runs them all on it, so only the chunks and
+        the results cross process boundaries, unlike with pmap(). See
+        ww.segments for how chunks() and skip_duplicates() behave.
+
+        Args:
+            workers: number of workers. Default to the number of CPUs.
+            chunksize: number of items sent to a worker at once.
+            mode: "process", "thread" or a concurrent.futures.Executor.
+                  With "process", the callables must be picklable.
+            ordered: if False, yield results as soon as they are ready.
+                     skip_duplicates() still removes all the duplicates,
+                     but keeps the first one done instead of the first
+                     one read.
+
+        Example:
+
+            >>> g(range(6)).parallel(2, mode="thread").map(str).chunks(2
+            ...     ).sequential().list()
+            [('0', '1'), ('2', '3'), ('4', '5')]
+        """
+        from ww.segments import ParallelSegment
+        return ParallelSegment(self.iterator, workers, chunksize, mode,
+                               ordered)
+
+    def prefetch(self, size=1, workers=1):
+        # type: (int, int) -> IterableWrapper
+        """Read up to `size` items in advance from a background thread
+
+        Use it after a slow producer (network, files, decompression...) so
+        that waiting for it overlaps with the work done on the items. It's
+        still lazy: the thread starts on the first iteration, and stops if
+        you stop iterating. See ww.prefetch.prefetch() for the details.
+
+        Args:
+            size: the max number of items read in advance.
+            workers: the number of threads reading. Only use more than 1
+                     with thread safe iterators, and if you don't need the
+                     items in order.
+
+        Example:
+
+            >>> g(range(10)).map(str).prefetch(5)[:3].list()
+            ['0', '1', '2']
+        """
+        from ww.prefetch import prefetch
+        return self._apply('prefetch', prefetch, (size, workers))
+
+    def map_batches(self, func, size=64, max_latency=None, workers=None,
+                    mode=None, ordered=True):
+        # type: (Callable, int, float, int, Any, bool) -> IterableWrapper
+        """Call func() once per batch of items, then yield the results
+
+        For callables that are cheaper per batch than per item: database
+        lookups, model scoring... func() receives a list of items and must
+        return one result per item, or ValueError is raised.
+
+        Args:
+            func: the callable receiving a list of items.
+            size: the max number of items in a batch.
+            max_latency: if set, don't wait more than this number of
+                         seconds for a batch to fill up: process it
+                         partially filled instead.
+            workers: number of workers if mode is set. Default to the
+                     number of CPUs.
+            mode: None to call func() in the current thread, or "thread",
+                  "process" or an Executor to process batches in parallel.
+            ordered: if False, yield results as soon as their batch is
+                     ready instead of in the input order.
+
+        Example:
+
+            >>> def lookup(ids):
+            ...     return ['user%s' % x for x in ids]
+            >>> g(range(5)).map_batches(lookup, size=2).list()
+            ['user0', 'user1', 'user2', 'user3', 'user4']
+        """
+        # timing func would make it unpicklable for process pools
+        from ww.parallel import batch_map
+        return self._apply('map_batches', batch_map,
+                           (func, size, max_latency, workers, mode, ordered),
+                           timed=(0,) if mode is None else ())
+
+    def map_shared(self, func, dtype='float64', size=65536,
+                   workers=None):
+        # type: (Callable, Any, int, int) -> IterableWrapper
+        """Yield func(chunk) for chunks of numbers, in worker processes
+
+        Our items are numbers, read by chunks of `size` items into shared
+        memory blocks, so that only a handle to the block is pickled to the
+        worker. func receives a memoryview of the numbers. See
+        ww.shm.shared_map(). Needs Python 3.8+.
+
+        Args:
+            func: a picklable callable receiving a memoryview, only valid
+                  during the call.
+            dtype: a numpy dtype name or an array.array typecode.
+            size: the number of items in a chunk.
+            workers: the number of worker processes. Default to the number
+                     of CPUs.
+
+        Example:
+
+            >>> g(range(10)).map_shared(sum, size=5, workers=1).list()
+            [10.0, 35.0]
+        """
+        from ww import shm
+        typecode = shm.typecode_of(dtype)
+        arrays = self.chunks(size, partial(array.array, typecode))
+        return arrays._apply('map_shared', shm.shared_map,
+                             (func, typecode, size, workers))
+
+    def vector(self, dtype='float64', batch=65536, backend=None):
+        # type: (Any, int, str) -> VectorWrapper
+        """Switch to vectorized mode, with numpy semantics
+
+        Items are pulled into typed arrays of `batch` items, and
+        arithmetic, comparisons, boolean masks and reductions are then
+        applied on whole batches instead of on each item.
+
+        Args:
+            dtype: a numpy dtype name such as 'float64' or 'int32', or an
+                   array.array typecode.
+            batch: the number of items per batch.
+            backend: "numpy" or "array". numpy is an optional dependency,
+                     and the default if it's installed. Otherwise batches
+                     are array.array objects.
+
+        Example:
+
+            >>> v = g([1, 5, 2, 8]).vector('int64')
+            >>> (v * 2 + 1).list()
+            [3, 11, 5, 17]
+            >>> v = g([1, 5, 2, 8]).vector('int64')
+            >>> v[v > 3].list()
+            [5, 8]
+            >>> (g([1, 2]).vector() + g([10, 20]).vector()).list()
+            [11.0, 22.0]
+            >>> g(range(100)).vector('int64').sum()
+            4950
+        """
+        from ww.vector import VectorWrapper
+        return VectorWrapper(self.iterator, dtype, batch, backend)
 
     def zip(self, *others):
         # type: (*Iterable) -> IterableWrapper
@@ -296,38 +816,412 @@ class IterableWrapper:
             others: the iterables to pass to zip()
 
         """
-        return g(izip(self.iterator, *others))
+        return self._chain(('zip', others))
 
     def cycle(self):
-        return g(cycle(self.iterator))
+        return self._apply('cycle', cycle)
+
+    def sorted(self, keyfunc=None, reverse=False, max_memory=None,
+               spill_dir=None):
+        # type: (Callable, bool, Any, str) -> IterableWrapper
+        """Lazily sort the items, spilling them to disk if they don't fit
+
+        Args:
+            keyfunc: same as "key" for sorted().
+            reverse: same as for sorted().
+            max_memory: if set, items are sorted by runs of this estimated
+                        size in bytes (or a string such as "512M"), written
+                        to temporary files then merged lazily. Items must be
+                        picklable then.
+            spill_dir: where to write the temporary files.
+
+        Example:
+
+            >>> g('cAbD').sorted(str.lower).list()
+            ['A', 'b', 'c', 'D']
+            >>> g(range(5)).sorted(reverse=True, max_memory="100").list()
+            [4, 3, 2, 1, 0]
+        """
+        from ww.extsort import external_sorted
+        return self._apply('sorted', external_sorted,
+                           (keyfunc, reverse, max_memory, spill_dir),
+                           timed=(0,))
+
+    def groupby(self, keyfunc=None, reverse=False, cast=tuple,
+                max_memory=None, spill_dir=None):
+        # type: (Callable, bool, Callable, Any, str) -> IterableWrapper
+        """Sort the items, then yield (key, cast(group)) for each group
+
+        See g.sorted() for `max_memory` and `spill_dir`: with them, the
+        items don't have to fit in memory, only a group at a time.
+        """
+        return self._apply('groupby', groupby,
+                           (keyfunc, reverse, cast, max_memory, spill_dir),
+                           timed=(0,))
+
+    def merge(self, *others, **kwargs):
+        # type: (*Iterable, **Any) -> IterableWrapper
+        """Lazily merge our items with other iterables, all sorted
+
+        Unlike sorted(), it only keeps one item per iterable in memory.
+
+        Args:
+            others: the other sorted iterables.
+            key: the key they are sorted by.
+            reverse: True if they are sorted in descending order.
+
+        Example:
+
+            >>> g([1, 4, 7]).merge([2, 5], [3, 6]).list()
+            [1, 2, 3, 4, 5, 6, 7]
+        """
+        key, reverse = _sorted_options(kwargs)
+        from ww import sortedops
+        return self._apply('merge', lambda items, key, reverse, others:
+                           sortedops.merge((items,) + others, key, reverse),
+                           (key, reverse, others), timed=(0,))
+
+    def union(self, *others, **kwargs):
+        # type: (*Iterable, **Any) -> IterableWrapper
+        """Yield the items of us and the sorted others, once per key
+
+        See merge() for the arguments. Inputs must be sorted, and are
+        checked to be, see ww.sortedops.
+
+        Example:
+
+            >>> g([1, 2, 4]).union([2, 3], [4]).list()
+            [1, 2, 3, 4]
+        """
+        key, reverse = _sorted_options(kwargs)
+        from ww import sortedops
+        return self._apply('union', lambda items, key, reverse, others:
+                           sortedops.union((items,) + others, key, reverse),
+                           (key, reverse, others), timed=(0,))
 
-    def sorted(self, keyfunc=None, reverse=False):
-        # type: (Callable, bool) -> IterableWrapper
-        return g(sorted(self.iterator, key=reverse))
+    def intersection(self, *others, **kwargs):
+        # type: (*Iterable, **Any) -> IterableWrapper
+        """Yield our items whose key is in all the sorted others, once
 
-    def groupby(self, keyfunc=None, reverse=False, cast=tuple):
-        # type: (Callable, bool, Callable) -> IterableWrapper
-        return g(groupby(self, keyfunc, reverse, cast))
+        See merge() for the arguments.
 
-    def enumerate(self, start):
+        Example:
+
+            >>> g([1, 2, 3, 4]).intersection([2, 3, 4], [0, 3, 4]).list()
+            [3, 4]
+        """
+        key, reverse = _sorted_options(kwargs)
+        from ww import sortedops
+        return self._apply('intersection', lambda items, key, reverse, others:
+                           sortedops.intersection((items,) + others, key,
+                                                  reverse),
+                           (key, reverse, others), timed=(0,))
+
+    def difference(self, *others, **kwargs):
+        # type: (*Iterable, **Any) -> IterableWrapper
+        """Yield our items whose key is in none of the sorted others
+
+        Like g() - other, but the others are streamed instead of being
+        loaded in a set. See merge() for the arguments.
+
+        Example:
+
+            >>> g([1, 2, 3, 4, 5]).difference([2, 3], [5]).list()
+            [1, 4]
+        """
+        key, reverse = _sorted_options(kwargs)
+        from ww import sortedops
+        return self._apply('difference', sortedops.difference,
+                           (others, key, reverse), timed=(1,))
+
+    def top(self, k, key=None, reverse=False):
+        # type: (int, Callable, bool) -> IterableWrapper
+        """Lazily yield the k largest items, largest first
+
+        It keeps a heap of k items instead of sorting them all: O(n log k)
+        time and O(k) memory.
+
+        Args:
+            k: the number of items to keep.
+            key: same as for sorted().
+            reverse: keep the k smallest items instead, smallest first.
+
+        Example:
+
+            >>> g([3, 1, 4, 1, 5, 9, 2]).top(3).list()
+            [9, 5, 4]
+        """
+        return self._apply('top', top, (k, key, reverse), timed=(1,))
+
+    def bottom(self, k, key=None):
+        # type: (int, Callable) -> IterableWrapper
+        """Lazily yield the k smallest items, smallest first
+
+        Example:
+
+            >>> g([3, 1, 4, 1, 5, 9, 2]).bottom(3).list()
+            [1, 1, 2]
+        """
+        return self.top(k, key, reverse=True)
+
+    def top_by_group(self, k, group_key, key=None, reverse=False):
+        # type: (int, Callable, Callable, bool) -> IterableWrapper
+        """Lazily yield (group, [k largest items]) for each group
+
+        Like top(), with one heap per group. See
+        ww.iterable.top_by_group().
+
+        Example:
+
+            >>> g([5, 2, 8, 3, 4]).top_by_group(2, lambda x: x % 2).list()
+            [(1, [5, 3]), (0, [8, 4])]
+        """
+        return self._apply('top_by_group', top_by_group,
+                           (k, group_key, key, reverse), timed=(1, 2))
+
+    def sample(self, k, seed=None, weight=None):
+        # type: (int, Any, Callable) -> IterableWrapper
+        """Lazily pick k items at random, in one pass and O(k) memory
+
+        The items are yielded in their original order, once all of them
+        have been read. See ww.sampling.
+
+        Args:
+            k: the size of the sample.
+            seed: a seed to get the same sample each time.
+            weight: if set, a callable returning the weight of an item. The
+                    probability to pick an item is then proportional to it.
+
+        Example:
+
+            >>> g(range(100)).sample(3, seed=42).count()
+            3
+            >>> g([0, 1, 0, 2]).sample(2, weight=lambda x: x).list()
+            [1, 2]
+        """
+        from ww import sampling
+        if weight is None:
+            return self._apply('sample', _lazily,
+                               (sampling.reservoir_sample, k, seed))
+        return self._apply('sample', _lazily,
+                           (sampling.weighted_sample, k, weight, seed),
+                           timed=(2,))
+
+    def bernoulli(self, p, seed=None):
+        # type: (float, Any) -> IterableWrapper
+        """Lazily keep each item with probability p
+
+        Example:
+
+            >>> g(range(1000)).bernoulli(0.5, seed=1).count() < 1000
+            True
+        """
+        from ww.sampling import bernoulli
+        return self._apply('bernoulli', bernoulli, (p, seed))
+
+    def partition(self, n, key=None, buffersize=1024, process=None,
+                  start_timeout=1):
+        # type: (int, Callable, int, Callable, float) -> Any
+        """Split the items in n g(), by hash of their key
+
+        The ith g() yields the items for which hash(key(item)) % n == i.
+        Our items are read only once, and each one is buffered only for the
+        g() it goes to, up to buffersize items, see
+        ww.partition.Partitioner: consume the partitions from several
+        threads if one is far behind the others.
+
+        Args:
+            n: the number of partitions.
+            key: a callable returning the key of an item. Default to the
+                 item itself.
+            buffersize: the max number of items buffered per partition.
+            process: if set, a picklable callable. Instead of a tuple of
+                     g(), return the list of process(items) for each
+                     partition, each one computed in a worker process.
+            start_timeout: the max number of seconds to wait for a
+                           partition with a full buffer to be iterated,
+                           before raising BufferError. If None, wait as
+                           long as another thread may iterate it.
+
+        Example:
+
+            >>> evens, odds = g(range(6)).partition(2)
+            >>> odds.list(), evens.list()
+            ([1, 3, 5], [0, 2, 4])
+            >>> g(range(10)).partition(2, process=sum)
+            [20, 25]
+        """
+        from ww.partition import partition, process_partitions
+        if process is not None:
+            return process_partitions(self.iterator, n, process, key,
+                                      buffersize)
+        return tuple(g(items) for items in partition(self.iterator, n, key,
+                                                     buffersize,
+                                                     start_timeout))
+
+    def aggregate(self, **specs):
+        # type: (**Any) -> dict
+        """Compute several aggregates in one pass, and return them in a dict
+
+        Memory doesn't grow with the number of items, and it's faster than
+        computing each aggregate on a copy made with tee(). See
+        ww.iterable.aggregate() for the details.
+
+        Args:
+            specs: name=spec, with spec the name of an accumulator
+                   ("count", "sum", "min", "max", "mean", "var", "std",
+                   "first", "last"), a callable returning a
+                   ww.accumulators.Accumulator, a tuple (spec, getter), or
+                   True to use the accumulator named like the argument.
+
+        Example:
+
+            >>> stats = g([2, 4, 4, 4, 5, 5, 7, 9]).aggregate(
+            ...     count=True, sum=True, min=True, max=True, mean=True,
+            ...     var=True)
+            >>> for name in ('count', 'sum', 'min', 'max', 'mean', 'var'):
+            ...     print(name, stats[name])
+            count 8
+            sum 40
+            min 2
+            max 9
+            mean 5.0
+            var 4.571428571428571
+        """
+        return aggregate(self.iterator, **specs)
+
+    def group_aggregate(self, key=None, agg=None, consecutive=False):
+        # type: (Callable, dict, bool) -> IterableWrapper
+        """Yield (key, {name: aggregate}) for each group, without sorting
+
+        Only one running accumulator per aggregate and per key is kept, so
+        it works on iterables too big for groupby(). See
+        ww.iterable.group_aggregate() for the details.
+
+        Args:
+            key: a callable returning the key of an item. Default to the
+                 item itself.
+            agg: a dict {name: spec}, with spec the name of an accumulator
+                 ("count", "sum", "min", "max", "mean", "var", "std",
+                 "first", "last"), a callable returning a
+                 ww.accumulators.Accumulator, or a tuple (spec, getter).
+            consecutive: if True, group only adjacent items, yielding each
+                         group as soon as it ends.
+
+        Example:
+
+            >>> sales = [('fr', 10), ('us', 5), ('fr', 20)]
+            >>> country = lambda sale: sale[0]
+            >>> amount = lambda sale: sale[1]
+            >>> for key, res in g(sales).group_aggregate(country, {
+            ...     'n': 'count',
+            ...     'total': ('sum', amount),
+            ...     'best': ('max', amount),
+            ... }):
+            ...     print(key, res['n'], res['total'], res['best'])
+            fr 2 30 20
+            us 1 5 5
+        """
+        return self._apply('group_aggregate', group_aggregate,
+                           (key, agg, consecutive), timed=(0,))
+
+    def enumerate(self, start=0):
         # type: (int) -> IterableWrapper
-        return g(enumerate(self.iterator, start))
+        return self._chain(('enumerate', start))
 
     def count(self):
-        try:
-            return len(self.iterator)
-        except TypeError:
-            for i, _ in enumerate(self.iterator):
-                pass
-            return i
+        # type: () -> int
+        """Consume the items and return how many there were
+
+        It's O(1) for a Sequence that hasn't been iterated yet.
+
+        Example:
+
+            >>> g(range(3)).count()
+            3
+            >>> g(x for x in []).count()
+            0
+        """
+        if self._is_sequence:
+            indices = self._sequence_indices()
+            self._indices = indices[len(indices):]
+            return len(indices)
+
+        count = 0
+        for count, _ in enumerate(self.iterator, 1):
+            pass
+        return count
 
     def copy(self):
+        if self._is_sequence:
+            return self._from_sequence(self._indices)
         self.iterator, new = tee(self.iterator)
-        return g(new)
+        copy = g(new)
+        copy._profiler = self._profiler
+        return copy
+
+    def cache(self, max_memory=None, spill_dir=None):
+        # type: (Any, str) -> CachedIterable
+        """Return an iterable replaying the items, reading them only once
+
+        Unlike tee(), you don't need to know how many copies you want, and
+        it's not a g() object: each iteration starts from the beginning.
+        Wrap it in g() to chain operations. Items are recorded lazily as
+        the first iteration goes, and moved to a compressed temporary file
+        when they take more than max_memory.
+
+        Args:
+            max_memory: the memory budget for the recorded items, in bytes
+                        or as a string such as "512M". Default to None,
+                        to keep everything in memory.
+            spill_dir: where to write the temporary file.
+
+        Example:
+
+            >>> rows = g(x for x in range(5)).cache(max_memory='10M')
+            >>> g(rows).map(str).list()
+            ['0', '1', '2', '3', '4']
+            >>> sum(rows), max(rows)
+            (10, 4)
+        """
+        from ww.cache import CachedIterable
+        return CachedIterable(self.iterator, max_memory, spill_dir)
+
+    def join(self, other, *args, **kwargs):
+        # type: (Any, *Any, **Any) -> Any
+        """Join the items in a string, or with another iterable on a key
 
-    def join(self, joiner, formatter=lambda s, t: t.format(s), template="{}"):
-        # type: (iterable, Callable, str) -> ww.s.StringWrapper
-        return ww.s(joiner).join(self, formatter, template)
+        If other is a string, return s(other).join(self, formatter,
+        template): the items formatted with formatter(item, template), and
+        joined with other.
+
+        Else, yield (item, other_item) for the items with the same key, see
+        ww.joins.join() for the arguments: on, how ("inner", "left" or
+        "outer"), strategy ("hash" or "merge"), build, max_memory and
+        spill_dir. By default, the hash strategy builds its table from the
+        side whose length is the smallest, if known.
+
+        Example:
+
+            >>> g(range(3)).join(',')
+            u'0,1,2'
+            >>> users = [(1, 'bob'), (2, 'ann')]
+            >>> g([(2, 'login')]).join(users, on=lambda x: x[0]).list()
+            [((2, 'login'), (2, 'ann'))]
+        """
+        if isinstance(other, basestring):
+            return ww.s(other).join(self, *args, **kwargs)
+        return self._join(other, *args, **kwargs)
+
+    def _join(self, other, on=None, how='inner', strategy='hash', build=None,
+              max_memory=None, spill_dir=None):
+        # type: (Iterable, Any, str, str, str, Any, str) -> IterableWrapper
+        from ww import joins
+        if build is None and strategy == 'hash':
+            build = joins.smaller_side(self, other)
+        return self._apply('join', joins.join,
+                           (other, on, how, strategy, build, max_memory,
+                            spill_dir), timed=(1,))
 
     def __repr__(self):
         return "<IterableWrapper generator>"
@@ -338,7 +1232,7 @@ class IterableWrapper:
         """
             Yields items from an iterator in iterable chunks.
         """
-        return g(chunks(self.iterator, chunksize, cast))
+        return self._apply('chunks', chunks, (chunksize, cast))
 
     def window(self, size=2, cast=tuple):
         # type: (int, Callable) -> IterableWrapper
@@ -346,33 +1240,100 @@ class IterableWrapper:
         Yields iterms by bunch of a given size, but rolling only one item
         in and out at a time when iterating.
         """
-        return g(window(self.iterator, size, cast))
+        return self._apply('window', window, (size, cast))
+
+    def rolling(self, size):
+        # type: (int) -> RollingWrapper
+        """Give access to aggregates of each window of `size` items
+
+        Unlike window(), no tuple is created for each window, and each
+        aggregate is updated in O(1) when the window moves, whatever its
+        size.
+
+        Args:
+            size: the number of items in a window.
+
+        Example:
+
+            >>> g([1, 5, 3, 4]).rolling(2).mean().list()
+            [3.0, 4.0, 3.5]
+            >>> g([1, 5, 3, 4]).rolling(2).min().list()
+            [1, 3, 3]
+            >>> g('abcd').rolling(3).view().map(''.join).list()
+            ['abc', 'bcd']
+        """
+        return RollingWrapper(self.iterator, size)
 
     def firsts(self, items=1, default=None):
         # type: (int, Any) -> IterableWrapper
         """ Lazily return the first x items from this iterable or default. """
-        return g(firsts(self.iterator, items, default))
+        return self._apply('firsts', firsts, (items, default))
 
     def lasts(self, items=1, default=None):
         # type: (int, Any) -> IterableWrapper
         """ Lazily return the lasts x items from this iterable or default. """
-        return g(lasts(self.iterator, items, default))
+        return self._apply('lasts', lasts, (items, default))
 
-    # allow using a bloom filter as an alternative to set
-    # https://github.com/jaybaird/python-bloomfilter
-    # TODO : find a way to say "any type accepting 'in'"
-    def skip_duplicates(self, key=lambda x: x, fingerprints=None):
+    def skip_duplicates(self, key=None, fingerprints=None):
         # type: (Callable, Any) -> IterableWrapper
-        return g(skip_duplicates(self.iterator, key, fingerprints))
+        """Lazily yield the items, skipping those already seen
+
+        Args:
+            key: a callable returning the fingerprint of an item, which
+                 must be hashable. Default to the item itself.
+            fingerprints: where to store the fingerprints already seen.
+                          Anything with "in" and "add()" works. Default to
+                          a set(), which grows with each distinct item:
+                          use one of the bounded memory stores from
+                          ww.fingerprints for long streams.
+
+        Example:
+
+            >>> from ww.fingerprints import LRUStore
+            >>> g('abacbd').skip_duplicates().list()
+            ['a', 'b', 'c', 'd']
+            >>> g('abcab').skip_duplicates(fingerprints=LRUStore(2)).list()
+            ['a', 'b', 'c', 'a', 'b']
+        """
+        return self._chain(('skip_duplicates', key, fingerprints))
+
+    def _get_profiler(self):
+        if self._profiler is None:
+            raise RuntimeError("Profiling is not enabled: use "
+                               "g(iterable, profile=True) or "
+                               "'with ww.profile()'")
+        return self._profiler
+
+    def stats(self):
+        # type: () -> list
+        """Return the stats of each operation of a profiled pipeline
+
+        See ww.profiling.Profiler.stats() for the content of the dicts.
+
+        Example:
+
+            >>> gen = g(range(10), profile=True).filter(lambda x: x > 6)
+            >>> gen.list()
+            [7, 8, 9]
+            >>> [(s['stage'], s['items_in'], s['items_out'])
+            ...  for s in gen.stats()]
+            [('filter', 10, 3)]
+        """
+        return self._get_profiler().stats()
+
+    def explain(self):
+        # type: () -> str
+        """ Return the stats of a profiled pipeline as a table """
+        return self._get_profiler().explain()
 
     # DO NOT MOVE THOSE METHODS UPPER as they would shadow the builtins inside
     def list(self):
         # TODO: cast to l()
-        return list(self.iterator)
+        return list(self)  # not self.iterator, to use __length_hint__
 
     def tuple(self):
         # TODO: cast to t()
-        return tuple(self.iterator)
+        return tuple(self)
 
     def set(self):
         return set(self.iterator)
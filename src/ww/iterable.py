@@ -1,14 +1,21 @@
 
+import heapq
 import itertools
 
-from future.utils import raise_from
+from six import raise_from
 
 try:
     from typing import Union, Callable, Iterable, Any  # noqa
 except ImportError:
     pass
 
-from collections import deque
+from collections import deque, OrderedDict
+
+from ww.extsort import external_sorted
+from ww.accumulators import parse_specs, Aggregates
+
+# Number of items read before feeding the accumulators in group_aggregate()
+AGGREGATE_BATCH = 1024
 
 
 def starts_when(iterable, condition):
@@ -59,7 +66,7 @@ def stops_when(iterable, condition):
     return itertools.takewhile(lambda x: not condition(x), iterable)
 
 
-def skip_duplicates(iterable, key=None, fingerprints=()):
+def skip_duplicates(iterable, key=None, fingerprints=None):
     # type: (Iterable, Iterable, Any) -> Iterable
     """
         Returns a generator that will yield all objects from iterable, skipping
@@ -110,14 +117,20 @@ def skip_duplicates(iterable, key=None, fingerprints=()):
                                      lambda x: x.foo))
             [Test('bar'), Test('other')]
 
+        `fingerprints` is where the fingerprints already seen are stored,
+        a set() by default. Anything supporting "in" and "add()" works, such
+        as the bounded memory stores from ww.fingerprints.
+
     """
 
-    fingerprints = fingerprints or set()
+    fingerprints = set() if fingerprints is None else fingerprints
+    fingerprint = None
 
     try:
         # duplicate some code to gain perf in the most common case
         if key is None:
             for x in iterable:
+                fingerprint = x
                 if x not in fingerprints:
                     yield x
                     fingerprints.add(x)
@@ -131,16 +144,22 @@ def skip_duplicates(iterable, key=None, fingerprints=()):
         try:
             hash(fingerprint)
         except TypeError:
-            raise TypeError(
-                "The 'key' function returned a non hashable object of type "
-                "'%s' when receiving '%s'. Make sure this function always "
-                "returns a hashable object. Hint: immutable primitives like"
-                "int, str or tuple, are hashable while dict, set and list are "
-                "not." % (type(fingerprint), x))
+            raise unhashable_fingerprint_error(fingerprint, x)
         else:
             raise
 
 
+def unhashable_fingerprint_error(fingerprint, item):
+    # type: (Any, Any) -> TypeError
+    """ Return the error to raise when skip_duplicates() can't hash a key """
+    return TypeError(
+        "The 'key' function returned a non hashable object of type "
+        "'%s' when receiving '%s'. Make sure this function always "
+        "returns a hashable object. Hint: immutable primitives like"
+        "int, str or tuple, are hashable while dict, set and list are "
+        "not." % (type(fingerprint), item))
+
+
 # TODO: test that on big iterators to check for recursion limit
 def chunks(iterable, chunksize, cast=tuple):
     # type: (Iterable, int, Callable) -> Iterable
@@ -148,8 +167,10 @@ def chunks(iterable, chunksize, cast=tuple):
         Yields items from an iterator in iterable chunks.
     """
     it = iter(iterable)
-    while True:
-        yield cast(itertools.chain([next(it)],
+    # the loop and the islice() share the same iterator, so each turn starts
+    # right after the previous chunk
+    for first in it:
+        yield cast(itertools.chain([first],
                    itertools.islice(it, chunksize - 1)))
 
 
@@ -253,13 +274,191 @@ def iterslice(iterable, start=0, stop=None, step=1):
     return itertools.islice(iterable, start, stop, step)
 
 
-def groupby(iterable, keyfunc=None, reverse=False, cast=tuple):
-    # type: (Iterable, Callable, bool, Callable) -> Iterable
-    sorted_iterable = sorted(iterable, key=keyfunc, reverse=reverse)
+def groupby(iterable, keyfunc=None, reverse=False, cast=tuple,
+            max_memory=None, spill_dir=None):
+    # type: (Iterable, Callable, bool, Callable, Any, str) -> Iterable
+    """ Sort the iterable, then yield (key, cast(group)) for each group.
+
+        The sort uses ww.extsort.external_sorted(), so if `max_memory` is
+        set, the iterable doesn't have to fit in memory: only one group at
+        a time does.
+
+        >>> list(groupby('abAB', str.lower))
+        [('a', ('a', 'A')), ('b', ('b', 'B'))]
+        >>> list(groupby('abAB', str.lower, max_memory=100, cast=''.join))
+        [('a', 'aA'), ('b', 'bB')]
+    """
+    sorted_iterable = external_sorted(iterable, keyfunc, reverse, max_memory,
+                                      spill_dir)
     for key, group in itertools.groupby(sorted_iterable, keyfunc):
         yield key, cast(group)
 
 
+def aggregate(iterable, **specs):
+    # type: (Iterable, **Any) -> dict
+    """ Compute several aggregates of the iterable in one pass.
+
+        Items are read by batches fed to one running accumulator per
+        aggregate (see ww.accumulators), so memory doesn't depend on the
+        number of items, and the iterable doesn't have to be copied with
+        tee() for each aggregate.
+
+        Args:
+            iterable: the items to aggregate.
+            specs: name=spec. A spec is the name of an accumulator ("count",
+                   "sum", "min", "max", "mean", "var", "std", "first",
+                   "last"), a callable returning an Accumulator, a tuple
+                   (spec, getter) to aggregate getter(item) instead of the
+                   item, or True to use the accumulator named like the
+                   argument.
+
+        >>> res = aggregate([1, 2, 3, 6], count=True, mean=True,
+        ...                 high='max', squares=('sum', lambda x: x * x))
+        >>> res == {'count': 4, 'mean': 3.0, 'high': 6, 'squares': 50}
+        True
+    """
+    if not specs:
+        raise TypeError("aggregate() needs at least one aggregate, "
+                        "e.g: aggregate(iterable, count=True)")
+    aggregates = Aggregates(parse_specs(specs))
+    for batch in chunks(iterable, AGGREGATE_BATCH, list):
+        aggregates.update(batch)
+    return aggregates.results()
+
+
+def group_aggregate(iterable, key=None, agg=None, consecutive=False):
+    # type: (Iterable, Callable, dict, bool) -> Iterable
+    """ Yield (key, {name: aggregate}) for each group, without sorting.
+
+        Unlike groupby(), items are not stored: each group only keeps one
+        running accumulator per aggregate (see ww.accumulators), so memory
+        is O(number of keys) and time is O(n). Groups are yielded in the
+        order their key first appeared, once the iterable is exhausted.
+
+        If `consecutive` is True, only adjacent items with the same key are
+        grouped, like itertools.groupby(). Nothing is buffered besides the
+        current group's accumulators, and each group is yielded as soon as
+        it ends, so it works on infinite iterables already clustered by key.
+
+        Args:
+            iterable: the items to group.
+            key: a callable returning the key of an item. Default to the
+                 item itself.
+            agg: a dict {name: spec}. A spec is the name of an accumulator
+                 ("count", "sum", "min", "max", "mean", "var", "std",
+                 "first", "last"), a callable returning an Accumulator, or a
+                 tuple (spec, getter) to aggregate getter(item) instead of
+                 the item. Default to {"count": "count"}.
+            consecutive: group only adjacent items.
+
+        >>> list(group_aggregate('abAaB', str.lower, {'n': 'count'}))
+        [('a', {'n': 3}), ('b', {'n': 2})]
+        >>> list(group_aggregate('abAaB', str.lower, {'n': 'count'},
+        ...                      consecutive=True))
+        [('a', {'n': 1}), ('b', {'n': 1}), ('a', {'n': 2}), ('b', {'n': 1})]
+    """
+    specs = parse_specs(agg or {'count': 'count'})
+
+    if consecutive:
+        for group_key, group in itertools.groupby(iterable, key):
+            aggregates = Aggregates(specs)
+            for batch in chunks(group, AGGREGATE_BATCH, list):
+                aggregates.update(batch)
+            yield group_key, aggregates.results()
+        return
+
+    # Items are dispatched by key one batch at a time, so that accumulators
+    # are fed lists instead of being called for each item.
+    groups = OrderedDict()
+    for batch in chunks(iterable, AGGREGATE_BATCH, list):
+        for item_key, items in _dispatch(batch, key).items():
+            try:
+                aggregates = groups[item_key]
+            except KeyError:
+                aggregates = groups[item_key] = Aggregates(specs)
+            aggregates.update(items)
+
+    for group_key, aggregates in groups.items():
+        yield group_key, aggregates.results()
+
+
+def _dispatch(items, key):
+    by_key = OrderedDict()
+    for item in items:
+        item_key = item if key is None else key(item)
+        try:
+            by_key[item_key].append(item)
+        except KeyError:
+            by_key[item_key] = [item]
+    return by_key
+
+
+def top(iterable, k, key=None, reverse=False):
+    # type: (Iterable, int, Callable, bool) -> Iterable
+    """ Yield the k largest items, largest first, or smallest if reverse.
+
+        It uses heapq.nlargest() and nsmallest(), which keep a heap of k
+        items: O(n log k) time and O(k) memory, instead of a full sort.
+        Like with sorted(), equal items keep their order.
+
+        >>> list(top([3, 1, 4, 1, 5, 9, 2], 3))
+        [9, 5, 4]
+        >>> list(top(['bb', 'a', 'ccc', 'dd'], 2, key=len, reverse=True))
+        ['a', 'bb']
+    """
+    select = heapq.nsmallest if reverse else heapq.nlargest
+    for item in select(k, iterable, key=key):
+        yield item
+
+
+class _Inverted(object):
+    """ Wrap a value to reverse comparisons, turning min heaps into max """
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def top_by_group(iterable, k, group_key, key=None, reverse=False):
+    # type: (Iterable, int, Callable, Callable, bool) -> Iterable
+    """ Yield (group, [k largest items]) for each group, without sorting.
+
+        Each group keeps a heap of at most k items, so memory is O(number of
+        groups * k). Groups are yielded in the order their key first
+        appeared, once the iterable is exhausted, with their items largest
+        first, or smallest first if reverse.
+
+        >>> words = ['apple', 'fig', 'avocado', 'banana', 'blueberry', 'kiwi']
+        >>> for group in top_by_group(words, 2, lambda w: w[0], key=len):
+        ...     print(group)
+        ('a', ['avocado', 'apple'])
+        ('f', ['fig'])
+        ('b', ['blueberry', 'banana'])
+        ('k', ['kiwi'])
+    """
+    heaps = OrderedDict()
+    for index, item in enumerate(iterable):
+        item_key = item if key is None else key(item)
+        # the heap root is the item to evict first: the smallest one, or
+        # the last one seen among equals
+        entry = (_Inverted(item_key) if reverse else item_key, -index, item)
+        heap = heaps.setdefault(group_key(item), [])
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif k > 0:
+            heapq.heappushpop(heap, entry)
+
+    for group, heap in heaps.items():
+        yield group, [entry[2] for entry in sorted(heap, reverse=True)]
+
+
 def firsts(iterable, items=1, default=None):
     # type: (Iterable, int, Any) -> Iterable
     """ Lazily return the first x items from this iterable or default. """
@@ -0,0 +1,302 @@
+# coding: utf-8
+
+"""
+    Join two iterables on a key, like SQL joins, without loading both.
+
+    Two strategies:
+
+        - "hash": the items of one side (the build side) are loaded in a
+          dict by key, and the other side (the probe side) is streamed
+          through it. It's the smaller side, if the lengths are known. If
+          the build side goes over the memory budget, both sides are split
+          by key hash into partitions written to temporary files, which
+          are then joined one at a time (a "grace" hash join).
+        - "merge": both sides must be sorted by key. They are read in
+          lockstep, and only the right items sharing the current key are
+          kept, in a CachedIterable spilling to disk over the budget.
+
+    Joins yield (left, right) tuples, with None in place of the missing
+    item for the unmatched items of left and outer joins.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import pickle
+import tempfile
+
+try:
+    from typing import Any, Callable, Iterable, Dict, List  # noqa
+except ImportError:
+    pass
+
+from ww.utils import parse_size, estimate_size, length_hint, nop
+from ww.extsort import read_run, BLOCK_SIZE
+from ww.cache import CachedIterable
+from ww.sortedops import _Cursor
+
+HOWS = ('inner', 'left', 'outer')
+
+STRATEGIES = ('hash', 'merge')
+
+# Number of partitions each side is split into when a hash join spills
+PARTITIONS = 16
+
+
+def _key_funcs(on):
+    # type: (Any) -> tuple
+    """ Return the (left, right) key functions for the `on` argument """
+    if on is None:
+        return nop, nop
+    if callable(on):
+        return on, on
+    left_key, right_key = on
+    return left_key or nop, right_key or nop
+
+
+def join(left, right, on=None, how='inner', strategy='hash', build=None,
+         max_memory=None, spill_dir=None):
+    # type: (Iterable, Iterable, Any, str, str, str, Any, str) -> Iterable
+    """Lazily yield (left_item, right_item) for the items with equal keys
+
+    Args:
+        left: the left items.
+        right: the right items.
+        on: the key to join on: a callable applied to the items of both
+            sides, or a tuple (left_key, right_key) of callables. Default
+            to the items themselves.
+        how: "inner" to yield only the matches, "left" to also yield
+             (left_item, None) for the unmatched left items, "outer" to
+             also yield (None, right_item) for the unmatched right items.
+        strategy: "hash" or "merge", see the module documentation.
+        build: for the hash strategy, the side loaded in memory, "left" or
+               "right". Default to the smaller one if their length is
+               known, else to the right one.
+        max_memory: the memory budget, in bytes or as a string such as
+                    "512M", for the build side of the hash strategy, or
+                    the items with the same key of the merge strategy.
+                    Above it, they go to temporary files, so they must be
+                    picklable. If None, everything stays in memory.
+        spill_dir: where to create the temporary files.
+
+    Example:
+
+        >>> users = [(1, 'bob'), (2, 'ann')]
+        >>> events = [(2, 'login'), (3, 'logout'), (1, 'login')]
+        >>> first = lambda x: x[0]
+        >>> for pair in join(events, users, on=first, how='left'):
+        ...     print(pair)
+        ((2, 'login'), (2, 'ann'))
+        ((3, 'logout'), None)
+        ((1, 'login'), (1, 'bob'))
+    """
+    if how not in HOWS:
+        raise ValueError("how should be one of %s, not %r" % (HOWS, how))
+    if strategy not in STRATEGIES:
+        raise ValueError("strategy should be one of %s, not %r" % (
+            STRATEGIES, strategy))
+    left_key, right_key = _key_funcs(on)
+    keep_left = how in ('left', 'outer')
+    keep_right = how == 'outer'
+    if max_memory is not None:
+        max_memory = parse_size(max_memory)
+
+    if strategy == 'merge':
+        return merge_join(left, right, left_key, right_key, keep_left,
+                          keep_right, max_memory, spill_dir)
+
+    if build is None:
+        build = smaller_side(left, right)
+    if build == 'left':
+        pairs = hash_join(right, left, right_key, left_key, keep_right,
+                          keep_left, max_memory, spill_dir)
+        return ((item, other) for other, item in pairs)
+    if build == 'right':
+        return hash_join(left, right, left_key, right_key, keep_left,
+                         keep_right, max_memory, spill_dir)
+    raise ValueError("build should be 'left' or 'right', not %r" % build)
+
+
+def smaller_side(left, right):
+    # type: (Iterable, Iterable) -> str
+    """ Return "left" if left is known to be smaller, else "right" """
+    # a length hint of 0 means unknown for iterators
+    left_size, right_size = length_hint(left), length_hint(right)
+    if left_size and (not right_size or left_size < right_size):
+        return 'left'
+    return 'right'
+
+
+def hash_join(probe, build, probe_key, build_key, keep_probe=False,
+              keep_build=False, max_memory=None, spill_dir=None):
+    # type: (Iterable, Iterable, Callable, Callable, bool, bool, int, str) -> Iterable  # noqa
+    """Yield (probe_item, build_item) for the matches, build side in memory
+
+    Unmatched items are yielded with None for the missing side if
+    keep_probe or keep_build are True. max_memory must be in bytes.
+
+    Example:
+
+        >>> list(hash_join('abc', 'bcd', str.upper, str.upper))
+        [('b', 'b'), ('c', 'c')]
+    """
+    build = iter(build)
+    table, overflow = _build_table(build, build_key, max_memory)
+    if not overflow:
+        for pair in _probe_table(table, probe, probe_key, keep_probe,
+                                 keep_build):
+            yield pair
+        return
+
+    # the build side doesn't fit: split both sides by key hash, so that
+    # each partition of the build side can be joined in memory
+    build_parts = _Partitions(build_key, spill_dir)
+    probe_parts = _Partitions(probe_key, spill_dir)
+    try:
+        for items in table.values():
+            build_parts.extend(items)
+        del table
+        build_parts.extend(overflow)
+        build_parts.extend(build)
+        probe_parts.extend(probe)
+        for build_part, probe_part in zip(build_parts.runs(),
+                                          probe_parts.runs()):
+            table, _ = _build_table(read_run(build_part), build_key, None)
+            for pair in _probe_table(table, read_run(probe_part), probe_key,
+                                     keep_probe, keep_build):
+                yield pair
+    finally:
+        build_parts.close()
+        probe_parts.close()
+
+
+def _build_table(build, build_key, max_memory):
+    # type: (Iterable, Callable, int) -> tuple
+    """Load items by key until max_memory is reached
+
+    Return the dict {key: [items]} and the list of the items left out (the
+    one that went over the budget), empty if all the items fit.
+    """
+    table = {}  # type: Dict[Any, List]
+    size = 0
+    for item in build:
+        if max_memory is not None:
+            size += estimate_size(item)
+            if size > max_memory:
+                return table, [item]
+        table.setdefault(build_key(item), []).append(item)
+    return table, []
+
+
+def _probe_table(table, probe, probe_key, keep_probe, keep_build):
+    # type: (dict, Iterable, Callable, bool, bool) -> Iterable
+    matched = set()
+    for item in probe:
+        key = probe_key(item)
+        others = table.get(key)
+        if others:
+            if keep_build:
+                matched.add(key)
+            for other in others:
+                yield item, other
+        elif keep_probe:
+            yield item, None
+
+    if keep_build:
+        for key, others in table.items():
+            if key not in matched:
+                for other in others:
+                    yield None, other
+
+
+class _Partitions(object):
+    """ Temporary files of pickled items, split by hash of their key """
+
+    def __init__(self, key, spill_dir):
+        # type: (Callable, str) -> None
+        self.key = key
+        self.files = [tempfile.TemporaryFile(dir=spill_dir, prefix='ww-join-')
+                      for _ in range(PARTITIONS)]
+        self.blocks = [[] for _ in range(PARTITIONS)]
+
+    def extend(self, items):
+        # type: (Iterable) -> None
+        for item in items:
+            index = hash(self.key(item)) % PARTITIONS
+            block = self.blocks[index]
+            block.append(item)
+            if len(block) == BLOCK_SIZE:
+                self._flush(index)
+
+    def _flush(self, index):
+        # type: (int) -> None
+        pickle.dump(self.blocks[index], self.files[index],
+                    pickle.HIGHEST_PROTOCOL)
+        self.blocks[index] = []
+
+    def runs(self):
+        # type: () -> List
+        """ Flush the blocks and return the files, ready for read_run() """
+        for index in range(PARTITIONS):
+            if self.blocks[index]:
+                self._flush(index)
+        return self.files
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+
+def merge_join(left, right, left_key, right_key, keep_left=False,
+               keep_right=False, max_memory=None, spill_dir=None):
+    # type: (Iterable, Iterable, Callable, Callable, bool, bool, int, str) -> Iterable  # noqa
+    """Yield (left_item, right_item) for the matches of two sorted iterables
+
+    Both must be sorted by key in ascending order, which is checked as
+    they are read. Only the right items with the current key are kept,
+    spilling to disk over max_memory bytes.
+
+    Example:
+
+        >>> list(merge_join([1, 2, 2, 4], [2, 3, 4], abs, abs, True, True))
+        [(1, None), (2, 2), (2, 2), (None, 3), (4, 4)]
+    """
+    lefts = _Cursor(left, left_key, False)
+    rights = _Cursor(right, right_key, False)
+    while not lefts.exhausted and not rights.exhausted:
+        if lefts.key < rights.key:
+            if keep_left:
+                yield lefts.item, None
+            lefts.advance()
+        elif rights.key < lefts.key:
+            if keep_right:
+                yield None, rights.item
+            rights.advance()
+        else:
+            for pair in _join_group(lefts, rights, max_memory, spill_dir):
+                yield pair
+
+    while keep_left and not lefts.exhausted:
+        yield lefts.item, None
+        lefts.advance()
+    while keep_right and not rights.exhausted:
+        yield None, rights.item
+        rights.advance()
+
+
+def _join_group(lefts, rights, max_memory, spill_dir):
+    # type: (_Cursor, _Cursor, int, str) -> Iterable
+    """ Join the items of both cursors with the key they are both at """
+    key = rights.key
+
+    def group():
+        while not rights.exhausted and rights.key == key:
+            yield rights.item
+            rights.advance()
+
+    # the first left item reads the whole group, the next ones replay it
+    with CachedIterable(group(), max_memory, spill_dir) as others:
+        while not lefts.exhausted and lefts.key == key:
+            for other in others:
+                yield lefts.item, other
+            lefts.advance()
@@ -0,0 +1,280 @@
+# coding: utf-8
+
+"""
+    Run callables over chunks of an iterable using a pool of workers.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import os
+import itertools
+
+from functools import partial
+
+try:
+    from typing import Any, Union, Callable, Iterable  # noqa
+except ImportError:
+    pass
+
+from collections import deque
+
+from concurrent.futures import (Executor, ThreadPoolExecutor,
+                                ProcessPoolExecutor, wait, FIRST_COMPLETED)
+
+from ww.iterable import chunks
+from ww.prefetch import timed_chunks
+
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+# Items are cheap to send to a thread, but each chunk sent to a process
+# pays for pickling and a round trip, so we batch more by default.
+DEFAULT_CHUNKSIZES = {
+    'thread': 1,
+    'process': 64,
+}
+
+
+def cpu_count():
+    # type: () -> int
+    """ Return the number of CPUs, or 1 if it can't be determined. """
+    try:
+        return os.cpu_count() or 1
+    except AttributeError:  # Python 2
+        import multiprocessing
+        return multiprocessing.cpu_count()
+
+
+def default_chunksize(mode):
+    # type: (Any) -> int
+    """Return the default chunksize for a mode or an Executor
+
+    Example:
+
+        >>> default_chunksize('thread'), default_chunksize('process')
+        (1, 64)
+    """
+    if isinstance(mode, ProcessPoolExecutor):
+        mode = 'process'
+    return DEFAULT_CHUNKSIZES.get(mode, 1)
+
+
+def map_chunk(func, chunk):
+    # type: (Callable, Iterable) -> list
+    """ Return [func(x) for x in chunk]. Defined here so it can be pickled. """
+    return [func(x) for x in chunk]
+
+
+def map_batch(func, batch):
+    # type: (Callable, list) -> list
+    """Return list(func(batch)), checking there is one result per item
+
+    Defined here so it can be pickled.
+
+    Example:
+
+        >>> map_batch(lambda batch: [x * 2 for x in batch], [1, 2])
+        [2, 4]
+        >>> map_batch(lambda batch: batch[1:], [1, 2])
+        Traceback (most recent call last):
+        ...
+        ValueError: The function returned 1 results for a batch of 2 items
+    """
+    results = list(func(batch))
+    if len(results) != len(batch):
+        raise ValueError("The function returned %s results for a batch of "
+                         "%s items" % (len(results), len(batch)))
+    return results
+
+
+def get_executor(mode, workers=None):
+    # type: (Union[str, Executor], int) -> (Executor, bool)
+    """Return an executor for this mode, and whether we own it.
+
+    Args:
+        mode: "thread", "process" or an Executor instance that we will
+              use as-is and never shut down.
+        workers: the number of workers for the executor we create.
+
+    Example:
+
+        >>> executor, owned = get_executor('thread', 2)
+        >>> owned
+        True
+        >>> executor.shutdown()
+        >>> get_executor('fork')
+        Traceback (most recent call last):
+        ...
+        ValueError: mode must be one of 'process', 'thread' or an Executor
+    """
+    if isinstance(mode, Executor):
+        return mode, False
+
+    try:
+        executor_class = EXECUTORS[mode]
+    except (KeyError, TypeError):
+        raise ValueError("mode must be one of %s or an Executor" %
+                         ", ".join(repr(x) for x in sorted(EXECUTORS)))
+
+    return executor_class(max_workers=workers or cpu_count()), True
+
+
+def imap_chunks(chunk_func, chunked, workers=None, mode="thread",
+                ordered=True, buffersize=None):
+    # type: (Callable, Iterable, int, Any, bool, int) -> Iterable
+    """Yield chunk_func(chunk) for each chunk, computed on a pool of workers.
+
+    Chunks are submitted lazily: at most `buffersize` of them are pending at
+    any time, so the input is only read a bounded distance ahead of the
+    consumer. The pool is created on the first iteration and shut down when
+    the generator is exhausted or closed.
+
+    Args:
+        chunk_func: callable receiving a chunk and returning a result.
+        chunked: iterable of chunks.
+        workers: number of workers. Default to the number of CPUs.
+        mode: "thread", "process" or an existing Executor.
+        ordered: if False, yield results as soon as they are ready instead
+                 of in the input order.
+        buffersize: max number of chunks in flight. Default to
+                    twice the number of workers.
+
+    Example:
+
+        >>> list(imap_chunks(sum, [(1, 2), (3, 4), (5,)], workers=2))
+        [3, 7, 5]
+    """
+    executor, owned = get_executor(mode, workers)
+    buffersize = buffersize or 2 * (workers or cpu_count())
+    chunked = iter(chunked)
+    pending = deque()
+
+    try:
+        for chunk in itertools.islice(chunked, buffersize):
+            pending.append(executor.submit(chunk_func, chunk))
+
+        if ordered:
+            for result in _iter_ordered(executor, chunk_func, chunked,
+                                        pending):
+                yield result
+        else:
+            for result in _iter_unordered(executor, chunk_func, chunked,
+                                          pending):
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=True)
+
+
+def _iter_ordered(executor, chunk_func, chunked, pending):
+    while pending:
+        future = pending.popleft()
+        # refill before waiting, so that workers are never idle
+        for chunk in itertools.islice(chunked, 1):
+            pending.append(executor.submit(chunk_func, chunk))
+        yield future.result()
+
+
+def _iter_unordered(executor, chunk_func, chunked, pending):
+    while pending:
+        done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+        pending.clear()
+        pending.extend(not_done)
+        for future in done:
+            for chunk in itertools.islice(chunked, 1):
+                pending.append(executor.submit(chunk_func, chunk))
+            yield future.result()
+
+
+def parallel_map(iterable, func, workers=None, mode="thread", ordered=True,
+                 chunksize=None, buffersize=None):
+    # type: (Iterable, Callable, int, Any, bool, int, int) -> Iterable
+    """Lazily yield func(item) for each item, computed on a pool of workers.
+
+    Items are sent to the workers by chunks of `chunksize` to keep the
+    communication cost low.
+
+    Args:
+        iterable: the items to process.
+        func: the callable to apply. In "process" mode, it must be
+              picklable, which excludes lambdas and nested functions.
+        workers: number of workers. Default to the number of CPUs.
+        mode: "thread", "process" or an existing Executor.
+        ordered: if False, yield results as soon as their chunk is ready
+                 instead of in the input order.
+        chunksize: number of items sent to a worker at once. Default
+                   to 1 for threads and 64 for processes.
+        buffersize: max number of chunks in flight. Default to
+                    twice the number of workers.
+
+    Example:
+
+        >>> list(parallel_map(range(5), abs, workers=2, chunksize=2))
+        [0, 1, 2, 3, 4]
+    """
+    chunksize = chunksize or default_chunksize(mode)
+    if chunksize < 1:
+        raise ValueError("chunksize should be >= 1, not %s" % chunksize)
+
+    chunked = chunks(iterable, chunksize, list)
+    results = imap_chunks(partial(map_chunk, func), chunked,
+                          workers, mode, ordered, buffersize)
+    for result in results:
+        for item in result:
+            yield item
+
+
+def batch_map(iterable, func, size, max_latency=None, workers=None,
+              mode=None, ordered=True, buffersize=None):
+    # type: (Iterable, Callable, int, float, int, Any, bool, int) -> Iterable
+    """Lazily yield the results of func() called on lists of items
+
+    func() receives a list of up to `size` items and must return an
+    iterable with one result per item, in the same order. The results are
+    yielded one by one.
+
+    Args:
+        iterable: the items to process.
+        func: the callable receiving a batch. With mode="process", it must
+              be picklable.
+        size: the max number of items in a batch.
+        max_latency: if set, a batch is processed as soon as its first
+                     item waited for this number of seconds, even if it's
+                     not full. Items are then read from a background
+                     thread.
+        workers: number of workers, if mode is set. Default to the number
+                 of CPUs.
+        mode: None to call func() in the current thread, or "thread",
+              "process" or an Executor to process several batches in
+              parallel.
+        ordered: with a mode, if False, yield results as soon as their
+                 batch is ready instead of in the input order.
+        buffersize: with a mode, the max number of batches in flight.
+
+    Example:
+
+        >>> def double(batch):
+        ...     return [x * 2 for x in batch]
+        >>> list(batch_map(range(5), double, 2))
+        [0, 2, 4, 6, 8]
+        >>> list(batch_map(range(5), double, 2, mode="thread", workers=2))
+        [0, 2, 4, 6, 8]
+    """
+    if max_latency is None:
+        batches = chunks(iterable, size, list)
+    else:
+        batches = timed_chunks(iterable, size, max_latency)
+
+    if mode is None:
+        results = (map_batch(func, batch) for batch in batches)
+    else:
+        results = imap_chunks(partial(map_batch, func), batches, workers,
+                              mode, ordered, buffersize)
+    for result in results:
+        for item in result:
+            yield item
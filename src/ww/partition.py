@@ -0,0 +1,262 @@
+# coding: utf-8
+
+"""
+    Split an iterable into n streams by hash of a key, reading it once.
+
+    Unlike tee() followed by one filter per stream, the source is read only
+    once, and each item is only buffered for the stream it belongs to, up
+    to a bounded number of items.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import threading
+import multiprocessing
+
+from collections import deque
+
+from ww.utils import nop
+from ww.prefetch import clock
+
+try:
+    from typing import Any, Callable, Iterable, List  # noqa
+except ImportError:
+    pass
+
+# Items are sent to the worker processes by chunks of this size
+CHUNK_SIZE = 256
+
+# Default seconds to wait for another thread to start consuming a
+# partition with a full buffer
+START_TIMEOUT = 1
+
+# Seconds between checks that another thread could still start consuming
+# a partition with a full buffer
+POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+def _check_n(n):
+    if n < 1:
+        raise ValueError("n should be >= 1, not %s" % n)
+
+
+class Partitioner(object):
+    """Dispatch the items of a source to n partitions as they are read
+
+    Each partition is iterated with iter_partition(index). When it runs out
+    of items, it reads the source, and buffers the items of the other
+    partitions, up to about `buffersize` items each.
+
+    If a buffer is full, the reader waits for its partition to be consumed
+    from another thread. BufferError is raised instead if it's being
+    consumed from the same thread, if there is no other thread left to
+    consume it, or if no thread starts iterating it within start_timeout
+    seconds, as waiting could block forever: consume the partitions
+    concurrently, or increase buffersize. Set start_timeout to None to wait
+    for consumer threads however long they take to start.
+
+    Example:
+
+        >>> parts = Partitioner(range(6), 2, key=lambda x: x % 2 == 0)
+        >>> list(parts.iter_partition(0)), list(parts.iter_partition(1))
+        ([1, 3, 5], [0, 2, 4])
+    """
+
+    def __init__(self, iterable, n, key=None, buffersize=1024,
+                 start_timeout=START_TIMEOUT):
+        # type: (Iterable, int, Callable, int, float) -> None
+        _check_n(n)
+        if buffersize < 1:
+            raise ValueError("buffersize should be >= 1, not %s" % buffersize)
+        self.source = iter(iterable)
+        self.n = n
+        self.key = key or nop
+        self.buffersize = buffersize
+        self.start_timeout = start_timeout
+        self.buffers = [deque() for _ in range(n)]
+        self.consumers = [None] * n  # ident of the thread of each consumer
+        self.closed = [False] * n
+        self.exhausted = False
+        self.condition = threading.Condition()
+
+    def partition_of(self, item):
+        # type: (Any) -> int
+        return hash(self.key(item)) % self.n
+
+    def iter_partition(self, index):
+        # type: (int) -> Iterable
+        """ Yield the items of this partition """
+        buffer = self.buffers[index]
+        try:
+            while True:
+                with self.condition:
+                    self.consumers[index] = threading.current_thread().ident
+                    item = self._next(index, buffer)
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            with self.condition:
+                self.closed[index] = True
+                self.consumers[index] = None
+                buffer.clear()
+                self.condition.notify_all()
+
+    def _next(self, index, buffer):
+        # read the source until we get an item for this partition. Called
+        # with the lock held.
+        while True:
+            if buffer:
+                item = buffer.popleft()
+                self.condition.notify_all()
+                return item
+            if self.exhausted:
+                return _DONE
+            try:
+                item = next(self.source)
+            except StopIteration:
+                self.exhausted = True
+                self.condition.notify_all()
+                return _DONE
+            target = self.partition_of(item)
+            if target == index:
+                return item
+            # the item is buffered right away, so that items stay in order
+            # if another consumer reads the source while we wait
+            if not self.closed[target]:
+                self.buffers[target].append(item)
+            self._wait_for_room(target, buffer)
+
+    def _wait_for_room(self, target, buffer):
+        # wait until the target buffer is under buffersize, or we have
+        # items to return
+        deadline = None
+        if self.start_timeout is not None:
+            deadline = clock() + self.start_timeout
+        while (len(self.buffers[target]) >= self.buffersize and
+               not self.closed[target] and not buffer):
+            consumer = self.consumers[target]
+            if consumer == threading.current_thread().ident or (
+                    consumer is None and (
+                        threading.active_count() == 1 or
+                        deadline is not None and clock() >= deadline)):
+                raise BufferError(
+                    "The buffer of partition %s is full (%s items): consume "
+                    "the partitions from several threads, or increase "
+                    "buffersize" % (target, self.buffersize))
+            # without a consumer, check again in a while if one can start
+            self.condition.wait(None if consumer else POLL_INTERVAL)
+
+
+def partition(iterable, n, key=None, buffersize=1024,
+              start_timeout=START_TIMEOUT):
+    # type: (Iterable, int, Callable, int, float) -> List[Iterable]
+    """Return n iterables, the ith yielding the items with hash(key) % n == i
+
+    See Partitioner for the buffering. Hashes of strings are randomized per
+    process, so the partition of a string key may change between runs,
+    unless PYTHONHASHSEED is set.
+
+    Example:
+
+        >>> evens, odds = partition(range(6), 2)
+        >>> list(evens), list(odds)
+        ([0, 2, 4], [1, 3, 5])
+    """
+    partitioner = Partitioner(iterable, n, key, buffersize, start_timeout)
+    return [partitioner.iter_partition(index) for index in range(n)]
+
+
+def process_partitions(iterable, n, func, key=None, buffersize=1024):
+    # type: (Iterable, int, Callable, Callable, int) -> List
+    """Call func(items) on each partition in its own process
+
+    The items are read and dispatched by the current process, and sent by
+    chunks to one worker process per partition, through a queue holding at
+    most `buffersize` items. Return the n results, in the order of the
+    partitions. An exception raised by func is raised here once all the
+    items have been dispatched.
+
+    func, the items and the results must be picklable, so func must be
+    defined at the top level of a module.
+
+    Example:
+
+        >>> process_partitions(range(10), 2, sum)
+        [20, 25]
+    """
+    _check_n(n)
+    key = key or nop
+    maxsize = max(1, buffersize // CHUNK_SIZE)
+    queues = [multiprocessing.Queue(maxsize) for _ in range(n)]
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_work, name='ww-partition',
+                                       args=(func, queue, results, index))
+               for index, queue in enumerate(queues)]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    try:
+        _dispatch(iterable, n, key, queues)
+        return _collect(results, n)
+    except BaseException:
+        for worker in workers:
+            worker.terminate()
+        raise
+    finally:
+        for worker in workers:
+            worker.join()
+
+
+def _dispatch(iterable, n, key, queues):
+    chunks = [[] for _ in range(n)]
+    for item in iterable:
+        index = hash(key(item)) % n
+        chunk = chunks[index]
+        chunk.append(item)
+        if len(chunk) == CHUNK_SIZE:
+            queues[index].put(chunk)
+            chunks[index] = []
+    for chunk, queue in zip(chunks, queues):
+        if chunk:
+            queue.put(chunk)
+        queue.put(None)
+
+
+def _collect(results, n):
+    outputs = [None] * n
+    errors = []
+    for _ in range(n):
+        index, output, error = results.get()
+        outputs[index] = output
+        if error is not None:
+            errors.append(error)
+    if errors:
+        raise errors[0]
+    return outputs
+
+
+def _read_chunks(queue):
+    # type: (multiprocessing.Queue) -> Iterable
+    for chunk in iter(queue.get, None):
+        for item in chunk:
+            yield item
+
+
+def _work(func, queue, results, index):
+    # type: (Callable, multiprocessing.Queue, multiprocessing.Queue, int) -> None  # noqa
+    """ Run func on the items of a partition, in a worker process """
+    items = _read_chunks(queue)
+    output = error = None
+    try:
+        output = func(items)
+    except Exception as e:
+        error = e
+    # read the rest of the items, so that the dispatching never blocks
+    for _ in items:
+        pass
+    results.put((index, output, error))
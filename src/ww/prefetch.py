@@ -0,0 +1,165 @@
+# coding: utf-8
+
+"""
+    Read an iterable ahead of its consumer from background threads.
+
+    While the consumer processes an item, the next ones are already being
+    produced, so the time spent waiting for a slow producer (network, disk,
+    decompression...) overlaps with the consumer's work.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import time
+import threading
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+try:
+    from typing import Iterable  # noqa
+except ImportError:
+    pass
+
+_DONE = object()
+
+clock = getattr(time, 'monotonic', time.time)
+
+
+def prefetch(iterable, size=1, workers=1):
+    # type: (Iterable, int, int) -> Iterable
+    """Yield the items of iterable, reading up to `size` of them in advance
+
+    The items are read by a background thread, started on the first
+    iteration. Exceptions raised by the iterable are raised in the
+    consumer. If the consumer stops early, the thread stops after at most
+    one more item, and closes the iterable if it's a generator.
+
+    Args:
+        iterable: the items to read ahead.
+        size: the max number of items read in advance.
+        workers: the number of threads calling next() on the iterable
+                 concurrently. Items are then yielded as soon as they are
+                 produced, so order is only kept with 1 worker. Use more
+                 only if the iterator is thread safe, which excludes
+                 generators.
+
+    Example:
+
+        >>> list(prefetch(range(5), size=2))
+        [0, 1, 2, 3, 4]
+    """
+    if size < 1:
+        raise ValueError("size should be >= 1, not %s" % size)
+    if workers < 1:
+        raise ValueError("workers should be >= 1, not %s" % workers)
+
+    buffer, stop = _start(iterable, size, workers)
+
+    done = 0
+    try:
+        while done < workers:
+            item = _get(buffer)
+            if item is _DONE:
+                done += 1
+                continue
+            yield item
+    finally:
+        stop.set()
+        _drain(buffer)
+
+
+def timed_chunks(iterable, size, max_latency):
+    # type: (Iterable, int, float) -> Iterable
+    """Yield lists of up to `size` items, waiting at most max_latency
+
+    Like chunks(), but a list is yielded as soon as its first item is older
+    than max_latency seconds, even if it's not full, so that slow sources
+    don't hold items back. Items are read from a background thread to
+    respect the deadline even while the source blocks.
+
+    Example:
+
+        >>> list(timed_chunks(range(5), 2, max_latency=10))
+        [[0, 1], [2, 3], [4]]
+    """
+    if size < 1:
+        raise ValueError("size should be >= 1, not %s" % size)
+
+    buffer, stop = _start(iterable, size, 1)
+    batch = []
+    deadline = None
+    try:
+        while True:
+            try:
+                timeout = None if not batch else max(0, deadline - clock())
+                item = _get(buffer, timeout)
+            except queue.Empty:
+                yield batch
+                batch = []
+                continue
+
+            if item is _DONE:
+                if batch:
+                    yield batch
+                return
+
+            if not batch:
+                deadline = clock() + max_latency
+            batch.append(item)
+            if len(batch) == size:
+                yield batch
+                batch = []
+    finally:
+        stop.set()
+        _drain(buffer)
+
+
+def _start(iterable, size, workers):
+    source = iter(iterable)
+    # each worker can put one more item after being stopped, so this size
+    # makes sure that none of them blocks forever once the buffer is drained
+    buffer = queue.Queue(max(size, workers))
+    stop = threading.Event()
+
+    close = workers == 1 and hasattr(source, 'close')
+    for _ in range(workers):
+        thread = threading.Thread(target=_produce, name='ww-prefetch',
+                                  args=(source, buffer, stop, close))
+        thread.daemon = True
+        thread.start()
+    return buffer, stop
+
+
+def _produce(source, buffer, stop, close):
+    try:
+        for item in source:
+            buffer.put((item, None))
+            if stop.is_set():
+                break
+        else:
+            buffer.put((_DONE, None))
+    except Exception as e:
+        buffer.put((None, e))
+    finally:
+        if close and stop.is_set():
+            source.close()
+
+
+def _get(buffer, timeout=None):
+    # re-raise in the consumer the exceptions raised in the producers
+    item, error = buffer.get(timeout=timeout)
+    if error is not None:
+        raise error
+    return item
+
+
+def _drain(buffer):
+    try:
+        while True:
+            buffer.get_nowait()
+    except queue.Empty:
+        pass
@@ -0,0 +1,193 @@
+# coding: utf-8
+
+"""
+    Count items and measure time for each stage of g() pipelines.
+
+    Profiling is opt-in, with g(iterable, profile=True) or inside a
+    "with ww.profile()" block. Then, instead of being fused into one loop,
+    each stage is run separately, with its input and output wrapped to
+    count the items and time the calls to next(), and the callables it
+    receives (map functions, keys...) wrapped to time them.
+
+    When profiling is off, g() only checks one attribute when a stage is
+    created, so there is no cost per item.
+
+    Example:
+
+        >>> import ww
+        >>> with ww.profile() as profiler:
+        ...     total = ww.g(range(10)).map(abs).filter(bool).chunks(3).list()
+        >>> for stats in profiler.stats():
+        ...     print(stats['stage'], stats['items_in'], stats['items_out'])
+        map 10 10
+        filter 10 9
+        chunks 9 3
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import time
+import functools
+
+from contextlib import contextmanager
+
+try:
+    from typing import Any, Callable, Iterable, Iterator, List  # noqa
+except ImportError:
+    pass
+
+clock = getattr(time, 'perf_counter', time.time)
+
+# Profilers of the "with profile()" blocks we are in, innermost last
+_active = []
+
+STAGE_NAMES = {
+    'islice': 'slice',
+}
+
+
+class StageStats(object):
+    """ Counters of one stage of a pipeline """
+
+    def __init__(self, name):
+        # type: (str) -> None
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.wall = 0.0  # time in next() on the output, upstream included
+        self.upstream = 0.0  # time in next() on the input
+        self.callables = 0.0  # time in the callables given to the stage
+
+    def probe_input(self, iterator):
+        # type: (Iterator) -> Iterator
+        """ Count the items read from iterator, and time reading them """
+        iterator = iter(iterator)
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.upstream += clock() - start
+                return
+            self.upstream += clock() - start
+            self.items_in += 1
+            yield item
+
+    def probe_output(self, iterator):
+        # type: (Iterator) -> Iterator
+        """ Count the items produced by iterator, and time producing them """
+        iterator = iter(iterator)
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.wall += clock() - start
+                return
+            self.wall += clock() - start
+            self.items_out += 1
+            yield item
+
+    def timed(self, func):
+        # type: (Callable) -> Callable
+        """ Wrap func to add the time spent in it to self.callables """
+        if not callable(func):
+            return func
+
+        @functools.wraps(func)
+        def timed_func(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.callables += clock() - start
+        return timed_func
+
+    @property
+    def time(self):
+        # type: () -> float
+        """ Time spent in this stage only """
+        return max(0.0, self.wall - self.upstream)
+
+    def as_dict(self):
+        # type: () -> dict
+        return {
+            'stage': self.name,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'time': self.time,
+            'wall': self.wall,
+            'callables': self.callables,
+        }
+
+
+class Profiler(object):
+    """ Stats of all the stages profiled, in the order they were created """
+
+    def __init__(self):
+        self.stages = []  # type: List[StageStats]
+
+    def stage(self, kind):
+        # type: (str) -> StageStats
+        stats = StageStats(STAGE_NAMES.get(kind, kind))
+        self.stages.append(stats)
+        return stats
+
+    def stats(self):
+        # type: () -> List[dict]
+        """Return a dict per stage with:
+
+            - stage: the name of the operation.
+            - items_in, items_out: the number of items read and produced.
+            - time: seconds spent in the stage itself.
+            - wall: seconds spent getting items out of the stage,
+                    including the time spent by the previous stages.
+            - callables: seconds spent in the callables passed to the
+                         stage, such as the function given to map().
+        """
+        return [stats.as_dict() for stats in self.stages]
+
+    def explain(self):
+        # type: () -> str
+        """ Return the stats as a table """
+        lines = ['%-20s %12s %12s %11s %11s %11s' % (
+            'stage', 'items in', 'items out', 'time (s)', 'wall (s)',
+            'calls (s)')]
+        for stats in self.stages:
+            lines.append('%-20s %12d %12d %11.6f %11.6f %11.6f' % (
+                stats.name, stats.items_in, stats.items_out, stats.time,
+                stats.wall, stats.callables))
+        return '\n'.join(lines)
+
+
+def current():
+    # type: () -> Profiler
+    """ Return the profiler of the innermost "with profile()" or None """
+    return _active[-1] if _active else None
+
+
+@contextmanager
+def profile():
+    """Profile the g() objects created in this block, yield the Profiler
+
+    Stages created in the block are profiled even if they are iterated
+    after it.
+    """
+    profiler = Profiler()
+    _active.append(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.remove(profiler)
+
+
+def profiled_stage(stats, stage):
+    # type: (StageStats, tuple) -> tuple
+    """ Return a copy of a ww.fusion stage, with its callables timed """
+    kind = stage[0]
+    if kind in ('map', 'filter', 'starts_when', 'stops_when'):
+        return (kind, stats.timed(stage[1]))
+    if kind == 'skip_duplicates':
+        return (kind, stats.timed(stage[1])) + stage[2:]
+    return stage
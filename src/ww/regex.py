@@ -0,0 +1,478 @@
+# coding: utf-8
+
+"""
+    Compiled regular expressions for s().split() and s().replace().
+
+    re.split() and re.sub() look the pattern up in the cache of the re
+    module on each call, which only keeps a fixed number of patterns:
+    past it, patterns are compiled again. CACHE is an LRU cache of the
+    compiled patterns, with a size that can be changed and hit/miss
+    statistics:
+
+        >>> CACHE.resize(1024)  # doctest: +SKIP
+        >>> CACHE.info()  # doctest: +SKIP
+        CacheInfo(hits=12, misses=3, maxsize=1024, currsize=3)
+
+    To skip even that lookup in a hot loop, compile the pattern once with
+    s.compile(), and pass it instead of the string.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import re
+
+from collections import OrderedDict, namedtuple
+
+try:
+    from typing import Any, Callable, Iterable, List, Union  # noqa
+except ImportError:
+    pass
+
+import ww
+
+from ww.utils import basestring, ensure_tuple
+
+# Max number of compiled patterns kept by default
+CACHE_SIZE = 512
+
+REGEX_FLAGS = {
+    'm': re.MULTILINE,
+    'x': re.VERBOSE,
+    'v': re.VERBOSE,
+    's': re.DOTALL,
+    '.': re.DOTALL,
+    'd': re.DEBUG,
+    'i': re.IGNORECASE,
+    'u': re.UNICODE,
+    'l': re.LOCALE,
+}
+
+try:
+    # Python2 doesn't support re.ASCII flag
+    REGEX_FLAGS['a'] = re.ASCII
+except AttributeError:
+    pass
+
+PATTERN_TYPE = type(re.compile(''))
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+# flags already parsed, by string
+_parsed_flags = {}
+
+# a reference to a group by number, as in r"(a)\1" or r"(a)?(?(1)b|c)",
+# but not r"\\1", which is an escaped backslash followed by 1
+_BACKREFERENCE = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d')
+
+
+def parse_flags(flags):
+    # type: (Union[str, int]) -> int
+    """Return the re flags for a string such as 'im', or flags as is
+
+    Example:
+
+        >>> parse_flags('im') == re.IGNORECASE | re.MULTILINE
+        True
+        >>> parse_flags(re.DOTALL) == re.DOTALL
+        True
+    """
+    if not isinstance(flags, basestring):
+        return flags
+    try:
+        return _parsed_flags[flags]
+    except KeyError:
+        pass
+    parsed = 0
+    for flag in flags:
+        parsed |= REGEX_FLAGS[flag]
+    if len(_parsed_flags) < len(REGEX_FLAGS) ** 2:
+        _parsed_flags[flags] = parsed
+    return parsed
+
+
+class PatternCache(object):
+    """LRU cache of compiled patterns, by pattern and flags
+
+    Compiled patterns and Regex objects are returned as is, like
+    re.compile() does.
+
+    Example:
+
+        >>> cache = PatternCache(1)
+        >>> cache.get('a+') is cache.get('a+')
+        True
+        >>> cache.get('b+') and cache.info()
+        CacheInfo(hits=1, misses=2, maxsize=1, currsize=1)
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        # type: (int) -> None
+        self.patterns = OrderedDict()
+        self.hits = self.misses = 0
+        self.resize(maxsize)
+
+    def get(self, pattern, flags=0):
+        # type: (Any, Union[str, int]) -> PATTERN_TYPE
+        """ Return pattern compiled with flags """
+        # flags are parsed on a miss only: 'i' and re.I are 2 entries
+        key = (pattern, flags)
+        patterns = self.patterns
+        try:
+            # popped and set again to move it to the end
+            compiled = patterns.pop(key)
+        except KeyError:
+            return self._add(key, pattern, parse_flags(flags))
+        self.hits += 1
+        patterns[key] = compiled
+        return compiled
+
+    def _add(self, key, pattern, flags):
+        if isinstance(pattern, Regex):
+            pattern = pattern.regex
+        if isinstance(pattern, PATTERN_TYPE):
+            if flags:
+                raise ValueError("cannot process flags argument with a "
+                                 "compiled pattern")
+            return pattern
+
+        compiled = re.compile(pattern, flags)
+        self.misses += 1
+        if flags & re.DEBUG:  # so that it is printed each time
+            return compiled
+        self._store(key, compiled)
+        return compiled
+
+    def _store(self, key, value):
+        if len(self.patterns) >= self.maxsize:
+            self.patterns.popitem(last=False)
+        self.patterns[key] = value
+
+    def resize(self, maxsize):
+        # type: (int) -> None
+        """ Change the max number of patterns, dropping the oldest ones """
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1, not %s" % maxsize)
+        self.maxsize = maxsize
+        while len(self.patterns) > maxsize:
+            self.patterns.popitem(last=False)
+
+    def clear(self):
+        """ Remove all the patterns, and reset the statistics """
+        self.patterns.clear()
+        self.hits = self.misses = 0
+
+    def info(self):
+        # type: () -> CacheInfo
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self.patterns))
+
+    def __len__(self):
+        return len(self.patterns)
+
+
+# Used by s().split() and s().replace()
+CACHE = PatternCache()
+
+
+def compiled(pattern, flags=0):
+    # type: (Any, Union[str, int]) -> PATTERN_TYPE
+    """Return pattern compiled with flags, from CACHE if it's a string
+
+    Compiled patterns and Regex objects are used as is, without touching
+    CACHE.
+
+    Example:
+
+        >>> digits = Regex(r'\\d')
+        >>> compiled(digits) is digits.regex
+        True
+    """
+    if isinstance(pattern, Regex):
+        pattern = pattern.regex
+    elif not isinstance(pattern, PATTERN_TYPE):
+        return CACHE.get(pattern, flags)
+    if flags:
+        raise ValueError("cannot process flags argument with a compiled "
+                         "pattern")
+    return pattern
+
+
+class Regex(object):
+    """A pattern compiled once, to reuse without any cache lookup
+
+    It can be given to s().split() and s().replace() instead of a string,
+    and has the methods of the compiled pattern, plus split() and replace()
+    returning ww wrappers.
+
+    Example:
+
+        >>> digits = Regex(r'\\d+')
+        >>> digits.split('a1b22c').list()
+        [u'a', u'b', u'c']
+        >>> digits.replace('a1b22c', '-')
+        u'a-b-c'
+        >>> digits.findall('a1b22c')
+        ['1', '22']
+    """
+
+    def __init__(self, pattern, flags=0):
+        # type: (Any, Union[str, int]) -> None
+        flags = parse_flags(flags)
+        if isinstance(pattern, Regex):
+            pattern = pattern.regex
+        if isinstance(pattern, PATTERN_TYPE) and not flags:
+            self.regex = pattern
+        else:
+            self.regex = re.compile(pattern, flags)
+
+    def split(self, string, maxsplit=0):
+        # type: (str, int) -> ww.g
+        return ww.g(ww.s(chunk)
+                    for chunk in self.regex.split(string, maxsplit))
+
+    def replace(self, string, substitution, maxreplace=0):
+        # type: (str, Any, int) -> ww.s
+        return ww.s(self.regex.sub(substitution, string, maxreplace))
+
+    def __getattr__(self, name):
+        if name == 'regex':  # not set yet, when unpickling
+            raise AttributeError(name)
+        return getattr(self.regex, name)
+
+    def __repr__(self):
+        return 'Regex(%r, %s)' % (self.regex.pattern, self.regex.flags)
+
+
+def pair_substitutions(patterns, substitutions):
+    # type: (Any, Any) -> tuple
+    """Return the patterns and one substitution for each, as tuples
+
+    Example:
+
+        >>> pair_substitutions(('a', 'b'), '')
+        (('a', 'b'), ('', ''))
+    """
+    if isinstance(patterns, (Regex, PATTERN_TYPE)):
+        patterns = (patterns,)  # faster than ensure_tuple() failing tuple()
+    else:
+        patterns = ensure_tuple(patterns)
+    substitutions = ensure_tuple(substitutions)
+    if len(substitutions) == 1:
+        substitutions *= len(patterns)
+    elif len(patterns) != len(substitutions):
+        raise ValueError("You must have exactly one substitution "
+                         "for each pattern or only one substitution")
+    return patterns, substitutions
+
+
+def _trie_pattern(words):
+    # type: (Iterable[str]) -> str
+    """Return a regex matching the longest of the words at each position
+
+    Words sharing a prefix share a branch, so that matching at a position
+    costs one step per character whatever the number of words, like in
+    the trie of the Aho-Corasick algorithm.
+
+    Example:
+
+        >>> print(_trie_pattern(['car', 'cart', 'cat', 'dog']))
+        (?:ca(?:r(?:t)?|t)|dog)
+    """
+    trie = {}  # type: dict
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = None  # a word ends here
+
+    def node_pattern(node):
+        branches = [re.escape(char) + node_pattern(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if '' in node:  # greedy, so that the longest word wins
+            return '(?:%s)?' % '|'.join(branches)
+        if len(branches) > 1:
+            return '(?:%s)' % '|'.join(branches)
+        return branches[0]
+
+    return node_pattern(trie)
+
+
+def _action(pattern, substitution):
+    # type: (PATTERN_TYPE, Any) -> Callable
+    """Return a function computing the substitution of a match of pattern
+    in the merged regex of a Replacer"""
+    if not callable(substitution) and '\\' not in substitution:
+        return lambda match: substitution
+
+    # the groups of pattern are numbered differently in the merged regex,
+    # so it's matched again alone to get a match object with its numbers
+    def rematch(match):
+        return pattern.match(match.string, match.start())
+
+    if callable(substitution):
+        return lambda match: substitution(rematch(match))
+    return lambda match: rematch(match).expand(substitution)
+
+
+def _check_mergeable(patterns, regexes, flags):
+    # type: (tuple, List[PATTERN_TYPE], int) -> None
+    """Raise ValueError if the regexes can't be merged into one alternation,
+    naming the first pattern which can't and why"""
+    names = set()  # type: set
+    for pattern, regex in zip(patterns, regexes):
+        reason = None
+        if regex.flags != re.compile(regex.pattern[:0], flags).flags:
+            if isinstance(pattern, (Regex, PATTERN_TYPE)):
+                reason = "was compiled with other flags than the others"
+            else:
+                reason = ("sets inline flags such as (?i): use the flags "
+                          "argument instead")
+        elif regex.groups and _BACKREFERENCE.search(regex.pattern):
+            reason = ("refers to a group by number, and groups are "
+                      "numbered differently once merged")
+        elif names.intersection(regex.groupindex):
+            reason = ("uses the group name %r, also used by a previous "
+                      "pattern" % sorted(names.intersection(
+                          regex.groupindex))[0])
+        if reason:
+            raise ValueError("Can't replace %r in a single pass with the "
+                             "other patterns, as it %s. Use "
+                             "single_pass=False to replace them one after "
+                             "the other." % (regex.pattern, reason))
+        names.update(regex.groupindex)
+
+
+class Replacer(object):
+    """Replace several patterns in a single pass over strings
+
+    The patterns are merged into one alternation, so each string is
+    scanned once, instead of once per pattern. As with re.sub(), the
+    substitutions can be templates such as r"<\\1>", or callables
+    receiving the match of their pattern.
+
+    The result can differ from replacing the patterns one after the other
+    when they overlap: at each position, the first pattern of the list
+    that matches wins, and replaced text is never matched again.
+    maxreplace limits the total number of replacements.
+
+    With literal=True, the patterns and substitutions are plain strings,
+    and at each position, the longest pattern wins. The patterns are
+    merged into a trie, so large tables stay fast. With re.IGNORECASE,
+    the patterns are compared lowercased, the first one winning.
+
+    Example:
+
+        >>> Replacer(('a', 'b'), ('b', 'c')).replace('ab')
+        'bc'
+        >>> Replacer((r'(\\d+)', '-'), (r'<\\1>', '')).replace('a-12')
+        'a<12>'
+        >>> Replacer(('he', 'hello'), ('1', '2'), literal=True).replace(
+        ...     'hello help')
+        '2 1lp'
+    """
+
+    def __init__(self, patterns, substitutions, flags=0, literal=False):
+        # type: (Any, Any, Union[str, int], bool) -> None
+        patterns, substitutions = pair_substitutions(patterns, substitutions)
+        if not patterns:
+            raise ValueError("At least one pattern is needed")
+        flags = parse_flags(flags)
+        self.literal = literal
+        if literal:
+            self._init_literal(patterns, substitutions, flags)
+        else:
+            self._init_patterns(patterns, substitutions, flags)
+
+    def _init_literal(self, words, substitutions, flags):
+        self.fold = bool(flags & re.IGNORECASE)
+        self.table = {}
+        for word, substitution in zip(words, substitutions):
+            self.table.setdefault(word.lower() if self.fold else word,
+                                  substitution)
+        self.regex = re.compile(_trie_pattern(self.table), flags)
+
+        table = self.table
+        if self.fold or any(callable(sub) for sub in table.values()):
+            self.substitute = self._substitute_literal
+        else:  # the most common case, made as fast as possible
+            self.substitute = lambda match: table[match.group()]
+
+    def _init_patterns(self, patterns, substitutions, flags):
+        regexes = [CACHE.get(pattern, flags) for pattern in patterns]
+        _check_mergeable(patterns, regexes, flags)
+
+        # each pattern is followed by an empty group, and as it's the last
+        # group to match, lastindex tells which pattern matched. Unlike a
+        # group around the pattern, it lets re skip positions where no
+        # pattern can start.
+        self.actions = {}
+        index = 0
+        for regex, substitution in zip(regexes, substitutions):
+            index += regex.groups + 1
+            self.actions[index] = _action(regex, substitution)
+
+        # a newline ends the comments of verbose patterns
+        end = '\n)()' if regexes[0].flags & re.VERBOSE else ')()'
+        merged = '|'.join('(?:' + regex.pattern + end for regex in regexes)
+        self.regex = re.compile(merged, regexes[0].flags)
+
+        actions = self.actions
+        self.substitute = lambda match: actions[match.lastindex](match)
+
+    def _substitute_literal(self, match):
+        text = match.group()
+        try:
+            substitution = self.table[text.lower() if self.fold else text]
+        except KeyError:
+            substitution = self._find_folded(text)
+        if callable(substitution):
+            return substitution(match)
+        return substitution
+
+    def _find_folded(self, text):
+        # type: (str) -> Any
+        """Return the substitution of the first word equal to text when
+        ignoring case, as re folds some letters that lower() doesn't, such
+        as "ſ", which matches "s" """
+        flags = self.regex.flags & ~re.VERBOSE
+        for word, substitution in self.table.items():
+            if re.match(re.escape(word) + r'\Z', text, flags):
+                return substitution
+        raise KeyError(text)
+
+    def replace(self, string, maxreplace=0):
+        # type: (str, int) -> str
+        return self.regex.sub(self.substitute, string, maxreplace)
+
+
+class ReplacerCache(PatternCache):
+    """LRU cache of Replacers, by (patterns, substitutions, literal) and
+    flags
+
+    Substitutions that can't be hashed get a new Replacer each time.
+    """
+
+    def get(self, args, flags=0):
+        # type: (tuple, Union[str, int]) -> Replacer
+        try:
+            hash(args)
+        except TypeError:
+            return self._create(args, flags)
+        return super(ReplacerCache, self).get(args, flags)
+
+    def _create(self, args, flags):
+        patterns, substitutions, literal = args
+        return Replacer(patterns, substitutions, flags, literal)
+
+    def _add(self, key, args, flags):
+        replacer = self._create(args, flags)
+        self.misses += 1
+        self._store(key, replacer)
+        return replacer
+
+
+# Used by s().replace(single_pass=True)
+REPLACERS = ReplacerCache(64)
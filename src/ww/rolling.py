@@ -0,0 +1,301 @@
+# coding: utf-8
+
+"""
+    Aggregates over a window sliding on an iterable, in O(1) per item.
+
+    window() yields a new tuple of `size` items for each item, so computing
+    an aggregate on each window costs O(size) per item. Here, each
+    aggregate is updated with the item entering the window and the one
+    leaving it:
+
+        - sum, mean and var keep running values. To cancel the floating
+          point errors that accumulate along the way, they are recomputed
+          from the window once every `size` items, which is O(1) amortized.
+        - min and max keep a deque of the items that can still become the
+          min (or max) of a later window, which is monotonic.
+
+    Like window(), each function yields one value per window of `size`
+    consecutive items, or a single one for all the items if there are
+    fewer than `size`.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import array
+import operator
+import itertools
+
+from collections import deque
+
+import ww
+
+try:
+    from typing import Any, Callable, Iterable, Sequence  # noqa
+except ImportError:
+    pass
+
+
+def _check_size(size):
+    if size < 1:
+        raise ValueError("size should be >= 1, not %s" % size)
+
+
+def rolling_sum(iterable, size):
+    # type: (Iterable, int) -> Iterable
+    """
+        >>> list(rolling_sum([1, 2, 3, 4], 2))
+        [3, 5, 7]
+    """
+    _check_size(size)
+    iterable = iter(iterable)
+    items = deque(itertools.islice(iterable, size), size)
+    if not items:
+        return
+    total = sum(items)
+    yield total
+
+    steps = 0
+    for x in iterable:
+        total += x - items[0]
+        items.append(x)
+        steps += 1
+        if steps == size:
+            total = sum(items)
+            steps = 0
+        yield total
+
+
+def rolling_mean(iterable, size):
+    # type: (Iterable, int) -> Iterable
+    """
+        >>> list(rolling_mean([1, 2, 3, 4], 2))
+        [1.5, 2.5, 3.5]
+    """
+    _check_size(size)
+    iterable = iter(iterable)
+    first = list(itertools.islice(iterable, size))
+    if not first:
+        return
+    # the window is only partial if there are fewer than "size" items
+    count = len(first)
+    for total in rolling_sum(itertools.chain(first, iterable), size):
+        yield total / count
+
+
+def rolling_var(iterable, size, ddof=1):
+    # type: (Iterable, int, int) -> Iterable
+    """
+        Variance of each window, with the same "ddof" as
+        ww.accumulators.Var: 1 for the sample variance, 0 for the
+        population variance. Yield None if the window has ddof items or
+        fewer.
+
+        >>> list(rolling_var([2, 4, 4, 4, 5, 5, 7, 9], 4, ddof=0))
+        [0.75, 0.1875, 0.25, 1.1875, 2.75]
+    """
+    _check_size(size)
+    iterable = iter(iterable)
+    items = deque(itertools.islice(iterable, size), size)
+    if not items:
+        return
+    count = len(items)
+
+    def exact():
+        mean = sum(items) / count
+        return mean, sum((x - mean) ** 2 for x in items)
+
+    def result(m2):
+        return None if count <= ddof else max(m2, 0.0) / (count - ddof)
+
+    mean, m2 = exact()
+    yield result(m2)
+
+    steps = 0
+    for x in iterable:
+        old = items[0]
+        items.append(x)
+        steps += 1
+        if steps == size:
+            mean, m2 = exact()
+            steps = 0
+        else:
+            # replace old by x in Welford's update
+            new_mean = mean + (x - old) / count
+            m2 += (x - old) * (x - new_mean + old - mean)
+            mean = new_mean
+        yield result(m2)
+
+
+def rolling_min(iterable, size):
+    # type: (Iterable, int) -> Iterable
+    """
+        >>> list(rolling_min([3, 1, 4, 1, 5, 9, 2], 3))
+        [1, 1, 1, 1, 2]
+    """
+    return _rolling_best(iterable, size, operator.lt)
+
+
+def rolling_max(iterable, size):
+    # type: (Iterable, int) -> Iterable
+    """
+        >>> list(rolling_max([3, 1, 4, 1, 5, 9, 2], 3))
+        [4, 4, 5, 9, 9]
+    """
+    return _rolling_best(iterable, size, operator.gt)
+
+
+def _rolling_best(iterable, size, better):
+    # type: (Iterable, int, Callable) -> Iterable
+    _check_size(size)
+    # (index, item) of the candidates to be the min of a future window:
+    # each one is better than all the ones before it
+    candidates = deque()
+    index = -1
+    for index, x in enumerate(iterable):
+        while candidates and not better(candidates[-1][1], x):
+            candidates.pop()
+        candidates.append((index, x))
+        if candidates[0][0] <= index - size:
+            candidates.popleft()
+        if index >= size - 1:
+            yield candidates[0][1]
+
+    if 0 <= index < size - 1:  # fewer items than size
+        yield candidates[0][1]
+
+
+class WindowView(object):
+    """Read only sequence of the items of a window, without copying them
+
+    It's only valid until the window moves.
+    """
+
+    __slots__ = ('buffer', 'start', 'stop')
+
+    def __init__(self, buffer, start, stop):
+        self.buffer = buffer
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.buffer[self.start:self.stop][index]
+        length = self.stop - self.start
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('window index out of range')
+        return self.buffer[self.start + index]
+
+    def __iter__(self):
+        return itertools.islice(self.buffer, self.start, self.stop)
+
+    def __repr__(self):
+        return 'WindowView(%r)' % (list(self),)
+
+
+def window_views(iterable, size, typecode=None):
+    # type: (Iterable, int, str) -> Iterable
+    """Like window(), but yield views of a shared buffer instead of tuples
+
+    Items are stored in a buffer twice the size of the window, so moving
+    the window just moves the view, and the buffer is compacted once every
+    `size` items. Each view is only valid until the next one is yielded.
+
+    Args:
+        iterable: the items.
+        size: the number of items in a window.
+        typecode: if set, items are stored in an array.array of this type,
+                  and the views are memoryview slices of it, that can be
+                  passed to anything accepting a buffer.
+
+    Example:
+
+        >>> [list(view) for view in window_views('abcd', 3)]
+        [['a', 'b', 'c'], ['b', 'c', 'd']]
+        >>> [view.tolist() for view in window_views([1, 2, 3], 2, 'd')]
+        [[1.0, 2.0], [2.0, 3.0]]
+    """
+    _check_size(size)
+    iterable = iter(iterable)
+    first = list(itertools.islice(iterable, size))
+    if not first:
+        return
+
+    capacity = 2 * size
+    if typecode is None:
+        buffer = first + [None] * (capacity - len(first))
+
+        def view(start, stop):
+            return WindowView(buffer, start, stop)
+    else:
+        items = array.array(typecode, first)
+        items.extend(array.array(typecode, [0]) * (capacity - len(first)))
+        # the array can't be resized once exported: write through the view
+        buffer = memoryview(items)
+
+        def view(start, stop):
+            return buffer[start:stop]
+
+    start = 0
+    yield view(start, len(first))
+    for x in iterable:
+        stop = start + size
+        if stop == capacity:
+            buffer[:size - 1] = buffer[start + 1:stop]
+            start, stop = -1, size - 1
+        buffer[stop] = x
+        start += 1
+        yield view(start, stop + 1)
+
+
+class RollingWrapper(object):
+    """Rolling aggregates of an iterable, returned by g().rolling(size)
+
+    Each method returns a g() of the aggregate for each window. Only one
+    of them can be called, as they consume the same iterable.
+
+    Example:
+
+        >>> import ww
+        >>> ww.g([1, 2, 3, 4, 5]).rolling(3).sum().list()
+        [6, 9, 12]
+        >>> ww.g([1, 2, 3, 4, 5]).rolling(3).max().list()
+        [3, 4, 5]
+    """
+
+    def __init__(self, iterable, size):
+        # type: (Iterable, int) -> None
+        _check_size(size)
+        self.iterable = iterable
+        self.size = size
+
+    def _wrap(self, func, *args):
+        return ww.g(func(self.iterable, self.size, *args))
+
+    def sum(self):
+        return self._wrap(rolling_sum)
+
+    def mean(self):
+        return self._wrap(rolling_mean)
+
+    def min(self):
+        return self._wrap(rolling_min)
+
+    def max(self):
+        return self._wrap(rolling_max)
+
+    def var(self, ddof=1):
+        return self._wrap(rolling_var, ddof)
+
+    def std(self, ddof=1):
+        return self.var(ddof).map(lambda var: None if var is None
+                                  else var ** 0.5)
+
+    def view(self, typecode=None):
+        """ See window_views() """
+        return self._wrap(window_views, typecode)
@@ -27,23 +27,19 @@ import six
 # TODO: match.__repr__ should show match, groups, groupsdict in summary
 
 import re
-import inspect
+import sys
 
 from textwrap import dedent
 
-import chardet
-
-try:
-    from formatizer import LiteralFormatter
-    FORMATTER = LiteralFormatter()
-except ImportError:
-    FORMATTER = str
-
 from six import with_metaclass
-from past.builtins import basestring
 
 from .g import g
-from .utils import ensure_tuple
+from .utils import basestring
+from .regex import (CACHE, PATTERN_TYPE, REGEX_FLAGS, REPLACERS,  # noqa
+                    Regex, compiled, pair_substitutions, parse_flags)
+
+# chardet and formatizer are only imported when needed, as they are slow
+# to import. See _formatter() and StringWrapper.from_bytes().
 
 # TODO: make sure we copy all methods from str but return s()
 
@@ -53,25 +49,16 @@ except NameError:
     unicode = str
 
 
-REGEX_FLAGS = {
-    'm': re.MULTILINE,
-    'x': re.VERBOSE,
-    'v': re.VERBOSE,
-    's': re.DOTALL,
-    '.': re.DOTALL,
-    'd': re.DEBUG,
-    'i': re.IGNORECASE,
-    'u': re.UNICODE,
-    'l': re.LOCALE,
-}
+FORMATTER = None
 
-try:
-    # Python2 doesn't support re.ASCII flag
-    REGEX_FLAGS['a'] = re.ASCII
-except AttributeError:
-    pass
 
-FORMATTER = LiteralFormatter()
+def _formatter():
+    """ Return the formatter used by f(), created on the first call """
+    global FORMATTER
+    if FORMATTER is None:
+        from formatizer import LiteralFormatter
+        FORMATTER = LiteralFormatter()
+    return FORMATTER
 
 
 class MetaS(type):
@@ -85,11 +72,11 @@ class MetaF(type):
     """ Allow f >> 'text' as a shortcut to dedent f-string """
 
     def __rshift__(self, other):
-        caller_frame = inspect.currentframe().f_back
+        caller_frame = sys._getframe(1)
         caller_globals = caller_frame.f_globals
         caller_locals = caller_frame.f_locals
         return s(dedent(
-                 FORMATTER.format(other, caller_globals, caller_locals)
+                 _formatter().format(other, caller_globals, caller_locals)
                  ))
 
 
@@ -100,19 +87,20 @@ class StringWrapper(with_metaclass(MetaS, unicode)):
     # s.from_bytes(bytes, encoding)
 
     def _parse_flags(self, flags):
-        bflags = 0
-        if isinstance(flags, basestring):
-            for flag in flags:
-                bflags |= REGEX_FLAGS[flag]
+        return parse_flags(flags)
 
-            return bflags
+    @staticmethod
+    def compile(pattern, flags=0):
+        """Return a Regex, to pass to split() or replace() many times
 
-        return flags
+        Unlike a string, it's not looked up in ww.regex.CACHE on each call.
+        """
+        return Regex(pattern, flags)
 
     def split(self, *separators, **kwargs):
 
         for sep in separators:
-            if not isinstance(sep, basestring):
+            if not isinstance(sep, (basestring, Regex, PATTERN_TYPE)):
                 msg = s >> """
                     Separators must be string, not "{sep}" ({sep_type}).
                     A common cause of this error is to call split([a, b, c])
@@ -128,32 +116,42 @@ class StringWrapper(with_metaclass(MetaS, unicode)):
             sep = separators[0]
             # TODO: find a better error message
 
-            for chunk in re.split(sep, self, maxsplit, flags):
+            for chunk in compiled(sep, flags).split(self, maxsplit):
                 for item in s(chunk)._split(separators[1:],
                                             maxsplit=0, flags=0):
                     yield item
         except IndexError:
             yield self
 
-    def replace(self, patterns, substitutions, maxreplace=0, flags=0):
+    def replace(self, patterns, substitutions, maxreplace=0, flags=0,
+                single_pass=False, literal=False):
+        """Replace each pattern by its substitution
+
+        By default, each pattern is replaced in turn, on the result of the
+        previous one. With single_pass=True, all the patterns are replaced
+        in one scan of the string, which is much faster for many patterns,
+        but can give another result if they overlap: see ww.regex.Replacer.
+
+        With literal=True, patterns and substitutions are plain strings,
+        not regular expressions.
+        """
 
-        patterns = ensure_tuple(patterns)
-        substitutions = ensure_tuple(substitutions)
+        patterns, substitutions = pair_substitutions(patterns, substitutions)
 
-        num_of_subs = len(substitutions)
-        num_of_patterns = len(patterns)
-        if num_of_subs == 1:
-            substitutions *= num_of_patterns
-        else:
-            if len(patterns) != num_of_subs:
-                raise ValueError("You must have exactly one substitution "
-                                 "for each pattern or only one substitution")
+        if single_pass:
+            replacer = REPLACERS.get((patterns, substitutions, literal),
+                                     flags)
+            return s(replacer.replace(self, maxreplace))
 
         flags = self._parse_flags(flags)
 
         res = self
         for pattern, sub in zip(patterns, substitutions):
-            res = re.sub(pattern, sub, res, count=maxreplace, flags=flags)
+            if literal:
+                pattern = re.escape(pattern)
+                if not callable(sub):
+                    sub = sub.replace('\\', '\\\\')
+            res = compiled(pattern, flags).sub(sub, res, maxreplace)
 
         return s(res)
 
@@ -168,6 +166,7 @@ class StringWrapper(with_metaclass(MetaS, unicode)):
     @staticmethod
     def from_bytes(byte_string, encoding=None, errors='strict'):
         if encoding is None:
+            import chardet
             encoding = chardet.detect(byte_string)['encoding']
             raise ValueError(f >> """
                              from_bytes() expects a second argument:
@@ -182,7 +181,7 @@ class StringWrapper(with_metaclass(MetaS, unicode)):
 
     def format(self, *args, **kwargs):
         if not args and not kwargs:
-            pframe = inspect.currentframe().f_back
+            pframe = sys._getframe(1)
             return s(unicode.format(self, **pframe.f_locals))
         return s(unicode.format(self, *args, **kwargs))
 
@@ -219,7 +218,7 @@ s = StringWrapper
 class f(with_metaclass(MetaF)):
 
     def __new__(cls, string):
-        caller_frame = inspect.currentframe().f_back
+        caller_frame = sys._getframe(1)
         caller_globals = caller_frame.f_globals
         caller_locals = caller_frame.f_locals
-        return s(FORMATTER.format(string, caller_globals, caller_locals))
+        return s(_formatter().format(string, caller_globals, caller_locals))
@@ -0,0 +1,167 @@
+# coding: utf-8
+
+"""
+    Random samples of iterables in one pass, without loading them.
+
+    Instead of drawing a random number for each item, the samplers draw
+    how many items to skip before the next one they keep, and skip them
+    with itertools.islice(), so the cost per skipped item is that of
+    reading it.
+
+    Given the same seed, a sampler returns the same sample for the same
+    items.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import math
+import heapq
+import random
+import itertools
+
+try:
+    from typing import Any, Callable, Iterable, List  # noqa
+except ImportError:
+    pass
+
+_NOTHING = object()
+
+
+def _random(rng):
+    # type: (random.Random) -> float
+    """ Return a random float in ]0, 1[, so that its log is defined """
+    x = rng.random()
+    while x == 0.0:
+        x = rng.random()
+    return x
+
+
+def _check_k(k):
+    if k < 0:
+        raise ValueError("k should be >= 0, not %s" % k)
+
+
+def reservoir_sample(iterable, k, seed=None):
+    # type: (Iterable, int, Any) -> List
+    """Return k items picked uniformly at random, in their original order
+
+    It uses the "Algorithm L" reservoir sampling: O(k) memory, and
+    O(k * log(n / k)) random numbers drawn for n items.
+
+    Args:
+        iterable: the items, read once.
+        k: the size of the sample. If there are fewer items, they are all
+           returned.
+        seed: a seed for random.Random(), to get the same sample each time.
+
+    Example:
+
+        >>> len(reservoir_sample(range(1000), 10))
+        10
+        >>> reservoir_sample('abc', 5)
+        ['a', 'b', 'c']
+        >>> reservoir_sample(range(100), 3, seed=1) == reservoir_sample(
+        ...     range(100), 3, seed=1)
+        True
+    """
+    _check_k(k)
+    rng = random.Random(seed)
+    items = iter(iterable)
+    reservoir = list(enumerate(itertools.islice(items, k)))
+    if len(reservoir) < k or not k:
+        return [item for _, item in reservoir]
+
+    index = k - 1
+    threshold = math.exp(math.log(_random(rng)) / k)
+    while True:
+        skip = int(math.log(_random(rng)) / math.log(1 - threshold))
+        item = next(itertools.islice(items, skip, None), _NOTHING)
+        if item is _NOTHING:
+            break
+        index += skip + 1
+        reservoir[rng.randrange(k)] = (index, item)
+        threshold *= math.exp(math.log(_random(rng)) / k)
+
+    reservoir.sort(key=lambda entry: entry[0])
+    return [item for _, item in reservoir]
+
+
+def weighted_sample(iterable, k, weight, seed=None):
+    # type: (Iterable, int, Callable, Any) -> List
+    """Return k items picked at random, with probabilities proportional to
+    weight(item), without replacement, in their original order
+
+    It uses the "A-ExpJ" reservoir sampling of Efraimidis and Spirakis,
+    drawing the total weight to skip before the next item to keep. Items
+    with a weight <= 0 are never picked.
+
+    Example:
+
+        >>> weighted_sample([1, 0, 0, 1], 2, weight=lambda x: x)
+        [1, 1]
+    """
+    _check_k(k)
+    if not k:
+        return []
+    rng = random.Random(seed)
+    # (log of the random key, index, item) of the kept items: the ones
+    # with the highest key, u ** (1 / weight) for a uniform u
+    reservoir = []
+    jump = None
+    for index, item in enumerate(iterable):
+        item_weight = weight(item)
+        if item_weight <= 0:
+            continue
+
+        if len(reservoir) < k:
+            key = math.log(_random(rng)) / item_weight
+            heapq.heappush(reservoir, (key, index, item))
+        else:
+            jump -= item_weight
+            if jump > 0:
+                continue
+            # the key has to be above the smallest one to get in
+            lowest = math.exp(reservoir[0][0] * item_weight)
+            key = math.log(rng.uniform(lowest, 1)) / item_weight
+            heapq.heapreplace(reservoir, (key, index, item))
+
+        if len(reservoir) == k:
+            jump = math.log(_random(rng)) / reservoir[0][0]
+
+    reservoir.sort(key=lambda entry: entry[1])
+    return [item for _, _, item in reservoir]
+
+
+def bernoulli(iterable, p, seed=None):
+    # type: (Iterable, float, Any) -> Iterable
+    """Lazily yield each item with a probability p, independently
+
+    The gaps between kept items are drawn from a geometric distribution,
+    so only one random number is drawn per item kept.
+
+    Example:
+
+        >>> list(bernoulli(range(5), 1))
+        [0, 1, 2, 3, 4]
+        >>> len(list(bernoulli(range(10000), 0.1, seed=0))) in range(900, 1100)
+        True
+    """
+    if not 0 <= p <= 1:
+        raise ValueError("p should be between 0 and 1, not %s" % p)
+    items = iter(iterable)
+    if p == 1:
+        for item in items:
+            yield item
+        return
+    if p == 0:
+        return
+
+    rng = random.Random(seed)
+    log_miss = math.log(1 - p)
+    while True:
+        skip = int(math.log(_random(rng)) / log_miss)
+        item = next(itertools.islice(items, skip, None), _NOTHING)
+        if item is _NOTHING:
+            return
+        yield item
@@ -0,0 +1,191 @@
+# coding: utf-8
+
+"""
+    Run a whole segment of g() stages in worker processes.
+
+    pmap() sends each item to a worker and its result back. Here, the
+    stages recorded between g().parallel() and .sequential() are sent
+    once with each chunk of input items, and run in the worker, so only
+    the chunks and the final results cross process boundaries:
+
+        >>> import ww
+        >>> ww.g(range(10)).parallel(workers=2, chunksize=4, mode='thread'
+        ...     ).map(abs).filter(bool).sequential().list()
+        [1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+    As each worker only sees one chunk at a time:
+
+        - chunks() groups items within each input chunk, so some groups can
+          be smaller than their size even before the last one.
+        - skip_duplicates() removes duplicates within each chunk in the
+          worker, which also returns the fingerprints of the items it kept,
+          so that the duplicates across chunks are removed by the parent.
+          The result is exactly the same as in a sequential pipeline, but
+          this requires only map() and filter() after it in the segment.
+          With ordered=False, duplicates across chunks are still removed,
+          but the chunks are checked in the order they are done, so the
+          item kept among duplicates is the first one done, not
+          necessarily the first one in the input.
+
+    With mode="process", the callables given to the stages and the items
+    must be picklable.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import itertools
+
+from functools import partial
+
+try:
+    from typing import Any, Callable, Iterable, List  # noqa
+except ImportError:
+    pass
+
+import ww
+
+from ww.fusion import fuse
+from ww.iterable import chunks
+from ww.parallel import imap_chunks
+
+# Number of input items sent to a worker at once by default
+CHUNK_SIZE = 1024
+
+
+def _run(stages, items):
+    # type: (List[tuple], Iterable) -> Iterable
+    """ Apply map, filter and chunks stages to items """
+    iterator = iter(items)
+    for is_chunks, group in itertools.groupby(stages,
+                                              lambda s: s[0] == 'chunks'):
+        if is_chunks:
+            for _, size, cast in group:
+                iterator = chunks(iterator, size, cast)
+        else:
+            iterator = fuse(list(group))(iterator)
+    return iterator
+
+
+def run_chunk(stages, chunk):
+    # type: (List[tuple], list) -> list
+    """Return the results of the stages on a chunk, in a worker
+
+    If there is a skip_duplicates stage, return a list of (fingerprint,
+    results) for each item it kept, with the results of the next stages
+    on this item. Defined here so it can be pickled.
+
+    Example:
+
+        >>> run_chunk([('map', abs), ('chunks', 2, list)], [-1, 2, -3])
+        [[1, 2], [3]]
+        >>> run_chunk([('skip_duplicates', None, None), ('map', str)],
+        ...           [1, 1, 2])
+        [(1, ['1']), (2, ['2'])]
+    """
+    kinds = [stage[0] for stage in stages]
+    if 'skip_duplicates' not in kinds:
+        return list(_run(stages, chunk))
+
+    position = kinds.index('skip_duplicates')
+    key = stages[position][1]
+    after = stages[position + 1:]
+    seen = set()
+    results = []
+    for item in _run(stages[:position], chunk):
+        fingerprint = item if key is None else key(item)
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            results.append((fingerprint, list(_run(after, (item,)))))
+    return results
+
+
+def run_segment(iterable, stages, workers=None, chunksize=CHUNK_SIZE,
+                mode='process', ordered=True):
+    # type: (Iterable, List[tuple], int, int, Any, bool) -> Iterable
+    """Lazily yield the results of the stages on the items, in workers
+
+    See ww.parallel.imap_chunks() for workers, mode and ordered.
+    """
+    fingerprints = None
+    worker_stages = []
+    for stage in stages:
+        if stage[0] == 'skip_duplicates':
+            # the workers use their own set
+            fingerprints = set() if stage[2] is None else stage[2]
+            stage = stage[:2] + (None,)
+        worker_stages.append(stage)
+
+    results = imap_chunks(partial(run_chunk, worker_stages),
+                          chunks(iterable, chunksize, list), workers, mode,
+                          ordered)
+    if fingerprints is None:
+        for result in results:
+            for item in result:
+                yield item
+        return
+
+    for result in results:
+        for fingerprint, items in result:
+            if fingerprint not in fingerprints:
+                fingerprints.add(fingerprint)
+                for item in items:
+                    yield item
+
+
+class ParallelSegment(object):
+    """Stages recorded after g().parallel(), until sequential()
+
+    Like g(), each method returns a new segment with one more stage.
+    """
+
+    def __init__(self, iterable, workers=None, chunksize=CHUNK_SIZE,
+                 mode='process', ordered=True, stages=()):
+        # type: (Iterable, int, int, Any, bool, tuple) -> None
+        if chunksize < 1:
+            raise ValueError("chunksize should be >= 1, not %s" % chunksize)
+        self.iterable = iterable
+        self.workers = workers
+        self.chunksize = chunksize
+        self.mode = mode
+        self.ordered = ordered
+        self.stages = tuple(stages)
+
+    def _add(self, stage):
+        # type: (tuple) -> ParallelSegment
+        kinds = [s[0] for s in self.stages]
+        if 'skip_duplicates' in kinds and stage[0] not in ('map', 'filter'):
+            raise ValueError(
+                "Only map() and filter() can follow skip_duplicates() in a "
+                "parallel segment: call sequential() before %s()" % stage[0])
+        return ParallelSegment(self.iterable, self.workers, self.chunksize,
+                               self.mode, self.ordered,
+                               self.stages + (stage,))
+
+    def map(self, func):
+        # type: (Callable) -> ParallelSegment
+        return self._add(('map', func))
+
+    def filter(self, func):
+        # type: (Callable) -> ParallelSegment
+        return self._add(('filter', func))
+
+    def skip_duplicates(self, key=None, fingerprints=None):
+        # type: (Callable, Any) -> ParallelSegment
+        """ See g.skip_duplicates(). fingerprints stays in this process """
+        return self._add(('skip_duplicates', key, fingerprints))
+
+    def chunks(self, chunksize, cast=tuple):
+        # type: (int, Callable) -> ParallelSegment
+        """ Like g.chunks(), but groups never span two input chunks """
+        return self._add(('chunks', chunksize, cast))
+
+    def sequential(self):
+        # type: () -> ww.g
+        """ End the segment, and return a g() of its results """
+        return ww.g(run_segment(self.iterable, list(self.stages),
+                                self.workers, self.chunksize, self.mode,
+                                self.ordered))
+
+    def __repr__(self):
+        return '<ParallelSegment %s>' % ' -> '.join(s[0] for s in self.stages)
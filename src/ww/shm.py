@@ -0,0 +1,261 @@
+# coding: utf-8
+
+"""
+    Send chunks of numbers to worker processes through shared memory.
+
+    Sending an array.array to a process pickles it, copies it through a
+    pipe, and unpickles it. Here, each chunk is copied once into a
+    multiprocessing.shared_memory block, and only a small handle with the
+    name of the block is pickled. The worker maps the block and reads the
+    numbers in place.
+
+    Blocks come from a BlockPool and are reused once the worker is done
+    with them, so there is no allocation per chunk.
+
+    It needs Python 3.8+.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import array
+import itertools
+
+from concurrent import futures
+
+from collections import deque
+
+try:
+    from typing import Any, Callable, Iterable, List  # noqa
+except ImportError:
+    pass
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+from ww.parallel import get_executor, cpu_count
+from ww.vector import TYPECODES
+
+# Default max number of numbers in a chunk
+CHUNK_SIZE = 65536
+
+# Blocks mapped by this process, by name, so that a worker maps each block
+# of the pool only once
+_attached = {}
+MAX_ATTACHED = 256
+
+
+def _detach_all():
+    # blocks of pools closed since: their memory is only freed once all
+    # the processes mapping them close them
+    for block in _attached.values():
+        try:
+            block.close()
+        except BufferError:  # a view is still referenced somewhere
+            pass
+    _attached.clear()
+
+
+def _check_available():
+    if shared_memory is None:
+        raise RuntimeError("Shared memory transport needs Python 3.8+")
+
+
+def typecode_of(dtype):
+    # type: (Any) -> str
+    """Return the array.array typecode for a numpy dtype name or typecode
+
+    Example:
+
+        >>> typecode_of('float64'), typecode_of('i')
+        ('d', 'i')
+    """
+    return TYPECODES.get(dtype, dtype)
+
+
+class BlockPool(object):
+    """Up to `count` shared memory blocks of `size` bytes, to reuse
+
+    Blocks are created on demand. close() unlinks them all: the pool
+    must outlive their use by the workers.
+
+    Example:
+
+        >>> with BlockPool(1024, 2) as pool:
+        ...     block = pool.acquire()
+        ...     pool.release(block)
+        ...     pool.acquire() is block
+        True
+    """
+
+    def __init__(self, size, count):
+        # type: (int, int) -> None
+        _check_available()
+        if count < 1:
+            raise ValueError("count should be >= 1, not %s" % count)
+        self.size = size
+        self.count = count
+        self.blocks = []  # type: List[shared_memory.SharedMemory]
+        self.free = []  # type: List[shared_memory.SharedMemory]
+
+    def acquire(self):
+        # type: () -> shared_memory.SharedMemory
+        """ Return a free block, creating it if needed """
+        if self.free:
+            return self.free.pop()
+        if len(self.blocks) >= self.count:
+            raise RuntimeError("All the %s blocks are in use" % self.count)
+        block = shared_memory.SharedMemory(create=True, size=self.size)
+        self.blocks.append(block)
+        return block
+
+    def release(self, block):
+        # type: (shared_memory.SharedMemory) -> None
+        self.free.append(block)
+
+    def close(self):
+        """ Free all the blocks """
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+        self.free = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class SharedChunk(object):
+    """Handle to `length` numbers of type `typecode` in a shared block
+
+    This is what is pickled to the workers instead of the numbers.
+    """
+
+    __slots__ = ('name', 'typecode', 'length')
+
+    def __init__(self, name, typecode, length):
+        # type: (str, str, int) -> None
+        self.name = name
+        self.typecode = typecode
+        self.length = length
+
+    def __getstate__(self):
+        return (self.name, self.typecode, self.length)
+
+    def __setstate__(self, state):
+        self.name, self.typecode, self.length = state
+
+    def view(self):
+        # type: () -> memoryview
+        """Return a memoryview of the numbers, mapping the block if needed
+
+        It's only valid until the block is released to its pool.
+        """
+        try:
+            block = _attached[self.name]
+        except KeyError:
+            if len(_attached) >= MAX_ATTACHED:
+                _detach_all()
+            block = _attached[self.name] = shared_memory.SharedMemory(
+                name=self.name)
+        return block.buf.cast(self.typecode)[:self.length]
+
+    def __repr__(self):
+        return 'SharedChunk(%r, %r, %r)' % (self.name, self.typecode,
+                                            self.length)
+
+
+def write_chunk(block, chunk, typecode):
+    # type: (shared_memory.SharedMemory, Iterable, str) -> SharedChunk
+    """ Copy the numbers of chunk into block, and return its handle """
+    if not isinstance(chunk, array.array) or chunk.typecode != typecode:
+        chunk = array.array(typecode, chunk)
+    size = len(chunk) * chunk.itemsize
+    if size > block.size:
+        raise ValueError("A chunk of %s items doesn't fit in a block of %s "
+                         "bytes" % (len(chunk), block.size))
+    block.buf[:size] = memoryview(chunk).cast('B')
+    return SharedChunk(block.name, typecode, len(chunk))
+
+
+def call_on_chunk(func, chunk):
+    # type: (Callable, SharedChunk) -> Any
+    """ Return func(memoryview of the chunk), in a worker """
+    view = chunk.view()
+    try:
+        return func(view)
+    finally:
+        try:
+            view.release()
+        except BufferError:  # func kept a reference to it
+            pass
+
+
+def shared_map(chunks, func, dtype='float64', size=CHUNK_SIZE, workers=None,
+               mode='process'):
+    # type: (Iterable, Callable, Any, int, int, Any) -> Iterable
+    """Lazily yield func(view) for each chunk, computed in worker processes
+
+    Each chunk is copied into a shared memory block, and func receives a
+    memoryview of its numbers, which is only valid during the call: copy
+    what you need to keep, and return small results, as they are pickled.
+    The view can be wrapped without copy in a numpy array with
+    numpy.frombuffer(view, dtype).
+
+    Args:
+        chunks: sequences of numbers, such as the arrays yielded by
+                ww.iterable.chunks(numbers, size, partial(array, 'd')).
+        func: a picklable callable receiving a memoryview.
+        dtype: a numpy dtype name or an array.array typecode.
+        size: the max number of items in a chunk.
+        workers: the number of worker processes. Default to the number of
+                 CPUs.
+        mode: "process" or a concurrent.futures.Executor.
+
+    Example:
+
+        >>> list(shared_map([[1, 2], [3.5]], sum))
+        [3.0, 3.5]
+    """
+    _check_available()
+    typecode = typecode_of(dtype)
+    itemsize = array.array(typecode).itemsize
+    executor, owned = get_executor(mode, workers)
+    # enough blocks for each worker to have one chunk in progress and one
+    # waiting
+    in_flight = 2 * (workers or cpu_count())
+    pool = BlockPool(size * itemsize, in_flight)
+    chunks = iter(chunks)
+    pending = deque()
+
+    def submit(chunk):
+        block = pool.acquire()
+        handle = write_chunk(block, chunk, typecode)
+        pending.append((executor.submit(call_on_chunk, func, handle), block))
+
+    try:
+        for chunk in itertools.islice(chunks, in_flight):
+            submit(chunk)
+        while pending:
+            future, block = pending.popleft()
+            result = future.result()
+            pool.release(block)
+            for chunk in itertools.islice(chunks, 1):
+                submit(chunk)
+            yield result
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        # the executor is only shut down if we created it. Otherwise, the
+        # tasks already running must be done with the blocks before the
+        # pool unlinks them.
+        if owned:
+            executor.shutdown(wait=True)
+        else:
+            futures.wait([future for future, _ in pending])
+        pool.close()
@@ -0,0 +1,167 @@
+# coding: utf-8
+
+"""
+    Merge and set operations on iterables that are already sorted.
+
+    Each input is read once, in order, and only its current item is kept
+    in memory, so they work on streams of any size, unlike sorted() or
+    the set() used by g.__sub__().
+
+    Inputs must be sorted by the same `key` (and in descending order if
+    `reverse` is True). The set operations check it as they go, and raise
+    ValueError on the first item out of order.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import operator
+
+try:
+    from typing import Any, Callable, Iterable  # noqa
+except ImportError:
+    pass
+
+from ww.utils import merge_sorted, nop
+
+_NOTHING = object()
+
+
+def merge(iterables, key=None, reverse=False):
+    # type: (Iterable[Iterable], Callable, bool) -> Iterable
+    """Lazily merge sorted iterables into one sorted stream
+
+    The merge is stable, duplicates are kept.
+
+    Example:
+
+        >>> list(merge([[1, 3, 5], [2, 3], [0]]))
+        [0, 1, 2, 3, 3, 5]
+    """
+    return merge_sorted(iterables, key, reverse)
+
+
+def check_sorted(iterable, key=None, reverse=False):
+    # type: (Iterable, Callable, bool) -> Iterable
+    """Yield the items of iterable, raising ValueError if they are unsorted
+
+    Example:
+
+        >>> list(check_sorted([1, 2, 2, 3]))
+        [1, 2, 2, 3]
+        >>> list(check_sorted([1, 3, 2]))
+        Traceback (most recent call last):
+        ...
+        ValueError: The input is not sorted: 2 comes after 3
+    """
+    key = key or nop
+    before = operator.gt if reverse else operator.lt
+    previous = _NOTHING
+    for item in iterable:
+        current = key(item)
+        if previous is not _NOTHING and before(current, previous):
+            raise ValueError("The input is not sorted: %r comes after %r" %
+                             (current, previous))
+        previous = current
+        yield item
+
+
+class _Cursor(object):
+    """ The current item of a sorted iterator, and its key """
+
+    def __init__(self, iterable, key, reverse):
+        self.iterator = iter(check_sorted(iterable, key, reverse))
+        self.key_func = key or nop
+        self.before = operator.gt if reverse else operator.lt
+        self.item = self.key = None
+        self.exhausted = False
+        self.advance()
+
+    def advance(self):
+        try:
+            self.item = next(self.iterator)
+        except StopIteration:
+            self.exhausted = True
+        else:
+            self.key = self.key_func(self.item)
+
+    def skip_before(self, key):
+        """ Advance to the first item whose key is not before key """
+        while not self.exhausted and self.before(self.key, key):
+            self.advance()
+
+    def skip_equal(self, key):
+        """ Advance to the first item whose key is not equal to key """
+        while not self.exhausted and self.key == key:
+            self.advance()
+
+
+def union(iterables, key=None, reverse=False):
+    # type: (Iterable[Iterable], Callable, bool) -> Iterable
+    """Yield the items of all the sorted iterables, once per key
+
+    For each key, the first item found is yielded, looking at the
+    iterables in order.
+
+    Example:
+
+        >>> list(union([[1, 3, 5], [1, 2, 3, 3], [6]]))
+        [1, 2, 3, 5, 6]
+    """
+    key_func = key or nop
+    checked = [check_sorted(it, key, reverse) for it in iterables]
+    previous = _NOTHING
+    for item in merge_sorted(checked, key, reverse):
+        current = key_func(item)
+        if previous is _NOTHING or current != previous:
+            previous = current
+            yield item
+
+
+def intersection(iterables, key=None, reverse=False):
+    # type: (Iterable[Iterable], Callable, bool) -> Iterable
+    """Yield the items of the first iterable whose key is in all the others
+
+    Each key is yielded once.
+
+    Example:
+
+        >>> list(intersection([[1, 2, 3, 3, 5, 8], [0, 3, 5, 8], [3, 4, 8]]))
+        [3, 8]
+    """
+    cursors = [_Cursor(it, key, reverse) for it in iterables]
+    if not cursors:
+        return
+    pick = min if reverse else max
+    while not any(cursor.exhausted for cursor in cursors):
+        target = pick(cursor.key for cursor in cursors)
+        if all(cursor.key == target for cursor in cursors):
+            yield cursors[0].item
+            for cursor in cursors:
+                cursor.skip_equal(target)
+        else:
+            for cursor in cursors:
+                cursor.skip_before(target)
+
+
+def difference(iterable, others, key=None, reverse=False):
+    # type: (Iterable, Iterable[Iterable], Callable, bool) -> Iterable
+    """Yield the items of the iterable whose key is in none of the others
+
+    Like g.__sub__(), all the remaining items are yielded, duplicates
+    included, but the others don't have to fit in memory.
+
+    Example:
+
+        >>> list(difference([1, 2, 2, 3, 5, 6], [[2, 4], [5]]))
+        [1, 3, 6]
+    """
+    key_func = key or nop
+    excluded = _Cursor(merge([check_sorted(other, key, reverse)
+                              for other in others], key, reverse),
+                       key, reverse)
+    for item in check_sorted(iterable, key, reverse):
+        current = key_func(item)
+        excluded.skip_before(current)
+        if excluded.exhausted or excluded.key != current:
+            yield item
@@ -1,6 +1,16 @@
 # TODO: add "removable_property" we use in tygs
 # TODO: add reify, based on removable property
-from past.builtins import basestring
+import re
+import sys
+import heapq
+
+try:
+    basestring = basestring  # Python 2
+except NameError:
+    # like past.builtins.basestring, without the cost of importing it
+    basestring = (str, bytes)
+
+SIZE_UNITS = {'': 1, 'k': 2 ** 10, 'm': 2 ** 20, 'g': 2 ** 30, 't': 2 ** 40}
 
 
 def ensure_tuple(val):
@@ -14,3 +24,108 @@ def ensure_tuple(val):
 
 def nop(val):
     return val
+
+
+try:
+    from operator import length_hint
+except ImportError:  # Python < 3.4
+    def length_hint(obj, default=0):
+        """ Return len(obj), or obj.__length_hint__(), or default """
+        try:
+            return len(obj)
+        except TypeError:
+            pass
+        try:
+            hint = type(obj).__length_hint__
+        except AttributeError:
+            return default
+        result = hint(obj)
+        return default if result is NotImplemented else result
+
+
+def parse_size(size):
+    """Return a number of bytes from an int or a string such as "512M"
+
+    Units are powers of 1024, case insensitive, and the "B" is optional.
+
+    Example:
+
+        >>> parse_size(100)
+        100
+        >>> parse_size('1.5k')
+        1536
+        >>> parse_size('2 GB')
+        2147483648
+        >>> parse_size('lots')
+        Traceback (most recent call last):
+        ...
+        ValueError: Invalid size: 'lots'
+    """
+    if not isinstance(size, basestring):
+        return int(size)
+
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)b?\s*$', size, re.I)
+    if not match:
+        raise ValueError('Invalid size: %r' % str(size))
+    number, unit = match.groups()
+    return int(float(number) * SIZE_UNITS[unit.lower()])
+
+
+def estimate_size(obj):
+    """Return an estimation of the memory used by obj, in bytes
+
+    It's sys.getsizeof(obj), plus the size of the items for tuples and lists,
+    which is cheap and good enough to respect a memory budget.
+
+    Example:
+
+        >>> estimate_size((1, 'a')) > sys.getsizeof((1, 'a'))
+        True
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        size += sum(sys.getsizeof(x) for x in obj)
+    return size
+
+
+class _Descending(object):
+    """ Wrap a key so that heapq sorts it in descending order """
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _decorate(iterable, index, key, wrap):
+    for item in iterable:
+        yield wrap(key(item)), index, item
+
+
+def merge_sorted(iterables, key=None, reverse=False):
+    """Lazily merge sorted iterables, like heapq.merge(*iterables, key=key,
+    reverse=reverse), which only accepts key and reverse on Python 3.5+
+
+    The merge is stable: for equal keys, items come in the order of the
+    iterables.
+
+    Example:
+
+        >>> list(merge_sorted([[1, 3], [2]]))
+        [1, 2, 3]
+        >>> list(merge_sorted(['Db', 'ca', 'B'], key=str.lower, reverse=True))
+        ['D', 'c', 'b', 'B', 'a']
+    """
+    if key is None and not reverse:
+        return heapq.merge(*iterables)
+    wrap = _Descending if reverse else nop
+    # the index breaks ties, so the items themselves are never compared
+    decorated = [_decorate(iterable, index, key or nop, wrap)
+                 for index, iterable in enumerate(iterables)]
+    return (item for _, _, item in heapq.merge(*decorated))
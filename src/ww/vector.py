@@ -0,0 +1,487 @@
+# coding: utf-8
+
+"""
+    Vectorized numeric mode for g(): operations on batches of typed arrays.
+
+    g(...).vector() returns a VectorWrapper pulling items into batches and
+    applying arithmetic, comparisons, masks and reductions to whole batches
+    instead of each Python object, with numpy semantics:
+
+        >>> v = ww.g(range(10)).vector('int64', batch=4)
+        >>> v[v % 3 == 0].list()
+        [0, 3, 6, 9]
+
+    numpy is used if it's installed. Otherwise, batches are read into
+    array.array() and operations are mapped over them with the functions of
+    the operator module, which is slower but avoids a Python call per item.
+"""
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import operator
+import itertools
+
+from array import array
+
+try:
+    from typing import Any, Union, Callable, Iterable  # noqa
+except ImportError:
+    pass
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import ww
+
+# numpy dtype names and their array.array typecode counterpart
+TYPECODES = {
+    'float64': 'd',
+    'float32': 'f',
+    'int64': 'q',
+    'int32': 'i',
+    'int16': 'h',
+    'int8': 'b',
+    'uint64': 'Q',
+    'uint32': 'I',
+    'uint16': 'H',
+    'uint8': 'B',
+    'float': 'd',
+    'int': 'q',
+    float: 'd',
+    int: 'q',
+}
+
+
+def check_sizes(operands):
+    # type: (Iterable) -> int
+    """Return the size of the batches among operands, or raise ValueError
+
+    Unlike numpy, batches of size 1 are not broadcast: they would come
+    from a stream ending earlier than the others.
+    """
+    sizes = set(len(x) for x in operands if hasattr(x, '__len__'))
+    if len(sizes) > 1:
+        raise ValueError('operands could not be broadcast together with '
+                         'shapes %s' % ' '.join('(%d,)' % x
+                                                for x in sorted(sizes)))
+    return sizes.pop()
+
+
+def invert(value):
+    # type: (Any) -> Any
+    """ ~value, but a logical not for bools, like numpy does """
+    if isinstance(value, bool):
+        return not value
+    return ~value
+
+
+class ArrayBackend(object):
+    """Used when numpy is not available
+
+    Batches read from the source are array.array objects, but computed
+    ones are lists: converting them back to arrays would cost more than
+    the operation itself.
+    """
+
+    name = 'array'
+
+    def make_batch(self, items, dtype):
+        # type: (Iterable, str) -> Union[array, list]
+        if dtype in ('bool', bool):
+            return [bool(x) for x in items]
+        return array(self.typecode(dtype), items)
+
+    def typecode(self, dtype):
+        # type: (Any) -> str
+        try:
+            return TYPECODES[dtype]
+        except (KeyError, TypeError):
+            if dtype in TYPECODES.values():
+                return dtype
+            raise ValueError('Unknown dtype: %r' % (dtype,))
+
+    def apply(self, op, *operands):
+        # type: (Callable, *Any) -> Union[array, list]
+        """ Apply op element-wise, broadcasting scalars """
+        size = check_sizes(operands)
+        columns = [x if isinstance(x, (array, list))
+                   else itertools.repeat(x, size) for x in operands]
+        return list(map(op, *columns))
+
+    def mask(self, values, mask):
+        # type: (Union[array, list], Iterable) -> Union[array, list]
+        if len(values) != len(mask):
+            raise ValueError('boolean index did not match indexed array: '
+                             'length is %d but mask length is %d' %
+                             (len(values), len(mask)))
+        return list(itertools.compress(values, mask))
+
+    def tolist(self, batch):
+        # type: (Union[array, list]) -> list
+        return list(batch)
+
+    def sum(self, batch):
+        return sum(batch)
+
+    def min(self, batch):
+        return min(batch)
+
+    def max(self, batch):
+        return max(batch)
+
+
+class NumpyBackend(object):
+    """ Batches stored in numpy arrays """
+
+    name = 'numpy'
+
+    def make_batch(self, items, dtype):
+        # type: (Iterable, Any) -> numpy.ndarray
+        return numpy.fromiter(items, numpy.dtype(dtype))
+
+    def apply(self, op, *operands):
+        # type: (Callable, *Any) -> numpy.ndarray
+        check_sizes(operands)
+        return op(*operands)
+
+    def mask(self, values, mask):
+        # type: (numpy.ndarray, numpy.ndarray) -> numpy.ndarray
+        try:
+            return values[numpy.asarray(mask, dtype=bool)]
+        except IndexError as e:
+            raise ValueError(str(e))
+
+    def tolist(self, batch):
+        # type: (numpy.ndarray) -> list
+        return batch.tolist()
+
+    def sum(self, batch):
+        return batch.sum().item()
+
+    def min(self, batch):
+        return batch.min().item()
+
+    def max(self, batch):
+        return batch.max().item()
+
+
+BACKENDS = {'array': ArrayBackend()}
+if numpy is not None:
+    BACKENDS['numpy'] = NumpyBackend()
+
+DEFAULT_BACKEND = 'numpy' if numpy is not None else 'array'
+
+
+def get_backend(name=None):
+    # type: (str) -> Union[ArrayBackend, NumpyBackend]
+    """ Return the backend with this name, or the default one if None """
+    try:
+        return BACKENDS[name or DEFAULT_BACKEND]
+    except KeyError:
+        raise ValueError("Unknown or unavailable backend: %r. Available "
+                         "backends: %s" % (name, ', '.join(sorted(BACKENDS))))
+
+
+class _Source(object):
+    """ Read batches of items from an iterator """
+
+    def __init__(self, iterator, dtype, batch, backend):
+        self.iterator = iterator
+        self.dtype = dtype
+        self.batch = batch
+        self.backend = backend
+
+    def next_batch(self):
+        items = itertools.islice(self.iterator, self.batch)
+        batch = self.backend.make_batch(items, self.dtype)
+        return batch if len(batch) else None
+
+
+class VectorWrapper(object):
+
+    def __init__(self, iterable, dtype='float64', batch=65536, backend=None):
+        # type: (Iterable, Any, int, str) -> None
+        """Read numbers from iterable by batches of a fixed dtype
+
+        Prefer g(iterable).vector(), which calls this.
+
+        Args:
+            iterable: the numbers to read.
+            dtype: a numpy dtype name, or an array.array typecode.
+            batch: the number of items per batch.
+            backend: "numpy" or "array". Default to "numpy" if it's
+                     installed.
+        """
+        if batch < 1:
+            raise ValueError("batch should be >= 1, not %s" % batch)
+
+        backend = get_backend(backend)
+        if backend.name == 'array' and dtype not in ('bool', bool):
+            backend.typecode(dtype)  # fail early on unknown dtypes
+
+        source = _Source(iter(iterable), dtype, batch, backend)
+        self._init(backend, (source,), lambda batches: batches[id(source)])
+
+    def _init(self, backend, sources, compute):
+        self.backend = backend
+        self._sources = sources
+        self._compute = compute
+
+    def _derive(self, compute, *operands):
+        # type: (Callable, *Any) -> VectorWrapper
+        """ Return a vector computed from our batches and the operands' """
+        sources = list(self._sources)
+        for operand in operands:
+            for source in getattr(operand, '_sources', ()):
+                if source not in sources:
+                    sources.append(source)
+
+        vector = VectorWrapper.__new__(VectorWrapper)
+        vector._init(self.backend, tuple(sources), compute)
+        return vector
+
+    def _evaluate(self, batches):
+        # each vector is computed once per step even if used several times
+        key = id(self)
+        try:
+            return batches[key]
+        except KeyError:
+            result = batches[key] = self._compute(batches)
+            return result
+
+    def _apply(self, op, *others, **kwargs):
+        # type: (Callable, *Any, **bool) -> VectorWrapper
+        backend = self.backend
+        operands = (self,) + others
+        if kwargs.get('reflected'):
+            operands = operands[::-1]
+
+        def compute(batches):
+            values = [x._evaluate(batches) if isinstance(x, VectorWrapper)
+                      else x for x in operands]
+            return backend.apply(op, *values)
+
+        return self._derive(compute, *others)
+
+    def _reflected(self, op, other):
+        # type: (Callable, Any) -> VectorWrapper
+        return self._apply(op, other, reflected=True)
+
+    def __getitem__(self, index):
+        # type: (Any) -> Any
+        """Filter with a boolean mask, or index the items like g() does.
+
+        Example:
+
+            >>> v = ww.g([3, 8, 1, 9, 4]).vector('int64')
+            >>> v[v > 3].list()
+            [8, 9, 4]
+            >>> ww.g(range(10)).vector('int64')[2:4].list()
+            [2, 3]
+        """
+        if not isinstance(index, VectorWrapper):
+            return self.to_g()[index]
+
+        backend = self.backend
+
+        def compute(batches):
+            return backend.mask(self._evaluate(batches),
+                                index._evaluate(batches))
+
+        return self._derive(compute, index)
+
+    def __add__(self, other):
+        return self._apply(operator.add, other)
+
+    def __radd__(self, other):
+        return self._reflected(operator.add, other)
+
+    def __sub__(self, other):
+        return self._apply(operator.sub, other)
+
+    def __rsub__(self, other):
+        return self._reflected(operator.sub, other)
+
+    def __mul__(self, other):
+        return self._apply(operator.mul, other)
+
+    def __rmul__(self, other):
+        return self._reflected(operator.mul, other)
+
+    def __truediv__(self, other):
+        return self._apply(operator.truediv, other)
+
+    def __rtruediv__(self, other):
+        return self._reflected(operator.truediv, other)
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __floordiv__(self, other):
+        return self._apply(operator.floordiv, other)
+
+    def __rfloordiv__(self, other):
+        return self._reflected(operator.floordiv, other)
+
+    def __mod__(self, other):
+        return self._apply(operator.mod, other)
+
+    def __rmod__(self, other):
+        return self._reflected(operator.mod, other)
+
+    def __pow__(self, other):
+        return self._apply(operator.pow, other)
+
+    def __rpow__(self, other):
+        return self._reflected(operator.pow, other)
+
+    def __and__(self, other):
+        return self._apply(operator.and_, other)
+
+    __rand__ = __and__
+
+    def __or__(self, other):
+        return self._apply(operator.or_, other)
+
+    __ror__ = __or__
+
+    def __xor__(self, other):
+        return self._apply(operator.xor, other)
+
+    __rxor__ = __xor__
+
+    def __neg__(self):
+        return self._apply(operator.neg)
+
+    def __abs__(self):
+        return self._apply(abs)
+
+    def __invert__(self):
+        if self.backend.name == 'array':
+            return self._apply(invert)
+        return self._apply(operator.invert)
+
+    def __lt__(self, other):
+        return self._apply(operator.lt, other)
+
+    def __le__(self, other):
+        return self._apply(operator.le, other)
+
+    def __eq__(self, other):
+        return self._apply(operator.eq, other)
+
+    def __ne__(self, other):
+        return self._apply(operator.ne, other)
+
+    def __ge__(self, other):
+        return self._apply(operator.ge, other)
+
+    def __gt__(self, other):
+        return self._apply(operator.gt, other)
+
+    __hash__ = object.__hash__
+
+    def _iter_batches(self):
+        while True:
+            batches = {}
+            for source in self._sources:
+                batches[id(source)] = source.next_batch()
+            ended = [batch is None for batch in batches.values()]
+            if all(ended):
+                return
+            if any(ended):  # no batch to check_sizes() the others with
+                raise ValueError('operands could not be broadcast together: '
+                                 'a stream ended before the others')
+            yield self._evaluate(batches)
+
+    def batches(self):
+        # type: () -> ww.g
+        """Return a g() of the computed batches
+
+        Batches are numpy arrays. With the fallback backend, they are
+        array.array objects, or lists once an operation has been applied.
+        """
+        return ww.g(self._iter_batches())
+
+    def __iter__(self):
+        tolist = self.backend.tolist
+        for batch in self._iter_batches():
+            for item in tolist(batch):
+                yield item
+
+    def to_g(self):
+        # type: () -> ww.g
+        """ Return a g() of the computed items, as Python objects """
+        return ww.g(iter(self))
+
+    def _reduce(self, reducer, combine):
+        result = None
+        for batch in self._iter_batches():
+            if len(batch):
+                value = reducer(batch)
+                result = value if result is None else combine(result, value)
+        return result
+
+    def sum(self):
+        # type: () -> Any
+        """Return the sum of all the items, computed batch by batch
+
+        Example:
+
+            >>> ww.g(range(10)).vector('int64', batch=3).sum()
+            45
+        """
+        result = self._reduce(self.backend.sum, operator.add)
+        return 0 if result is None else result
+
+    def min(self):
+        # type: () -> Any
+        """ Return the smallest item, or raise ValueError if empty """
+        result = self._reduce(self.backend.min, min)
+        if result is None:
+            raise ValueError('min() of an empty vector')
+        return result
+
+    def max(self):
+        # type: () -> Any
+        """ Return the biggest item, or raise ValueError if empty """
+        result = self._reduce(self.backend.max, max)
+        if result is None:
+            raise ValueError('max() of an empty vector')
+        return result
+
+    def count(self):
+        # type: () -> int
+        """ Return the number of items """
+        result = self._reduce(len, operator.add)
+        return 0 if result is None else result
+
+    def mean(self):
+        # type: () -> float
+        """Return the mean of the items, or raise ValueError if empty
+
+        Example:
+
+            >>> v = ww.g([1, 2, 3, 4]).vector()
+            >>> v[v > 1].mean()
+            3.0
+        """
+        total = 0
+        count = 0
+        for batch in self._iter_batches():
+            total += self.backend.sum(batch)
+            count += len(batch)
+        if not count:
+            raise ValueError('mean() of an empty vector')
+        return total / count
+
+    def __repr__(self):
+        return "<VectorWrapper %s generator>" % self.backend.name
+
+    # DO NOT MOVE THOSE METHODS UPPER as they would shadow the builtins inside
+    def list(self):
+        # type: () -> list
+        return list(iter(self))
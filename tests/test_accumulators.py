@@ -0,0 +1,99 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, absolute_import,
+                        division, print_function)
+
+import random
+
+import pytest
+
+from ww.accumulators import (Accumulator, Aggregates, Var, Std, Min, Max,
+                             parse_specs, get_factory)
+
+
+def variance(data, ddof=1):
+    mean = sum(data) / len(data)
+    return sum((x - mean) ** 2 for x in data) / (len(data) - ddof)
+
+
+def test_batches_and_single_values_agree():
+
+    rand = random.Random(0)
+    data = [rand.uniform(1e6, 1e6 + 1) for _ in range(1000)]
+
+    one_by_one = Var()
+    batched = Var()
+    for x in data:
+        one_by_one.add(x)
+    for i in range(0, len(data), 97):
+        batched.update(data[i:i + 97])
+
+    assert one_by_one.result() == pytest.approx(variance(data))
+    assert batched.result() == pytest.approx(variance(data))
+
+    std = Std(ddof=0)
+    std.update(data)
+    assert std.result() == pytest.approx(variance(data, 0) ** 0.5)
+
+    assert Var().result() is None
+    var = Var()
+    var.add(1)
+    assert var.result() is None
+
+
+def test_min_max_ignore_empty_batches():
+
+    for cls, expected in ((Min, -1), (Max, 3)):
+        acc = cls()
+        acc.update([])
+        assert acc.result() is None
+        acc.update([3, -1])
+        acc.update([])
+        assert acc.result() == expected
+
+
+def test_custom_accumulator():
+
+    class Concat(Accumulator):
+
+        def __init__(self):
+            self.parts = []
+
+        def add(self, value):
+            self.parts.append(value)
+
+        def result(self):
+            return ''.join(self.parts)
+
+    aggs = Aggregates(parse_specs({
+        'upper': (Concat, str.upper),
+        'lower': (Concat, str.lower),
+        'count': True,
+    }))
+    aggs.update(['a', 'B'])
+    aggs.update(['c'])
+    assert aggs.results() == {'upper': 'ABC', 'lower': 'abc', 'count': 3}
+
+
+def test_getters_are_called_once_per_item():
+
+    calls = []
+
+    def getter(x):
+        calls.append(x)
+        return x
+
+    aggs = Aggregates(parse_specs({'a': ('sum', getter),
+                                   'b': ('max', getter)}))
+    aggs.update([1, 2])
+    assert calls == [1, 2]
+    assert aggs.results() == {'a': 3, 'b': 2}
+
+
+def test_invalid_specs():
+
+    with pytest.raises(ValueError):
+        get_factory('nope')
+
+    with pytest.raises(TypeError):
+        get_factory(42)
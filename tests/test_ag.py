@@ -0,0 +1,174 @@
+# coding: utf-8
+
+import asyncio
+import threading
+
+import pytest
+
+from ww import g, ag
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def arange(*args):
+    for x in range(*args):
+        await asyncio.sleep(0)
+        yield x
+
+
+def test_iter():
+
+    async def main():
+        return [x async for x in ag(arange(4))], await ag('abc').list()
+
+    assert run(main()) == ([0, 1, 2, 3], ['a', 'b', 'c'])
+
+
+def test_accept_multi_iterables():
+
+    gen = ag(arange(2), 'ab', arange(3, 5))
+    assert run(gen.list()) == [0, 1, 'a', 'b', 3, 4]
+
+
+def test_next():
+
+    async def main():
+        gen = ag(arange(2))
+        return [await gen.next(), await gen.next(), await gen.next('foo')]
+
+    assert run(main()) == [0, 1, 'foo']
+
+
+def test_map_filter():
+
+    async def double(x):
+        await asyncio.sleep(0)
+        return x * 2
+
+    gen = ag(arange(6)).map(double).filter(lambda x: x % 4)
+    assert isinstance(gen, ag)
+    assert run(gen.list()) == [2, 6, 10]
+
+
+def test_map_concurrent():
+
+    running = []
+    max_running = []
+
+    async def work(x):
+        running.append(x)
+        max_running.append(len(running))
+        await asyncio.sleep(0.001)
+        running.remove(x)
+        return x
+
+    gen = ag(arange(10)).map_concurrent(work, limit=3)
+    assert run(gen.list()) == list(range(10))
+    assert max(max_running) == 3
+
+    async def slow_first(x):
+        await asyncio.sleep(0.05 if x == 0 else 0)
+        return x
+
+    gen = ag(arange(10)).map_concurrent(slow_first, limit=10, ordered=False)
+    res = run(gen.list())
+    assert res == list(range(1, 10)) + [0]
+
+    with pytest.raises(ValueError):
+        run(ag(arange(10)).map_concurrent(work, limit=0).list())
+
+
+def test_chunks_window():
+
+    gen = ag(arange(1, 10)).chunks(4)
+    assert run(gen.list()) == [(1, 2, 3, 4), (5, 6, 7, 8), (9,)]
+
+    gen = ag(arange(1, 6)).window(3, list)
+    assert run(gen.list()) == [[1, 2, 3], [2, 3, 4], [3, 4, 5]]
+
+
+def test_skip_duplicates():
+
+    gen = ag("123333333322234").skip_duplicates()
+    assert run(gen.list()) == ["1", "2", "3", '4']
+
+    gen = ag([-1, 1, 2, 3]).skip_duplicates(key=abs)
+    assert run(gen.list()) == [-1, 2, 3]
+
+
+def test_firsts():
+
+    assert run(ag(arange(5)).firsts(2).list()) == [0, 1]
+    assert run(ag(arange(1)).firsts(3, 'x').list()) == [0, 'x', 'x']
+
+    async def main():
+        gen = ag(arange(5))
+        await gen.firsts(2).list()
+        return await gen.list()
+
+    assert run(main()) == [2, 3, 4]
+
+
+def test_getitem():
+
+    assert run(ag(arange(10))[3:8].list()) == [3, 4, 5, 6, 7]
+    assert run(ag(arange(10))[::3].list()) == [0, 3, 6, 9]
+    assert run(ag(arange(10))[lambda x: x > 6:].list()) == [7, 8, 9]
+    assert run(ag(arange(10))[2:lambda x: x > 4].list()) == [2, 3, 4]
+    assert run(ag(arange(10))[3]) == 3
+    assert run(ag(arange(10))[-2]) == 8
+    assert run(ag(arange(10))[lambda x: x > 6]) == 7
+
+    with pytest.raises(IndexError):
+        run(ag(arange(10))[10])
+
+    with pytest.raises(ValueError):
+        ag(arange(10))[::-1]
+
+    async def main():
+        gen = ag(arange(10))
+        await gen[:2].list()
+        return await gen.list()
+
+    assert run(main()) == list(range(2, 10))
+
+
+def test_g_aiter_does_not_block_the_loop():
+
+    event = threading.Event()
+
+    def blocking():
+        yield 1
+        event.wait(5)
+        yield 2
+
+    async def main():
+        async def release():
+            await asyncio.sleep(0.01)
+            event.set()
+            return 'released'
+
+        task = asyncio.ensure_future(release())
+        items = [x async for x in g(blocking())]
+        return items, await task
+
+    assert run(main()) == ([1, 2], 'released')
+
+
+def test_to_g():
+
+    gen = ag(arange(3)).map(str).to_g()
+    assert isinstance(gen, g)
+    assert gen.list() == ['0', '1', '2']
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        assert ag(arange(3)).to_g(loop).list() == [0, 1, 2]
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -1,6 +1,60 @@
+import os
+import sys
+import textwrap
+import subprocess
+
+import pytest
+
+
 def test_import():
     import ww  # noqa
 
     from ww import g
 
     g('test')
+
+
+def test_dir():
+    import ww
+
+    assert {'g', 's', 'f', 'l', 't', 'd', 'profile'} <= set(dir(ww))
+
+
+def test_import_star():
+    # run in a new interpreter, where no wrapper has been imported yet
+    code = textwrap.dedent("""
+        from ww import *
+        assert s('a').upper() == 'A'
+        assert [g, f, l, t, d, profile]
+    """)
+    import ww
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(ww.__file__))
+    subprocess.check_call([sys.executable, '-c', code], env=env)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason="Submodules are imported lazily on Python 3.7+")
+def test_lazy_import():
+    # run in a new interpreter, as the modules are already imported here
+    code = textwrap.dedent("""
+        import sys
+        import ww
+        heavy = ('ww.g', 'ww.s', 'chardet', 'formatizer', 'inspect')
+        assert not [name for name in heavy if name in sys.modules], heavy
+        assert callable(ww.g)
+        from ww import s
+        assert 'chardet' not in sys.modules
+        assert s('a').upper() == 'A'
+    """)
+    import ww
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(ww.__file__))
+    subprocess.check_call([sys.executable, '-c', code], env=env)
+
+
+def test_unknown_attribute():
+    import ww
+
+    with pytest.raises(AttributeError):
+        ww.nope
@@ -0,0 +1,79 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, absolute_import,
+                        division, print_function)
+
+import pytest
+
+from ww import g
+from ww import cache as cache_module
+from ww.cache import CachedIterable
+
+
+def counting(size, reads):
+    for x in range(size):
+        reads.append(x)
+        yield (x, str(x))
+
+
+def test_replay_from_memory():
+
+    reads = []
+    cached = g(counting(100, reads)).cache()
+    expected = [(x, str(x)) for x in range(100)]
+    assert list(cached) == expected
+    assert list(cached) == expected
+    assert g(cached)[10:12].list() == expected[10:12]
+    assert len(reads) == 100
+    assert cached.spill_file is None
+
+
+def test_replay_from_spill_file(monkeypatch, tmpdir):
+
+    monkeypatch.setattr(cache_module, 'BLOCK_SIZE', 10)
+    reads = []
+    cached = g(counting(1000, reads)).cache(max_memory='2k',
+                                            spill_dir=str(tmpdir))
+    expected = [(x, str(x)) for x in range(1000)]
+    assert list(cached) == expected
+    assert cached.spilled > 900
+    assert list(cached) == expected
+    assert len(reads) == 1000
+
+    cached.close()
+    assert cached.spill_file.closed
+    assert list(cached) == []
+
+
+def test_source_is_read_lazily_by_concurrent_iterations(monkeypatch):
+
+    monkeypatch.setattr(cache_module, 'BLOCK_SIZE', 3)
+    reads = []
+    cached = CachedIterable(counting(50, reads), max_memory=500)
+
+    first = iter(cached)
+    assert [next(first) for _ in range(10)] == [(x, str(x))
+                                                for x in range(10)]
+    assert len(reads) == 10
+    assert cached.recorded == 10
+
+    second = iter(cached)
+    zipped = list(zip(first, second))
+    assert len(zipped) == 40
+    assert zipped[0] == ((10, '10'), (0, '0'))
+    assert zipped[-1] == ((49, '49'), (39, '39'))
+    assert len(reads) == 50
+    assert cached.spilled
+    assert list(second) == [(x, str(x)) for x in range(40, 50)]
+
+
+def test_errors_are_propagated():
+
+    def failing():
+        yield 1
+        raise ValueError('boom')
+
+    cached = g(failing()).cache()
+    with pytest.raises(ValueError):
+        list(cached)
+    assert list(cached) == [1]
@@ -0,0 +1,105 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, absolute_import,
+                        division, print_function)
+
+import random
+
+import pytest
+
+from ww import g
+from ww import extsort
+from ww.extsort import external_sorted
+
+
+@pytest.fixture
+def written_runs(monkeypatch):
+    runs = []
+    write_run = extsort.write_run
+
+    def spy(items, spill_dir=None):
+        run = write_run(items, spill_dir)
+        runs.append(run)
+        return run
+
+    monkeypatch.setattr(extsort, 'write_run', spy)
+    return runs
+
+
+def test_external_sorted(written_runs):
+
+    rand = random.Random(0)
+    data = [rand.randint(0, 1000) for _ in range(5000)]
+
+    assert list(external_sorted(data)) == sorted(data)
+    assert not written_runs
+
+    assert list(external_sorted(data, max_memory='10k')) == sorted(data)
+    assert len(written_runs) > 5
+    assert all(run.closed for run in written_runs)
+
+    res = external_sorted(data, reverse=True, max_memory=2000)
+    assert list(res) == sorted(data, reverse=True)
+
+    res = external_sorted(data, key=lambda x: -x, max_memory=2000)
+    assert list(res) == sorted(data, key=lambda x: -x)
+
+    assert list(external_sorted([], max_memory=10)) == []
+
+
+def test_external_sorted_is_stable():
+
+    rand = random.Random(1)
+    data = [(rand.randint(0, 10), i) for i in range(3000)]
+
+    def key(x):
+        return x[0]
+
+    res = external_sorted(data, key=key, max_memory=1000)
+    assert list(res) == sorted(data, key=key)
+
+    res = external_sorted(data, key=key, reverse=True, max_memory=1000)
+    assert list(res) == sorted(data, key=key, reverse=True)
+
+    # with a key, the items themselves are never compared
+    items = [{'key': x} for x, _ in data]
+    res = external_sorted(items, key=lambda x: x['key'], max_memory=1000)
+    assert [x['key'] for x in res] == sorted(x for x, _ in data)
+
+
+def test_many_runs_are_merged_in_several_passes(monkeypatch, tmpdir):
+
+    monkeypatch.setattr(extsort, 'MAX_FAN_IN', 3)
+    monkeypatch.setattr(extsort, 'BLOCK_SIZE', 7)
+    data = list(range(1000, 0, -1))
+    res = external_sorted(data, max_memory=500, spill_dir=str(tmpdir))
+    assert list(res) == sorted(data)
+
+
+def test_files_are_closed_when_stopping_early(written_runs):
+
+    res = external_sorted(range(1000, 0, -1), max_memory=1000)
+    assert next(res) == 1
+    assert written_runs
+    assert not any(run.closed for run in written_runs)
+    res.close()
+    assert all(run.closed for run in written_runs)
+
+
+def test_g_sorted():
+
+    assert g([3, 1, 2]).sorted().list() == [1, 2, 3]
+    assert g([3, 1, 2]).sorted(reverse=True).list() == [3, 2, 1]
+    assert g([3, 1, 2]).sorted(lambda x: -x).list() == [3, 2, 1]
+
+    data = list(range(2000, 0, -1))
+    assert g(data).sorted(max_memory='5k').list() == sorted(data)
+
+
+def test_groupby_max_memory():
+
+    data = [(i % 7, i) for i in range(2000)]
+    gen = g(data).groupby(lambda x: x[0], max_memory='4k',
+                          cast=lambda x: [y for _, y in x])
+    expected = [(k, [i for i in range(2000) if i % 7 == k]) for k in range(7)]
+    assert list(gen) == expected
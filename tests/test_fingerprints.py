@@ -0,0 +1,90 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, absolute_import,
+                        division, print_function)
+
+import pytest
+
+from ww import g
+from ww.fingerprints import (BloomFilter, ScalableBloomFilter, LRUStore,
+                             TimeWindowStore)
+
+
+def test_bloom_filter_error_rate():
+
+    bloom = BloomFilter(10000, error_rate=0.01)
+    for i in range(10000):
+        bloom.add(i)
+
+    assert all(i in bloom for i in range(10000))
+    false_positives = sum(i in bloom for i in range(10000, 110000))
+    assert false_positives / 100000 < 0.02
+    assert bloom.error_rate == pytest.approx(0.01, rel=0.3)
+    assert len(bloom) == 10000
+
+
+def test_bloom_filter_max_memory():
+
+    bloom = BloomFilter(max_memory='1k', error_rate=0.01)
+    assert 1024 <= bloom.memory < 1200
+    assert bloom.capacity == 854
+
+    with pytest.raises(TypeError):
+        BloomFilter()
+
+    with pytest.raises(ValueError):
+        BloomFilter(10, error_rate=2)
+
+
+def test_scalable_bloom_filter():
+
+    bloom = ScalableBloomFilter(1000, error_rate=0.01)
+    for i in range(50000):
+        bloom.add(i)
+
+    assert len(bloom.filters) > 1
+    assert all(i in bloom for i in range(50000))
+    false_positives = sum(i in bloom for i in range(50000, 150000))
+    assert false_positives / 100000 < 0.01
+    assert bloom.error_rate < 0.01
+    assert bloom.memory > sum(b.memory for b in bloom.filters[:-1])
+
+
+def test_lru_store():
+
+    store = LRUStore(3)
+    res = g('abcadefa').skip_duplicates(fingerprints=store).list()
+    assert res == list('abcdefa')
+    assert len(store) == 3
+    assert store.error_rate == 0
+
+    memory = store.memory
+    for key in 'xyz':
+        store.add(key)
+    assert store.memory == memory
+
+
+def test_time_window_store():
+
+    now = [0]
+    store = TimeWindowStore(10, clock=lambda: now[0])
+
+    def stream():
+        for t, key in [(0, 'a'), (1, 'b'), (5, 'a'), (10, 'a'), (11, 'b'),
+                       (12, 'a')]:
+            now[0] = t
+            yield key
+
+    assert g(stream()).skip_duplicates(fingerprints=store).list() == [
+        'a', 'b', 'a', 'b']
+    assert len(store) == 2
+    now[0] = 100
+    assert len(store) == 0
+    assert store.memory < 1000
+
+    # adding a key again doesn't extend its window
+    store.add('c')
+    now[0] = 105
+    store.add('c')
+    now[0] = 110
+    assert 'c' not in store
@@ -0,0 +1,151 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, absolute_import,
+                        division, print_function)
+
+import random
+import itertools
+
+import pytest
+
+from ww import g
+from ww.fusion import fuse, source_code
+from ww.iterable import iterslice, skip_duplicates
+
+
+def ends_with_5(x):
+    return str(x).endswith('5')
+
+
+OPERATIONS = [
+    ('map', lambda x: x * 3),
+    ('map', lambda x: x // 2),
+    ('filter', lambda x: x % 3),
+    ('filter', lambda x: x % 2 == 0),
+    ('slice', slice(2, None)),
+    ('slice', slice(None, 40)),
+    ('slice', slice(3, 30, 4)),
+    ('slice', slice(5, 2)),
+    ('slice', slice(0, 0)),
+    ('slice', slice(ends_with_5, None)),
+    ('slice', slice(None, ends_with_5)),
+    ('slice', slice(1, ends_with_5)),
+    ('slice', slice(ends_with_5, ends_with_5)),
+    ('dedup', None),
+    ('dedup', lambda x: x % 7),
+]
+
+
+def apply_fused(gen, operation):
+    kind, arg = operation
+    if kind == 'map':
+        return gen.map(arg)
+    if kind == 'filter':
+        return gen.filter(arg)
+    if kind == 'slice':
+        return gen[arg]
+    return gen.skip_duplicates(arg)
+
+
+def apply_unfused(iterator, operation):
+    kind, arg = operation
+    if kind == 'map':
+        return map(arg, iterator)
+    if kind == 'filter':
+        return filter(arg, iterator)
+    if kind == 'slice':
+        return iterslice(iterator, arg.start or 0, arg.stop, arg.step or 1)
+    return skip_duplicates(iterator, arg)
+
+
+def test_random_chains_give_the_same_result_as_unfused_ones():
+
+    rand = random.Random(1)
+    for _ in range(500):
+        chain = [rand.choice(OPERATIONS) for _ in range(rand.randint(1, 7))]
+        taken = rand.choice((None, 0, 1, 3))
+
+        source = iter(range(100))
+        gen = g(source)
+        for operation in chain:
+            gen = apply_fused(gen, operation)
+        fused = list(itertools.islice(gen, taken))
+        fused_leftover = list(source)
+
+        source = iter(range(100))
+        gen = source
+        for operation in chain:
+            gen = apply_unfused(gen, operation)
+        expected = list(itertools.islice(gen, taken))
+
+        assert fused == expected, chain
+        # the source must have been consumed exactly as much
+        assert fused_leftover == list(source), chain
+
+
+def test_enumerate_zip():
+
+    gen = g('abcdef').filter(lambda x: x != 'c').enumerate(1).zip('xyz')
+    assert list(gen) == [((1, 'a'), 'x'), ((2, 'b'), 'y'), ((3, 'd'), 'z')]
+
+    gen = g('abc').zip('xyz', range(5))[1:]
+    assert list(gen) == [('b', 'y', 1), ('c', 'z', 2)]
+
+
+def test_stages_are_compiled_in_one_loop():
+
+    gen = g(range(10)).map(str).filter(bool)[2:].skip_duplicates()
+    # one single generator frame for all the stages
+    assert gen.iterator.gi_code.co_name == 'fused'
+    assert gen.list() == list('23456789')
+
+    assert 'for x in iterator' in source_code([('map', str)])
+
+
+def test_fuse_cache_reuses_code_for_same_shape():
+
+    first = fuse([('map', str), ('skip_duplicates', None, None)])
+    second = fuse([('map', repr), ('skip_duplicates', None, None)])
+    assert first.__code__ is second.__code__
+    assert list(second([1, 1, 2])) == ['1', '2']
+
+
+def test_builtin_only_stages_are_composed():
+
+    gen = g(range(10)).map(str).filter(bool)[2:]
+    assert isinstance(gen.iterator, itertools.islice)
+    assert gen.list() == list('23456789')
+
+
+def test_iterating_parent_of_fused_stateless_stages():
+
+    parent = g(range(10)).map(lambda x: x * 2)
+    child = parent.filter(lambda x: x % 4)
+    assert child.next() == 2
+    # only maps and filters were absorbed, so the parent can resume
+    assert parent.list() == [4, 6, 8, 10, 12, 14, 16, 18]
+
+
+def test_iterating_parent_of_fused_stateful_stages():
+
+    parent = g(iter(range(10)))[:5]
+    child = parent.map(str)
+    assert child.list() == ['0', '1', '2', '3', '4']
+    with pytest.raises(RuntimeError):
+        parent.list()
+
+    # no problem if the parent is iterated first
+    parent = g(iter(range(10)))[:5]
+    assert parent.next() == 0
+    assert parent.map(str).list() == ['1', '2', '3', '4']
+
+
+def test_unhashable_fingerprints():
+
+    with pytest.raises(TypeError) as error:
+        g([{}, {}]).map(dict).skip_duplicates().list()
+    assert 'non hashable' in str(error.value)
+
+    with pytest.raises(TypeError) as error:
+        list(skip_duplicates([{}, {}]))
+    assert 'non hashable' in str(error.value)
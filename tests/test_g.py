@@ -4,6 +4,8 @@ from __future__ import (unicode_literals, absolute_import,
                         division, print_function)
 
 
+import itertools
+
 import pytest
 
 from ww import g
@@ -141,6 +143,88 @@ def test_getitem():
         assert gen["not a callable"]
 
 
+def test_getitem_on_sequences():
+
+    huge = g(range(10 ** 12))
+    assert huge[-1] == 10 ** 12 - 1
+    assert huge.list() == []  # like for a generator, everything is consumed
+
+    gen = g(range(10 ** 12))
+    assert gen[10 ** 10] == 10 ** 10
+    assert gen.next() == 10 ** 10 + 1
+
+    gen = g(range(10))
+    with pytest.raises(IndexError):
+        gen[10]
+    assert gen.list() == []
+
+    data = list('abcdefghij')
+    assert g(data)[8:2:-2].list() == ['i', 'g', 'e']
+    assert g(data)[-3:].list() == ['h', 'i', 'j']
+    assert g(data)[1:][::-1][0] == 'j'
+    assert g(range(20))[5:][::3][1:4].list() == [8, 11, 14]
+    assert g(range(20))[::-1][::-3].list() == [0, 3, 6, 9, 12, 15, 18]
+    assert g(range(20, 0, -2))[1::2].list() == [18, 14, 10, 6, 2]
+
+    # once iterated, the sequence is streamed like any other iterable
+    gen = g(data)
+    assert gen.next() == 'a'
+    assert gen[1] == 'c'
+    with pytest.raises(ValueError):
+        gen[::-1]
+
+
+def test_count():
+
+    assert g([]).count() == 0
+    assert g(x for x in []).count() == 0
+    assert g(x for x in 'abc').count() == 3
+    assert g(range(10 ** 12)).count() == 10 ** 12
+    assert g(range(10))[2:].map(str).count() == 8
+
+    gen = g('abcd')
+    gen.next()
+    assert gen.count() == 3
+
+
+def test_length_hint():
+
+    def hint(obj):
+        return obj.__length_hint__()
+
+    assert hint(g(range(10))) == 10
+    assert hint(g(range(10))[2:8:2]) == 3
+    assert hint(g(range(10)).map(str)[::3].enumerate()) == 4
+    assert hint(g('abcdef').zip(range(4), 'abc')) == 3
+    assert hint(g(range(10)).filter(bool)) == 0
+    assert hint(g(x for x in 'abc')) == 0
+
+    gen = g([1, 2, 3])
+    gen.next()
+    assert hint(gen) == 2
+
+    # the hint survives the compilation of the stages by iter()
+    for source in (range(10), tuple(range(10))):
+        gen = g(source).map(str)
+        iter(gen)
+        assert hint(gen) == 10
+
+    # and list() sees it
+    hints = []
+    gen = g(range(5)).enumerate().map(lambda x: hints.append(hint(gen)))
+    assert len(gen.list()) == 5
+    assert hints == [5] * 5
+
+    # sources too large for len() are streamed, without a hint
+    huge = range(10 ** 20)
+    assert g(huge).next() == 0
+    assert g(huge)[:3].list() == [0, 1, 2]
+    assert g(huge)[5] == 5
+    assert g(huge).map(str).firsts(3).list() == ['0', '1', '2']
+    assert hint(g(huge).map(str)) == 0
+    assert hint(g('abc').zip(huge)) == 0
+
+
 def test_map():
 
     gen = g("123").map(int)
@@ -204,6 +288,65 @@ def test_groupby():
     assert list(gen) == [('i', 4), ('u', 3), ('y', 6)]
 
 
+def test_aggregate():
+
+    stats = g(range(1, 101)).aggregate(count=True, sum=True, min=True,
+                                       max=True, mean=True, var=True,
+                                       evens=('sum', lambda x: x % 2 == 0))
+    assert stats == {'count': 100, 'sum': 5050, 'min': 1, 'max': 100,
+                     'mean': 50.5, 'var': pytest.approx(841.6666666),
+                     'evens': 50}
+
+    assert g([]).aggregate(count=True, max=True) == {'count': 0, 'max': None}
+
+    # the items are read only once, even from an iterator
+    assert g(iter('abc')).aggregate(first=True, last=True, n='count') == {
+        'first': 'a', 'last': 'c', 'n': 3}
+
+    with pytest.raises(TypeError):
+        g([]).aggregate()
+
+
+def test_group_aggregate(monkeypatch):
+
+    monkeypatch.setattr('ww.iterable.AGGREGATE_BATCH', 3)
+    data = [(i % 3, i) for i in range(10)]
+
+    def amount(x):
+        return x[1]
+
+    gen = g(data).group_aggregate(lambda x: x[0], {
+        'n': 'count',
+        'total': ('sum', amount),
+        'low': ('min', amount),
+        'high': ('max', amount),
+        'last': 'last',
+    })
+    assert isinstance(gen, g)
+    assert list(gen) == [
+        (0, {'n': 4, 'total': 18, 'low': 0, 'high': 9, 'last': (0, 9)}),
+        (1, {'n': 3, 'total': 12, 'low': 1, 'high': 7, 'last': (1, 7)}),
+        (2, {'n': 3, 'total': 15, 'low': 2, 'high': 8, 'last': (2, 8)}),
+    ]
+
+    assert g('abba').group_aggregate().list() == [('a', {'count': 2}),
+                                                  ('b', {'count': 2})]
+
+    gen = g('aaaabbbbbbba').group_aggregate(consecutive=True)
+    assert gen.list() == [('a', {'count': 4}), ('b', {'count': 7}),
+                          ('a', {'count': 1})]
+
+    # consecutive groups are yielded as soon as they end
+    endless = g(itertools.count()).group_aggregate(lambda x: x // 5,
+                                                   {'sum': True},
+                                                   consecutive=True)
+    assert endless[:3].list() == [(0, {'sum': 10}), (1, {'sum': 35}),
+                                  (2, {'sum': 60})]
+
+    with pytest.raises(ValueError):
+        g('abc').group_aggregate(agg={'x': 'nope'}).list()
+
+
 def test_firsts():
 
     gen = g("12345").firsts()
@@ -285,3 +428,111 @@ def test_join():
     assert g(range(3)).join(',', template="{}#") == "0#,1#,2#"
     string = g(range(3)).join(',', formatter=lambda x, y: str(x * x))
     assert string == "0,1,4"
+
+
+def test_pmap():
+
+    gen = g(range(10)).pmap(str, workers=2)
+    assert isinstance(gen, g)
+    assert list(gen) == [str(x) for x in range(10)]
+
+    gen = g(range(-50, 50)).pmap(abs, workers=2, mode="process", chunksize=7)
+    assert list(gen) == [abs(x) for x in range(-50, 50)]
+
+    gen = g(range(100)).pmap(lambda x: x * 2, ordered=False, chunksize=3)
+    assert sorted(gen) == list(range(0, 200, 2))
+
+    with pytest.raises(ValueError):
+        g(range(3)).pmap(str, mode="fork").list()
+
+    with pytest.raises(ZeroDivisionError):
+        g([1, 0]).pmap(lambda x: 1 / x).list()
+
+
+def test_pmap_executor_chunksize():
+    from concurrent.futures import ProcessPoolExecutor
+
+    class CountingExecutor(ProcessPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            self.submitted += 1
+            return super(CountingExecutor, self).submit(*args, **kwargs)
+
+    # a process executor gets the chunksize of the "process" mode
+    with CountingExecutor(2) as executor:
+        assert g(range(128)).pmap(abs, mode=executor).list() == list(
+            range(128))
+        assert executor.submitted == 2
+
+
+def test_pmap_reads_a_bounded_distance_ahead():
+
+    consumed = []
+
+    def source():
+        for x in range(1000):
+            consumed.append(x)
+            yield x
+
+    gen = g(source()).pmap(str, workers=2, chunksize=5, buffersize=3)
+    assert gen.next() == "0"
+    gen.iterator.close()
+    # 3 chunks submitted at start, and one more to refill the pool
+    assert len(consumed) <= 4 * 5
+
+
+def test_map_batches():
+
+    calls = []
+
+    def double(batch):
+        calls.append(len(batch))
+        return [x * 2 for x in batch]
+
+    assert g(range(10)).map_batches(double, 4).list() == list(range(0, 20, 2))
+    assert calls == [4, 4, 2]
+
+    gen = g(range(100)).map_batches(double, 7, mode='thread', workers=3)
+    assert gen.list() == list(range(0, 200, 2))
+
+    gen = g(range(100)).map_batches(double, 7, mode='thread', ordered=False)
+    assert sorted(gen) == list(range(0, 200, 2))
+
+    gen = g(range(10)).map_batches(double, 3, max_latency=10)
+    assert gen.list() == list(range(0, 20, 2))
+
+    with pytest.raises(ValueError):
+        g(range(10)).map_batches(lambda batch: batch[:-1]).list()
+
+
+def test_top():
+    assert g([]).top(3).list() == []
+    assert g([2, 1]).top(0).list() == []
+    assert g([2, 1, 3]).top(5).list() == [3, 2, 1]
+    assert g([2, 1, 3]).top(5, reverse=True).list() == [1, 2, 3]
+    assert g([2, 1, 3]).bottom(2).list() == [1, 2]
+    words = ['bb', 'a', 'cc', 'd', 'eee']
+    assert g(words).top(3, key=len).list() == ['eee', 'bb', 'cc']
+    assert g(words).bottom(3, key=len).list() == ['a', 'd', 'bb']
+    assert g(iter(range(100000))).top(2).list() == [99999, 99998]
+
+
+def test_top_by_group():
+    assert g([]).top_by_group(2, abs).list() == []
+    numbers = [5, 2, 8, 3, 4, 7, 6]
+    parity = lambda x: x % 2  # noqa
+    assert g(numbers).top_by_group(2, parity).list() == [(1, [7, 5]),
+                                                         (0, [8, 6])]
+    assert g(numbers).top_by_group(2, parity, reverse=True).list() == [
+        (1, [3, 5]), (0, [2, 4])]
+    assert g(numbers).top_by_group(0, parity).list() == [(1, []), (0, [])]
+    # equal items keep their order, like with top()
+    words = ['bb', 'a', 'cc', 'd', 'eee']
+    for reverse in (False, True):
+        grouped = g(words).top_by_group(2, lambda w: 0, len, reverse)
+        assert grouped.list() == [(0, g(words).top(2, len, reverse).list())]
+    # items don't have to be comparable
+    items = [{'n': 1}, {'n': 1}, {'n': 0}]
+    grouped = g(items).top_by_group(1, lambda x: 0, lambda x: x['n'])
+    assert grouped.list() == [(0, [{'n': 1}])]
@@ -0,0 +1,115 @@
+# coding: utf-8
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import random
+
+import pytest
+
+from ww import g
+from ww import joins
+from ww.joins import join, hash_join, merge_join
+
+
+def first(x):
+    return x[0]
+
+
+LEFT = [(1, 'a'), (2, 'b'), (2, 'c'), (4, 'd')]
+RIGHT = [(2, 'x'), (3, 'y'), (4, 'z'), (4, 'w')]
+
+INNER = [((2, 'b'), (2, 'x')), ((2, 'c'), (2, 'x')),
+         ((4, 'd'), (4, 'z')), ((4, 'd'), (4, 'w'))]
+LEFT_ONLY = [((1, 'a'), None)]
+RIGHT_ONLY = [(None, (3, 'y'))]
+
+
+@pytest.mark.parametrize('strategy, build', [
+    ('hash', 'left'), ('hash', 'right'), ('hash', None), ('merge', None)])
+def test_join(strategy, build):
+
+    def run(how, **kwargs):
+        return sorted(join(iter(LEFT), iter(RIGHT), on=first, how=how,
+                           strategy=strategy, build=build, **kwargs),
+                      key=repr)
+
+    assert run('inner') == sorted(INNER, key=repr)
+    assert run('left') == sorted(INNER + LEFT_ONLY, key=repr)
+    assert run('outer') == sorted(INNER + LEFT_ONLY + RIGHT_ONLY, key=repr)
+    assert run('outer', max_memory=1) == run('outer')
+
+
+def test_join_on():
+    pairs = list(join(['a', 'B'], ['b', 'c'], on=str.lower))
+    assert pairs == [('B', 'b')]
+    pairs = list(join([1, 2], ['2'], on=(str, None)))
+    assert pairs == [(2, '2')]
+    assert list(join([1, 2], [2, 3])) == [(2, 2)]
+
+
+def test_join_errors():
+    with pytest.raises(ValueError):
+        join([], [], how='right')
+    with pytest.raises(ValueError):
+        join([], [], strategy='nested')
+    with pytest.raises(ValueError):
+        join([], [], build='middle')
+
+
+def test_smaller_side():
+    assert joins.smaller_side([1], [1, 2]) == 'left'
+    assert joins.smaller_side([1, 2], [1]) == 'right'
+    assert joins.smaller_side([1], (x for x in [1])) == 'left'
+    assert joins.smaller_side((x for x in [1]), [1, 2]) == 'right'
+
+
+def test_hash_join_spills(tmpdir):
+    left = [(random.randrange(100), i) for i in range(1000)]
+    right = [(key, -key) for key in range(0, 100, 3)]
+    expected = sorted(hash_join(left, right, first, first, True, True))
+    joined = hash_join(left, right, first, first, True, True,
+                       max_memory=200, spill_dir=str(tmpdir))
+    assert sorted(joined, key=repr) == sorted(expected, key=repr)
+    # the build side was spilled to partitions, then all were deleted
+    assert tmpdir.listdir() == []
+
+
+def test_merge_join():
+    pairs = list(merge_join(LEFT, RIGHT, first, first, True, True))
+    assert pairs == [
+        ((1, 'a'), None),
+        ((2, 'b'), (2, 'x')),
+        ((2, 'c'), (2, 'x')),
+        (None, (3, 'y')),
+        ((4, 'd'), (4, 'z')),
+        ((4, 'd'), (4, 'w')),
+    ]
+    # groups of duplicates over the budget are replayed from disk
+    many = [(1, i) for i in range(2000)]
+    pairs = list(merge_join([(1, 'a'), (1, 'b')], many, first, first,
+                            max_memory='1k'))
+    assert len(pairs) == 4000
+    assert pairs[2000] == ((1, 'b'), (1, 0))
+    with pytest.raises(ValueError):
+        list(merge_join([2, 1], [1, 2], abs, abs))
+
+
+def test_merge_join_is_lazy():
+
+    def naturals():
+        n = 0
+        while True:
+            yield n
+            n += 1
+
+    pairs = g(naturals()).join(naturals(), strategy='merge')[:3].list()
+    assert pairs == [(0, 0), (1, 1), (2, 2)]
+
+
+def test_g_join():
+    assert g(range(3)).join(',') == '0,1,2'
+    pairs = g(LEFT).join(RIGHT, on=first, how='left').list()
+    assert sorted(pairs, key=repr) == sorted(INNER + LEFT_ONLY, key=repr)
+    pairs = g(LEFT).join(RIGHT, first, 'inner', 'merge').list()
+    assert pairs == INNER
@@ -0,0 +1,129 @@
+# coding: utf-8
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import time
+import threading
+
+import pytest
+
+from ww import g
+from ww.partition import Partitioner, partition, process_partitions
+
+
+def by_tens(x):
+    return x // 10
+
+
+def fail_on_odd(items):
+    items = list(items)
+    if items[0] % 2:
+        raise ValueError('odd')
+    return items
+
+
+def test_partition():
+    assert [list(p) for p in partition([], 3)] == [[], [], []]
+    parts = partition(range(30), 3, key=by_tens)
+    assert [list(p) for p in parts] == [list(range(0, 10)),
+                                        list(range(10, 20)),
+                                        list(range(20, 30))]
+    with pytest.raises(ValueError):
+        partition([], 0)
+    with pytest.raises(ValueError):
+        partition([], 2, buffersize=0)
+
+
+def test_partition_reads_the_source_once():
+    reads = []
+
+    def source():
+        for x in range(100):
+            reads.append(x)
+            yield x
+
+    parts = partition(source(), 4, buffersize=100)
+    assert [len(list(p)) for p in parts] == [25] * 4
+    assert reads == list(range(100))
+
+
+def test_partition_buffer_is_bounded():
+    first, second = partition(range(100), 2, buffersize=10,
+                              start_timeout=0)
+    # consuming only one partition would need to buffer 50 items
+    with pytest.raises(BufferError):
+        list(first)
+
+    # a partition never iterated by another thread can't be waited for,
+    # even if unrelated threads are alive
+    stop = threading.Event()
+    waiting = threading.Thread(target=stop.wait)
+    waiting.start()
+    try:
+        first, second = partition(range(100), 2, buffersize=10,
+                                  start_timeout=0.2)
+        with pytest.raises(BufferError):
+            list(first)
+        evens, odds = g(range(5000)).partition(2, buffersize=100)
+        with pytest.raises(BufferError):
+            evens.list()
+    finally:
+        stop.set()
+        waiting.join()
+
+    # a closed partition doesn't buffer anything anymore
+    first, second = partition(range(100), 2, buffersize=10)
+    next(second)
+    second.close()
+    assert list(first) == list(range(0, 100, 2))
+
+
+def test_partition_with_threads():
+    parts = Partitioner(range(10000), 4, buffersize=5)
+    results = [None] * 4
+
+    def consume(index):
+        results[index] = list(parts.iter_partition(index))
+
+    threads = [threading.Thread(target=consume, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [list(range(i, 10000, 4)) for i in range(4)]
+    assert all(len(buffer) == 0 for buffer in parts.buffers)
+
+
+def test_partition_waits_for_slow_threads():
+    first, second = partition(range(100), 2, buffersize=5,
+                              start_timeout=None)
+    results = []
+
+    def consume_later():
+        time.sleep(1.5)  # longer than the default start timeout
+        results.append(list(second))
+
+    thread = threading.Thread(target=consume_later)
+    thread.start()
+    assert list(first) == list(range(0, 100, 2))
+    thread.join()
+    assert results == [list(range(1, 100, 2))]
+
+
+def test_process_partitions():
+    assert process_partitions([], 2, list) == [[], []]
+    results = process_partitions(range(1000), 3, sorted, key=by_tens)
+    assert sorted(sum(results, [])) == list(range(1000))
+    assert all(len(set(by_tens(x) % 3 for x in part)) == 1
+               for part in results)
+    with pytest.raises(ValueError):
+        process_partitions(range(1000), 2, fail_on_odd)
+
+
+def test_g_partition():
+    evens, odds = g(range(10)).map(lambda x: x * 3).partition(2)
+    assert evens.list() == [0, 6, 12, 18, 24]
+    assert odds.list() == [3, 9, 15, 21, 27]
+    assert g(range(10)).partition(2, process=sorted) == [[0, 2, 4, 6, 8],
+                                                         [1, 3, 5, 7, 9]]
@@ -0,0 +1,118 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, absolute_import,
+                        division, print_function)
+
+import time
+import threading
+
+import pytest
+
+from ww import g
+from ww.prefetch import prefetch, timed_chunks
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+def test_prefetch_reads_ahead_in_the_background():
+
+    reads = []
+
+    def source():
+        for x in range(100):
+            reads.append(x)
+            yield x
+
+    gen = g(source()).prefetch(10)
+    assert not reads  # still lazy
+    assert gen.next() == 0
+    # 1 item consumed, 10 in the buffer, 1 waiting for room in it
+    wait_for(lambda: len(reads) == 12)
+    time.sleep(0.01)
+    assert len(reads) == 12
+    assert gen.list() == list(range(1, 100))
+
+
+def test_prefetch_overlaps_producer_and_consumer():
+
+    def slow_source():
+        for x in range(10):
+            time.sleep(0.02)
+            yield x
+
+    start = time.time()
+    for x in g(slow_source()).prefetch(2):
+        time.sleep(0.02)
+    # 0.4s if the producer and the consumer alternate
+    assert time.time() - start < 0.35
+
+
+def test_prefetch_propagates_errors():
+
+    def failing():
+        yield 1
+        raise KeyError('boom')
+
+    gen = g(failing()).prefetch(3)
+    assert gen.next() == 1
+    with pytest.raises(KeyError):
+        gen.next()
+
+
+def test_prefetch_closes_the_source_on_early_stop():
+
+    closed = threading.Event()
+
+    def source():
+        try:
+            for x in range(1000):
+                yield x
+        finally:
+            closed.set()
+
+    assert g(source()).prefetch(5).firsts(3).list() == [0, 1, 2]
+    assert closed.wait(5)
+
+
+def test_prefetch_with_several_workers():
+
+    lock = threading.Lock()
+    items = iter(range(1000))
+
+    class ThreadSafe(object):
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            with lock:
+                return next(items)
+
+        next = __next__
+
+    assert sorted(prefetch(ThreadSafe(), 4, workers=3)) == list(range(1000))
+
+    with pytest.raises(ValueError):
+        list(prefetch([], 0))
+
+
+def test_timed_chunks():
+
+    def slow_source():
+        yield 1
+        yield 2
+        time.sleep(0.2)
+        yield 3
+
+    start = time.time()
+    gen = timed_chunks(slow_source(), 10, max_latency=0.05)
+    assert next(gen) == [1, 2]
+    assert time.time() - start < 0.15
+    assert list(gen) == [[3]]
+
+    assert list(timed_chunks(range(5), 2, 10)) == [[0, 1], [2, 3], [4]]
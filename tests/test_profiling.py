@@ -0,0 +1,88 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, absolute_import,
+                        division, print_function)
+
+import time
+
+import pytest
+
+import ww
+from ww import g
+
+
+def slow_square(x):
+    time.sleep(0.001)
+    return x * x
+
+
+def test_profile_counts_items_per_stage():
+
+    gen = (g(range(20), profile=True)
+           .map(slow_square)
+           .skip_duplicates(lambda x: x % 10)[1:]
+           .chunks(2)
+           .window(2))
+    assert len(gen.list()) == 2
+
+    stats = gen.stats()
+    assert [(s['stage'], s['items_in'], s['items_out']) for s in stats] == [
+        ('map', 20, 20),
+        ('skip_duplicates', 20, 6),
+        ('slice', 6, 5),
+        ('chunks', 5, 3),
+        ('window', 3, 2),
+    ]
+
+    squares = stats[0]
+    assert squares['callables'] >= 0.02
+    assert squares['time'] >= squares['callables']
+    assert squares['wall'] >= squares['time']
+    # the time spent in map() is not counted in the following stages
+    assert stats[1]['time'] < squares['time']
+    assert stats[1]['wall'] >= squares['wall']
+
+    table = gen.explain()
+    assert table.splitlines()[0].split()[:3] == ['stage', 'items', 'in']
+    assert 'skip_duplicates' in table
+
+
+def test_profile_sliced_sequence():
+
+    gen = g(range(10), profile=True)[2:].map(str)
+    assert len(gen.list()) == 8
+    assert [(s['stage'], s['items_in']) for s in gen.stats()] == [('map', 8)]
+
+    # copies are profiled too
+    for source in (range(3), iter(range(3))):
+        gen = g(source, profile=True).copy().map(str)
+        assert gen.list() == ['0', '1', '2']
+        assert [s['stage'] for s in gen.stats()] == ['map']
+
+
+def test_profile_context_manager():
+
+    with ww.profile() as profiler:
+        gen = g('abcabc').groupby(str.upper).map(lambda x: x[0])
+
+    assert gen.list() == ['A', 'B', 'C']
+    assert [(s['stage'], s['items_in'], s['items_out'])
+            for s in profiler.stats()] == [('groupby', 6, 3), ('map', 3, 3)]
+
+    # g() created outside of the block are not profiled
+    gen = g(range(3)).map(str)
+    assert gen._profiler is None
+    with pytest.raises(RuntimeError):
+        gen.stats()
+
+
+def test_profile_keeps_the_results():
+
+    def pipeline(**kwargs):
+        return (g(range(100), **kwargs).map(lambda x: x % 7)
+                .filter(bool).skip_duplicates()[1:4].enumerate().list())
+
+    assert pipeline(profile=True) == pipeline()
+
+    with pytest.raises(TypeError):
+        g([], profiles=True)
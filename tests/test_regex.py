@@ -0,0 +1,171 @@
+# coding: utf-8
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import re
+import pickle
+
+import pytest
+
+from ww import s
+from ww.regex import (CACHE, REPLACERS, PatternCache, Regex, Replacer,
+                      compiled, parse_flags)
+
+
+def test_parse_flags():
+    assert parse_flags('') == 0
+    assert parse_flags('is') == re.IGNORECASE | re.DOTALL
+    assert parse_flags('is') == re.IGNORECASE | re.DOTALL  # memoized
+    assert parse_flags(re.M) == re.M
+
+    with pytest.raises(KeyError):
+        parse_flags('z')
+
+
+def test_pattern_cache():
+    cache = PatternCache(2)
+    a = cache.get('a')
+    assert a.pattern == 'a'
+    assert cache.get('a') is a
+    assert cache.get('a', 'i') is not a
+    assert cache.get('a', 'i').flags & re.IGNORECASE
+    assert cache.info() == (2, 2, 2, 2)
+
+    # the least recently used pattern is dropped
+    cache.get('a')
+    cache.get('b')
+    assert cache.get('a') is a
+    assert cache.info() == (4, 3, 2, 2)
+    assert len(cache) == 2
+
+    cache.resize(1)
+    assert len(cache) == 1
+    assert cache.get('a') is a
+
+    cache.clear()
+    assert cache.info() == (0, 0, 1, 0)
+
+    with pytest.raises(ValueError):
+        PatternCache(0)
+
+
+def test_pattern_cache_compiled():
+    cache = PatternCache()
+    compiled = re.compile('a')
+    assert cache.get(compiled) is compiled
+    assert cache.get(Regex(compiled)) is compiled
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError):
+        cache.get(compiled, 'i')
+
+
+def test_shared_cache():
+    CACHE.clear()
+    for _ in range(3):
+        s('a,b').split(',').list()
+        s('a,b').replace(',', ';')
+    assert CACHE.info().misses == 1
+    assert CACHE.info().hits == 5
+
+
+def test_compiled_skip_cache():
+    regex = s.compile(',')
+    before = CACHE.info()
+    for pattern in (regex, re.compile(',')):
+        assert s('a,b').split(pattern).list() == ['a', 'b']
+        assert s('a,b').replace(pattern, ';') == 'a;b'
+    assert CACHE.info() == before
+
+    assert compiled(regex) is regex.regex
+    assert compiled(',') is CACHE.get(',')
+    with pytest.raises(ValueError):
+        compiled(regex, 'i')
+
+
+def test_regex():
+    regex = Regex('a+', 'i')
+    assert regex.split('bAaB').list() == ['b', 'B']
+    assert isinstance(regex.split('bAaB').next(), s)
+    assert regex.replace('bAaBa', '-', 1) == 'b-Ba'
+    assert isinstance(regex.replace('bAaBa', '-'), s)
+    assert regex.search('bAa').group() == 'Aa'
+    assert regex.pattern == 'a+'
+    assert Regex(regex).regex is regex.regex
+    assert pickle.loads(pickle.dumps(regex)).regex == regex.regex
+    assert repr(Regex('a')) == "Regex('a', 32)"
+
+
+def test_replacer():
+    replacer = Replacer(('a(b)?', r'\d+', '(?P<x>c)'),
+                        (r'[\1]', lambda m: m.group()[::-1], r'\g<x>!'))
+    assert replacer.replace('ab12a c') == '[b]21[] c!'
+    assert replacer.replace('aaa', 2) == '[][]a'
+
+    verbose = Replacer(('a  # the letter a', 'b'), '-', flags='x')
+    assert verbose.replace('abc') == '--c'
+
+    with pytest.raises(ValueError):
+        Replacer((), ())
+    with pytest.raises(ValueError):
+        Replacer(('a', 'b'), ('', '', ''))
+    with pytest.raises(ValueError):
+        Replacer(('a', re.compile('b', re.I)), '')
+
+    # an escaped backslash followed by a digit isn't a backreference
+    escaped = Replacer((r'(a)\\1', 'b'), '-')
+    assert escaped.replace('a\\1b') == '--'
+
+
+@pytest.mark.parametrize('patterns, reason', [
+    (('(?P<n>a)', '(?P<n>b)'), "group name 'n'"),
+    (('a', '(?i)b'), 'inline flags'),
+    (('a', re.compile('b', re.I)), 'compiled with other flags'),
+    (('a', r'(b)\1'), 'by number'),
+    (('a', r'(b)?(?(1)c|d)'), 'by number'),
+])
+def test_replacer_unmergeable(patterns, reason):
+    with pytest.raises(ValueError) as error:
+        Replacer(patterns, '-')
+    message = str(error.value)
+    assert reason in message
+    pattern = patterns[1]
+    assert repr(getattr(pattern, 'pattern', pattern)) in message
+
+
+def test_replacer_literal():
+    table = {'cat': 'dog', 'car': 'bus', 'cart': 'van', 'a+': 'b'}
+    replacer = Replacer(tuple(table), tuple(table.values()), literal=True)
+    assert replacer.replace('cart car cat ca a+') == 'van bus dog ca b'
+    assert replacer.regex.pattern.count('c') == 1
+
+    first = Replacer(('ab', 'AB'), ('1', '2'), flags='i', literal=True)
+    assert first.replace('Ab aB') == '1 1'
+
+    # letters that re folds, but lower() doesn't map to the same word
+    for word, text in [('s', u'\u017f'), ('k', u'\u212a'), (u'\u212a', 'k'),
+                       (u'\u00df', u'\u1e9e'), (u'\u03bc', u'\u00b5')]:
+        replacer = Replacer((word, 'x'), ('ok', 'y'), flags='i', literal=True)
+        assert replacer.replace(text + 'X') == 'oky'
+        assert s(text).replace((word, 'x'), ('ok', 'y'), flags='i',
+                               literal=True, single_pass=True) == 'ok'
+        assert s(text).replace((word, 'x'), ('ok', 'y'), flags='i') == 'ok'
+
+
+def test_replacer_cache():
+    REPLACERS.clear()
+    for _ in range(2):
+        s('ab').replace(('a', 'b'), ('b', 'c'), single_pass=True)
+    assert REPLACERS.info().misses == 1
+    assert REPLACERS.info().hits == 1
+
+    # unhashable substitutions aren't cached
+    class Upper(object):
+        __hash__ = None
+
+        def __call__(self, match):
+            return match.group().upper()
+
+    assert s('ab').replace('a', Upper(), single_pass=True) == 'Ab'
+    assert len(REPLACERS) == 1
@@ -0,0 +1,86 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, absolute_import,
+                        division, print_function)
+
+import random
+
+import pytest
+
+from ww import g, rolling
+from ww.iterable import window
+from ww.rolling import window_views
+
+
+def variance(values, ddof=1):
+    if len(values) <= ddof:
+        return None
+    mean = sum(values) / len(values)
+    return sum((x - mean) ** 2 for x in values) / (len(values) - ddof)
+
+
+AGGREGATES = {
+    'sum': sum,
+    'mean': lambda w: sum(w) / len(w),
+    'min': min,
+    'max': max,
+    'var': variance,
+}
+
+
+@pytest.mark.parametrize('name', sorted(AGGREGATES))
+def test_rolling_matches_window(name):
+
+    rand = random.Random(name)
+    for size in (1, 2, 3, 10):
+        for length in (0, 1, size - 1, size, size + 1, 100):
+            data = [rand.uniform(-1e3, 1e3) for _ in range(length)]
+            expected = [AGGREGATES[name](w) for w in window(data, size)
+                        if w]
+            result = getattr(g(data).rolling(size), name)().list()
+            assert result == pytest.approx(expected), (size, length)
+
+
+@pytest.mark.parametrize('name', sorted(AGGREGATES))
+def test_rolling_checks_size(name):
+
+    with pytest.raises(ValueError):
+        list(getattr(rolling, 'rolling_' + name)([1, 2, 3], 0))
+
+
+def test_rolling_stays_accurate():
+
+    # big offsets make running sums of squares lose all precision
+    data = [1e9 + (i % 7) for i in range(10000)]
+    result = g(data).rolling(50).var(ddof=0).list()
+    expected = [variance(w, 0) for w in window(data[-60:], 50)]
+    assert result[-len(expected):] == pytest.approx(expected)
+
+    assert g(data).rolling(3).std().list()[:2] == pytest.approx([1, 1])
+
+
+def test_rolling_with_big_windows():
+
+    result = g(range(300000)).rolling(100000).max().list()
+    assert len(result) == 200001
+    assert result[-1] == 299999
+
+
+def test_window_views():
+
+    data = list(range(20))
+    for size in (1, 2, 5):
+        views = [tuple(v) for v in g(data).rolling(size).view()]
+        assert views == list(window(data, size))
+        views = [tuple(v) for v in window_views(data, size, 'l')]
+        assert views == list(window(data, size))
+
+    view = next(window_views('abc', 3))
+    assert len(view) == 3
+    assert view[-1] == 'c'
+    assert view[1:] == ['b', 'c']
+    with pytest.raises(IndexError):
+        view[3]
+
+    with pytest.raises(ValueError):
+        g(data).rolling(0)
@@ -68,6 +68,57 @@ def test_replace():
     assert s(r'cAt').replace('a', 'b', flags=re.I) == 'cbt'
 
 
+def test_replace_single_pass():
+
+    # both give the same result when patterns don't overlap
+    for single_pass in (False, True):
+        assert s('a,b;c/d').replace((',', ';', '/'), ',',
+                                    single_pass=single_pass) == 'a,b,c,d'
+
+    # but replaced text isn't matched again in a single pass
+    assert s('ab').replace(('a', 'b'), ('b', 'c')) == 'cc'
+    assert s('ab').replace(('a', 'b'), ('b', 'c'), single_pass=True) == 'bc'
+
+    assert s('a1b22').replace((r'(\d)(\d)', r'\d'), (r'\2\1', '#'),
+                              single_pass=True) == 'a#b22'
+    assert s('cAt').replace(('a', 'T'), ('o', 'x'), flags='i',
+                            single_pass=True) == 'cox'
+    assert s('a,a,a').replace(',', ';', maxreplace=1,
+                              single_pass=True) == 'a;a,a'
+    res = s('a1').replace(r'\d', lambda m: str(int(m.group()) + 1),
+                          single_pass=True)
+    assert res == 'a2'
+    assert isinstance(res, s)
+
+    with pytest.raises(ValueError):
+        s('aa').replace((r'(a)\1', 'b'), '', single_pass=True)
+
+
+def test_replace_literal():
+
+    assert s('1.5').replace('.', ',', literal=True) == '1,5'
+    assert s('a.b').replace('.', '\\', literal=True) == 'a\\b'
+
+    assert s('a.b*c').replace(('.', '*'), ('\\1', '+'), literal=True,
+                              single_pass=True) == 'a\\1b+c'
+    # the longest literal wins
+    words = ('he', 'hello', 'help')
+    assert s('hello help he').replace(words, ('1', '2', '3'), literal=True,
+                                      single_pass=True) == '2 3 1'
+    assert s('HE hello').replace(('he', 'Hello'), ('1', '2'), flags='i',
+                                 literal=True, single_pass=True) == '1 2'
+
+    digits = s.compile(r'\d+')
+    assert s('a1b33c-d').split(digits).list() == ['a', 'b', 'c-d']
+    assert s('a1b33c-d').split(digits, '-').list() == ['a', 'b', 'c', 'd']
+    assert s('a1b33c-d').replace((digits, '-'), ',') == 'a,b,c,d'
+    assert s('cAt').split(s.compile('a', flags='i')).list() == ['c', 't']
+    assert s('a1').split(re.compile(r'\d')).list() == ['a', '']
+
+    with pytest.raises(ValueError):
+        s('a1').split(digits, flags='i').list()
+
+
 def test_join():
 
     assert s(';').join('abc') == "a;b;c"
@@ -0,0 +1,74 @@
+# coding: utf-8
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+from collections import Counter
+
+import pytest
+
+from ww import g
+from ww.sampling import reservoir_sample, weighted_sample, bernoulli
+
+
+def test_reservoir_sample():
+    assert reservoir_sample([], 3) == []
+    assert reservoir_sample(range(10), 0) == []
+    assert reservoir_sample(range(3), 3) == [0, 1, 2]
+    sample = reservoir_sample(iter(range(10000)), 50, seed=3)
+    assert len(sample) == len(set(sample)) == 50
+    assert sample == sorted(sample)
+    assert sample == reservoir_sample(range(10000), 50, seed=3)
+    assert sample != reservoir_sample(range(10000), 50, seed=4)
+    with pytest.raises(ValueError):
+        reservoir_sample([], -1)
+
+
+def test_reservoir_sample_is_uniform():
+    counts = Counter()
+    for seed in range(2000):
+        counts.update(reservoir_sample(range(20), 5, seed=seed))
+    # each item is picked 2000 * 5 / 20 = 500 times on average
+    assert all(400 < counts[x] < 600 for x in range(20))
+
+
+def test_weighted_sample():
+    assert weighted_sample([], 3, abs) == []
+    assert weighted_sample([1, 2], 0, abs) == []
+    assert weighted_sample([1, 0, 2, -1], 5, lambda x: x) == [1, 2]
+    sample = weighted_sample(range(1000), 20, lambda x: x % 10, seed=5)
+    assert len(sample) == 20 and sample == sorted(sample)
+    assert sample == weighted_sample(range(1000), 20, lambda x: x % 10,
+                                     seed=5)
+    assert not any(x % 10 == 0 for x in sample)
+
+    counts = Counter()
+    for seed in range(2000):
+        counts.update(weighted_sample(range(1, 5), 1, float, seed=seed))
+    # x is picked with a probability of x / 10
+    assert all(abs(counts[x] - 200 * x) < 100 for x in range(1, 5))
+
+
+def test_bernoulli():
+    assert list(bernoulli([], 0.5)) == []
+    assert list(bernoulli(range(10), 0)) == []
+    assert list(bernoulli(range(3), 1)) == [0, 1, 2]
+    kept = list(bernoulli(range(100000), 0.01, seed=0))
+    assert 800 < len(kept) < 1200
+    assert kept == list(bernoulli(range(100000), 0.01, seed=0))
+    with pytest.raises(ValueError):
+        list(bernoulli([], 1.5))
+
+
+def test_g_sample():
+    assert g(range(3)).sample(5).list() == [0, 1, 2]
+    assert g(range(100)).sample(10, seed=1).list() == reservoir_sample(
+        range(100), 10, seed=1)
+    assert g([0, 3, 0]).sample(3, weight=abs).list() == [3]
+    assert g(range(10)).bernoulli(1).list() == list(range(10))
+
+    # nothing is read until iteration
+    items = iter(range(10))
+    sample = g(items).sample(2)
+    assert next(items) == 0
+    assert len(sample.list()) == 2
@@ -0,0 +1,94 @@
+# coding: utf-8
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import os
+
+import pytest
+
+from ww import g
+from ww.segments import ParallelSegment, run_chunk, run_segment
+
+
+def square(x):
+    return x * x
+
+
+def is_odd(x):
+    return x % 2
+
+
+def last_digit(x):
+    return x % 10
+
+
+def with_pid(x):
+    return (x, os.getpid())
+
+
+def test_run_chunk():
+    assert run_chunk([], [1, 2]) == [1, 2]
+    stages = [('filter', is_odd), ('map', square), ('chunks', 2, list),
+              ('map', sum)]
+    assert run_chunk(stages, range(6)) == [10, 25]
+    stages = [('map', square), ('skip_duplicates', last_digit, None),
+              ('filter', is_odd)]
+    assert run_chunk(stages, range(6)) == [
+        (0, []), (1, [1]), (4, []), (9, [9]), (6, []), (5, [25])]
+
+
+def test_run_segment():
+    stages = [('map', last_digit), ('skip_duplicates', None, None),
+              ('map', square)]
+    assert list(run_segment(range(100), stages, 2, 7)) == [
+        square(x) for x in range(10)]
+    fingerprints = set()
+    stages = [('skip_duplicates', None, fingerprints)]
+    assert list(run_segment([1, 2, 1, 3], stages, 2, 1, 'thread')) == [
+        1, 2, 3]
+    assert fingerprints == {1, 2, 3}
+
+
+def test_parallel():
+    items = g(range(1000)).parallel(workers=2, chunksize=100).map(
+        square).filter(is_odd).sequential().list()
+    assert items == [x * x for x in range(1000) if x % 2]
+
+    # the segment runs in other processes
+    pids = g(range(10)).parallel(2, 5).map(with_pid).sequential().map(
+        lambda item: item[1]).set()
+    assert os.getpid() not in pids
+
+    # groups never span two input chunks
+    groups = g(range(10)).parallel(2, 5, 'thread').chunks(3).sequential()
+    assert groups.list() == [(0, 1, 2), (3, 4), (5, 6, 7), (8, 9)]
+
+
+def test_parallel_skip_duplicates():
+    items = g(range(100)).map(last_digit).parallel(
+        2, chunksize=3).skip_duplicates().map(square).sequential().list()
+    assert items == [square(x) for x in range(10)]
+
+    unordered = g(range(100)).parallel(2, 3, ordered=False).map(
+        last_digit).skip_duplicates().sequential()
+    assert sorted(unordered) == list(range(10))
+
+    # each value is in every chunk, and only one of them is kept
+    spread = [x % 7 for x in range(200)]
+    for mode in ('thread', 'process'):
+        unordered = g(spread).parallel(3, 5, mode, ordered=False).map(
+            square).skip_duplicates(last_digit).sequential().list()
+        assert len(unordered) == len(set(map(last_digit, unordered)))
+        assert set(map(last_digit, unordered)) == {0, 1, 4, 9, 6, 5}
+
+
+def test_parallel_errors():
+    segment = g([]).parallel().skip_duplicates()
+    with pytest.raises(ValueError):
+        segment.chunks(2)
+    with pytest.raises(ValueError):
+        segment.skip_duplicates()
+    with pytest.raises(ValueError):
+        ParallelSegment([], chunksize=0)
+    assert repr(segment.map(abs)) == '<ParallelSegment skip_duplicates -> map>'
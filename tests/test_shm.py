@@ -0,0 +1,81 @@
+# coding: utf-8
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import array
+import pickle
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ww import g
+from ww import shm
+
+pytestmark = pytest.mark.skipif(shm.shared_memory is None,
+                                reason="needs Python 3.8+")
+
+
+def total(view):
+    return sum(view)
+
+
+def describe(view):
+    return (view.format, len(view), view.readonly)
+
+
+def test_block_pool():
+    with shm.BlockPool(64, 2) as pool:
+        first, second = pool.acquire(), pool.acquire()
+        assert first.name != second.name
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+        pool.release(second)
+        assert pool.acquire() is second
+    assert pool.blocks == []
+    with pytest.raises(ValueError):
+        shm.BlockPool(64, 0)
+
+
+def test_write_chunk():
+    with shm.BlockPool(32, 1) as pool:
+        block = pool.acquire()
+        handle = shm.write_chunk(block, [1, 2, 3], 'd')
+        handle = pickle.loads(pickle.dumps(handle))
+        assert (handle.typecode, handle.length) == ('d', 3)
+        assert shm.call_on_chunk(list, handle) == [1.0, 2.0, 3.0]
+        handle = shm.write_chunk(block, array.array('i', [4, 5]), 'd')
+        assert shm.call_on_chunk(list, handle) == [4.0, 5.0]
+        with pytest.raises(ValueError):
+            shm.write_chunk(block, range(5), 'd')
+        shm._detach_all()
+
+
+def test_shared_map():
+    chunks = [array.array('d', range(i, i + 1000))
+              for i in range(0, 10000, 1000)]
+    results = list(shm.shared_map(chunks, total, size=1000, workers=2))
+    assert results == [sum(chunk) for chunk in chunks]
+    assert list(shm.shared_map([], total)) == []
+
+    assert list(shm.shared_map([[1, 2]], describe, 'int32', workers=1)) == [
+        ('i', 2, False)]
+
+    with ThreadPoolExecutor(2) as executor:
+        results = shm.shared_map(iter(chunks), total, 'd', 1000,
+                                 mode=executor)
+        assert list(results) == [sum(chunk) for chunk in chunks]
+
+        # stopping early leaves the executor of the caller usable
+        results = shm.shared_map(iter(chunks), total, 'd', 1000,
+                                 mode=executor)
+        assert next(results) == sum(chunks[0])
+        results.close()
+        assert executor.submit(sum, [1, 2]).result() == 3
+    shm._detach_all()
+
+
+def test_g_map_shared():
+    sums = g(range(10)).map_shared(total, size=4, workers=2).list()
+    assert sums == [6.0, 22.0, 17.0]
@@ -0,0 +1,88 @@
+# coding: utf-8
+
+from __future__ import (absolute_import,
+                        division, print_function)
+
+import pytest
+
+from ww import g
+from ww.sortedops import (merge, union, intersection, difference,
+                          check_sorted)
+
+
+def test_merge():
+    assert list(merge([])) == []
+    assert list(merge([[], [1, 2]])) == [1, 2]
+    assert list(merge([[3, 1], [2]], reverse=True)) == [3, 2, 1]
+    # stable
+    pairs = list(merge([[(1, 'a'), (2, 'a')], [(1, 'b')]],
+                       key=lambda x: x[0]))
+    assert pairs == [(1, 'a'), (1, 'b'), (2, 'a')]
+
+
+def test_check_sorted():
+    assert list(check_sorted([])) == []
+    assert list(check_sorted([3, 2, 2], reverse=True)) == [3, 2, 2]
+    with pytest.raises(ValueError):
+        list(check_sorted(['b', 'a']))
+    with pytest.raises(ValueError):
+        list(check_sorted(['a', 'B'], key=str.lower, reverse=True))
+
+
+def test_union():
+    assert list(union([])) == []
+    assert list(union([[], []])) == []
+    assert list(union([[1, 1, 2], [0, 2, 3]])) == [0, 1, 2, 3]
+    assert list(union([[3, 1], [2, 1]], reverse=True)) == [3, 2, 1]
+    words = list(union([['a', 'C'], ['A', 'b']], key=str.lower))
+    assert words == ['a', 'b', 'C']
+    with pytest.raises(ValueError):
+        list(union([[1, 2], [2, 1]]))
+
+
+def test_intersection():
+    assert list(intersection([])) == []
+    assert list(intersection([[1, 2], []])) == []
+    assert list(intersection([[1, 2, 3]])) == [1, 2, 3]
+    assert list(intersection([[1, 1, 2, 3], [1, 3, 3]])) == [1, 3]
+    assert list(intersection([[5, 3, 1], [4, 3, 1]], reverse=True)) == [3, 1]
+    words = list(intersection([['A', 'b', 'c'], ['a', 'C']], key=str.lower))
+    assert words == ['A', 'c']
+    with pytest.raises(ValueError):
+        list(intersection([[1, 2, 3], [2, 1]]))
+
+
+def test_difference():
+    assert list(difference([], [[1]])) == []
+    assert list(difference([1, 2], [])) == [1, 2]
+    assert list(difference([1, 2, 2, 3], [[0, 2, 9]])) == [1, 3]
+    assert list(difference([3, 2, 1], [[2]], reverse=True)) == [3, 1]
+    words = list(difference(['A', 'b', 'c'], [['a'], ['C']], key=str.lower))
+    assert words == ['b']
+    with pytest.raises(ValueError):
+        list(difference([2, 1], [[0]]))
+
+
+def test_difference_is_lazy():
+
+    def evens():
+        n = 0
+        while True:
+            yield n
+            n += 2
+
+    # the excluded items are never loaded, so an infinite stream works
+    assert list(difference(range(10), [evens()])) == [1, 3, 5, 7, 9]
+
+
+def test_g_sorted_operations():
+    assert g([1, 3]).merge([2], [0]).list() == [0, 1, 2, 3]
+    assert g([1, 3]).union([3, 4]).list() == [1, 3, 4]
+    assert g([1, 3]).intersection([3, 4]).list() == [3]
+    assert g([1, 3]).difference([3, 4]).list() == [1]
+    assert g([3, 1]).merge([2], reverse=True).list() == [3, 2, 1]
+    assert g('aC').union('B', key=str.lower).list() == ['a', 'B', 'C']
+    assert g(range(10)).map(lambda x: x * 2).difference(
+        range(0, 20, 4)).list() == [2, 6, 10, 14, 18]
+    with pytest.raises(TypeError):
+        g([1]).merge([2], foo=1)
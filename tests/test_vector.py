@@ -0,0 +1,156 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, absolute_import,
+                        division, print_function)
+
+from array import array
+
+import pytest
+
+from ww import g
+from ww.vector import BACKENDS, VectorWrapper
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+def test_vector(backend):
+
+    v = g(range(5)).vector('int64', batch=2, backend=backend)
+    assert isinstance(v, VectorWrapper)
+    assert v.list() == [0, 1, 2, 3, 4]
+
+    v = g(range(5)).vector('float64', batch=2, backend=backend)
+    assert v.list() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+    with pytest.raises(ValueError):
+        g(range(5)).vector(batch=0, backend=backend)
+
+    with pytest.raises(ValueError):
+        g(range(5)).vector(backend='cuda')
+
+
+def test_arithmetic(backend):
+
+    def vector(items):
+        return g(items).vector('int64', batch=3, backend=backend)
+
+    assert (vector(range(5)) + 1).list() == [1, 2, 3, 4, 5]
+    assert (1 + vector(range(5))).list() == [1, 2, 3, 4, 5]
+    assert (10 - vector(range(5))).list() == [10, 9, 8, 7, 6]
+    assert (vector(range(5)) * 2 - 1).list() == [-1, 1, 3, 5, 7]
+    assert (vector(range(5)) / 2).list() == [0.0, 0.5, 1.0, 1.5, 2.0]
+    assert (vector(range(5)) // 2).list() == [0, 0, 1, 1, 2]
+    assert (vector(range(5)) % 2).list() == [0, 1, 0, 1, 0]
+    assert (vector(range(5)) ** 2).list() == [0, 1, 4, 9, 16]
+    assert (2 ** vector(range(5))).list() == [1, 2, 4, 8, 16]
+    assert (-vector(range(3))).list() == [0, -1, -2]
+    assert abs(vector([-1, 2, -3])).list() == [1, 2, 3]
+    assert (~vector([1, 2, 3])).list() == [-2, -3, -4]
+    flags = g([True, False]).vector('bool', backend=backend)
+    assert (~flags).list() == [False, True]
+
+    v = vector(range(5))
+    assert (v * v + v).list() == [0, 2, 6, 12, 20]
+
+    v = vector(range(5)) + vector(range(10, 15))
+    assert v.list() == [10, 12, 14, 16, 18]
+
+
+def test_comparisons_and_masks(backend):
+
+    def vector(items):
+        return g(items).vector('int64', batch=3, backend=backend)
+
+    v = vector(range(10))
+    assert v[v > 5].list() == [6, 7, 8, 9]
+
+    v = vector(range(10))
+    assert v[(v >= 2) & (v < 4) | (v == 9)].list() == [2, 3, 9]
+
+    v = vector(range(10))
+    assert v[~(v != 3)].list() == [3]
+
+    v = vector(range(10))
+    assert (v <= 2).list() == [True] * 3 + [False] * 7
+
+    v = vector(range(10))
+    masked = v[v % 2 == 0]
+    assert (masked * 10).list() == [0, 20, 40, 60, 80]
+
+    v = vector(range(10))
+    with pytest.raises(ValueError):
+        (v[v > 2] + v).list()
+
+    with pytest.raises(ValueError):
+        (vector(range(4)) + vector(range(5))).list()
+
+    # a longer stream isn't cut when the other one ends on a batch boundary
+    for short, long in ((range(3), range(6)), (range(6), range(3))):
+        with pytest.raises(ValueError):
+            (vector(short) + vector(long)).list()
+
+
+def test_reductions(backend):
+
+    def vector(items, dtype='int64'):
+        return g(items).vector(dtype, batch=4, backend=backend)
+
+    assert vector(range(10)).sum() == 45
+    assert vector(range(10)).min() == 0
+    assert vector(range(10)).max() == 9
+    assert vector(range(10)).count() == 10
+    assert vector(range(10)).mean() == 4.5
+    assert vector([], 'float64').sum() == 0
+    assert vector([]).count() == 0
+
+    v = vector(range(10))
+    assert v[v > 100].sum() == 0
+
+    with pytest.raises(ValueError):
+        vector([]).min()
+
+    with pytest.raises(ValueError):
+        vector([]).max()
+
+    with pytest.raises(ValueError):
+        vector([]).mean()
+
+
+def test_batches(backend):
+
+    batches = g(range(5)).vector('int32', batch=2, backend=backend).batches()
+    assert isinstance(batches, g)
+    batches = batches.list()
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    if backend == 'array':
+        assert all(isinstance(batch, array) for batch in batches)
+        assert batches[0].typecode == 'i'
+    else:
+        assert str(batches[0].dtype) == 'int32'
+
+
+def test_indexing_falls_back_to_g(backend):
+
+    v = g(range(10)).vector('int64', backend=backend)
+    assert v[3] == 3
+
+    v = g(range(10)).vector('int64', backend=backend)
+    assert v[2:5].list() == [2, 3, 4]
+
+    v = g(range(10)).vector('int64', backend=backend)
+    assert isinstance(v.to_g(), g)
+
+
+def test_array_backend_types():
+
+    v = g(range(3)).vector('int16', backend='array')
+    assert v.batches().next().typecode == 'h'
+
+    v = g(range(3)).vector('int16', backend='array')
+    assert (v / 2).batches().next() == [0.0, 0.5, 1.0]
+
+    with pytest.raises(ValueError):
+        g(range(3)).vector('complex', backend='array')